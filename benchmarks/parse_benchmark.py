@@ -0,0 +1,85 @@
+"""Time the parsing and layout core on large synthetic routes.
+
+Run it against a source checkout and against an installed mypyc-compiled wheel to compare the two:
+
+    python benchmarks/parse_benchmark.py --cues 5000 --cues 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from ridewithgps_to_cuesheet import conversion
+from ridewithgps_to_cuesheet.conversion import (
+    GenerationOptions,
+    _layout_cues,
+    _parse_to_cues,
+    compute_distance_columns,
+    validate_csv_values,
+)
+
+_CUES = [
+    ("Right", "Turn right onto Main Street"),
+    ("Left", "Turn left to stay on Marine Drive"),
+    ("Slight Right", "Keep slight right onto Old Highway 1"),
+    ("Straight", "Continue straight onto Granville Street, which becomes Harbour Road further on"),
+    ("Right", "At roundabout, take exit 2 onto Cedar Avenue"),
+    ("Uturn", "Make a U-turn onto Oak Street"),
+    ("Danger", "Rough railway crossing at an angle"),
+    ("Generic", "Turn right to Lions Gate Bridge"),
+]
+
+
+def synthetic_route(cue_count: int, seed: int = 0) -> List[List[str]]:
+    """CSV values of a route with `cue_count` cues and a control every 50 cues."""
+    rng = random.Random(seed)
+    rows = [["Start", "Start of route", "0.00", "10.0", ""]]
+    dist = 0.0
+    for idx in range(1, cue_count - 1):
+        dist += rng.uniform(0.05, 4.0)
+        if idx % 50 == 0:
+            rows.append(["Control", f"Control {idx // 50}: Gas station", f"{dist:.2f}", "10.0", ""])
+        else:
+            turn, notes = rng.choice(_CUES)
+            rows.append([turn, notes, f"{dist:.2f}", "10.0", ""])
+    rows.append(["End", "End of route", f"{dist + 1:.2f}", "10.0", ""])
+    return rows
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cues", type=int, action="append", help="Route length in cues (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+
+    compiled = not conversion.__file__.endswith(".py")
+    print(f"conversion loaded from {conversion.__file__} ({'compiled' if compiled else 'pure Python'})")
+
+    opts = GenerationOptions()
+    for cue_count in args.cues or [5_000, 50_000]:
+        csv_values = synthetic_route(cue_count)
+        cues = _parse_to_cues(csv_values, opts)
+        stages = {
+            "validate": lambda: validate_csv_values(csv_values, opts),
+            "parse": lambda: _parse_to_cues(csv_values, opts),
+            "layout": lambda: _layout_cues(cues, opts),
+            "distances": lambda: compute_distance_columns(cues),
+        }
+        timings = ", ".join(f"{name} {best_of(args.repeat, stage) * 1000:.1f} ms" for name, stage in stages.items())
+        print(f"{cue_count} cues: {timings}")
+
+
+if __name__ == "__main__":
+    main()
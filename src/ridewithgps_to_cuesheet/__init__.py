@@ -1,7 +1,40 @@
 """RideWithGPS to Cuesheet converter package."""
 
-from .conversion import GenerationOptions, generate_excel
-from .ridewithgps import AuthToken, authenticate, download_csv_content
+from .aio import generate_excel_async
+from .conversion import (
+    DistanceColumns,
+    GenerationOptions,
+    InvalidRouteError,
+    PreparedRoute,
+    ValidationIssue,
+    compute_distance_columns,
+    generate_excel,
+    generate_excel_bytes,
+    generate_excel_variants,
+    prepare_route,
+    validate_csv_values,
+)
+from .ridewithgps import AuthToken, authenticate, download_csv_content, download_route_json
+from .route_json import RouteJson, parse_route_json
 
 __version__ = "0.9.0"
-__all__ = ["generate_excel", "GenerationOptions", "AuthToken", "authenticate", "download_csv_content"]
+__all__ = [
+    "generate_excel",
+    "generate_excel_bytes",
+    "generate_excel_variants",
+    "generate_excel_async",
+    "GenerationOptions",
+    "validate_csv_values",
+    "ValidationIssue",
+    "InvalidRouteError",
+    "prepare_route",
+    "PreparedRoute",
+    "DistanceColumns",
+    "compute_distance_columns",
+    "AuthToken",
+    "authenticate",
+    "download_csv_content",
+    "download_route_json",
+    "RouteJson",
+    "parse_route_json",
+]
@@ -0,0 +1,42 @@
+"""Asyncio wrappers so services can generate cuesheets without blocking the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, Optional
+
+from .conversion import GenerationOptions, generate_excel_bytes
+
+DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+_default_executor: Optional[ThreadPoolExecutor] = None
+_default_executor_lock = threading.Lock()
+
+
+def _get_default_executor() -> ThreadPoolExecutor:
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="ridewithgps-to-cuesheet"
+            )
+        return _default_executor
+
+
+async def generate_excel_async(
+    csv_values: List[List[str]], opts: GenerationOptions, executor: Optional[Executor] = None
+) -> bytes:
+    """
+    Generate the cuesheet for `csv_values` off the event loop and return the .xlsx bytes.
+
+    Args:
+        csv_values: CSV rows, excluding the header
+        opts: Generation options
+        executor: Where to run the generation; defaults to a shared pool of DEFAULT_MAX_WORKERS threads.
+            Pass a ProcessPoolExecutor to spread large batches across CPUs.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor or _get_default_executor(), generate_excel_bytes, csv_values, opts)
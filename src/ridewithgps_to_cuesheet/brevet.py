@@ -0,0 +1,166 @@
+"""Brevet card data: a route's controls with their distances and ACP/RUSA opening and closing times.
+
+Only control rows are kept as the CSV streams past, and no workbook is built (xlsxwriter is never imported), so a
+card costs a fraction of a cuesheet.
+
+Times follow the ACP brevet rules RUSA also uses: control distances are rounded to the nearest kilometre, controls
+open at the maximum speed and close at the minimum speed of each distance band, controls in the first 60 km close
+at 20 km/h plus one hour, and the finish closes at the fixed time limit for the brevet distance.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Literal, Optional, TextIO, Tuple
+
+from .conversion import GenerationOptions, _is_control_row, _map_cue_description
+
+BREVET_TIME_LIMITS: Dict[int, timedelta] = {
+    200: timedelta(hours=13, minutes=30),
+    300: timedelta(hours=20),
+    400: timedelta(hours=27),
+    600: timedelta(hours=40),
+    1000: timedelta(hours=75),
+    1200: timedelta(hours=90),
+}
+
+# (end of distance band in km, speed in km/h)
+_OPENING_SPEEDS = ((200, 34.0), (400, 32.0), (600, 30.0), (1000, 28.0), (1300, 26.0))
+_CLOSING_SPEEDS = ((600, 15.0), (1000, 11.428), (1300, 13.333))
+_EARLY_CONTROL_KM = 60
+
+BrevetCardFormat = Literal["json", "csv"]
+BREVET_CARD_FIELDS = ["control", "name", "distance_km", "from_previous_km", "opens", "closes"]
+
+
+@dataclass(frozen=True)
+class BrevetControl:
+    number: int
+    name: str
+    distance_km: Decimal
+    from_previous_km: Decimal
+    opens_after: timedelta
+    closes_after: timedelta
+
+
+def nearest_brevet_distance(total_km: Decimal | float) -> int:
+    return min(BREVET_TIME_LIMITS, key=lambda brevet_km: abs(brevet_km - float(total_km)))
+
+
+def opening_offset(distance_km: Decimal | float, brevet_km: int) -> timedelta:
+    """Time after the start at which a control opens."""
+    km = min(round(distance_km), brevet_km)
+    return _to_minutes(_hours_through_bands(km, _OPENING_SPEEDS))
+
+
+def closing_offset(distance_km: Decimal | float, brevet_km: int) -> timedelta:
+    """Time after the start at which a control closes."""
+    km = round(distance_km)
+    if km >= brevet_km:
+        return BREVET_TIME_LIMITS[brevet_km]
+    if km <= _EARLY_CONTROL_KM:
+        return _to_minutes(km / 20 + 1)
+    return _to_minutes(_hours_through_bands(km, _CLOSING_SPEEDS))
+
+
+def extract_controls(
+    rows: Iterable[List[str]], opts: GenerationOptions, brevet_distance: Optional[int] = None
+) -> List[BrevetControl]:
+    """
+    Keep the controls of a route in one pass over its CSV rows and time them for the brevet.
+
+    Args:
+        rows: CSV rows without the header, e.g. from utils.iter_csv_rows
+        opts: Decides which rows are controls (control_cue_indicators or a "Control...:" note) and their names
+        brevet_distance: Official brevet distance in km; the nearest one to the route's length if not given
+
+    Raises:
+        ValueError: If a row has no numeric distance, or the brevet distance has no time limit
+    """
+    controls: List[Tuple[str, Decimal]] = []
+    total_km = Decimal("0")
+    for idx, row in enumerate(rows):
+        if len(row) < 3:
+            raise ValueError(f"Row {idx + 1}: Expected at least 3 columns (type, notes, distance), got {len(row)}")
+        try:
+            total_km = Decimal(row[2])
+        except ArithmeticError:
+            raise ValueError(f"Row {idx + 1}: Distance '{row[2]}' is not a number")
+        if _is_control_row(row, opts):
+            controls.append((_map_cue_description(opts, row[1]).strip(), total_km))
+
+    brevet_km = brevet_distance or nearest_brevet_distance(total_km)
+    if brevet_km not in BREVET_TIME_LIMITS:
+        known = ", ".join(map(str, BREVET_TIME_LIMITS))
+        raise ValueError(f"No time limit for a {brevet_km} km brevet, use one of {known}")
+
+    previous_km = Decimal("0")
+    brevet_controls = []
+    for number, (name, distance_km) in enumerate(controls, start=1):
+        brevet_controls.append(
+            BrevetControl(
+                number=number,
+                name=name,
+                distance_km=distance_km,
+                from_previous_km=distance_km - previous_km,
+                opens_after=opening_offset(distance_km, brevet_km),
+                closes_after=closing_offset(distance_km, brevet_km),
+            )
+        )
+        previous_km = distance_km
+    return brevet_controls
+
+
+def brevet_card_records(controls: List[BrevetControl], start: Optional[datetime] = None) -> List[Dict[str, str]]:
+    """One flat record per control; times are elapsed H:MM, or clock times when the `start` is known."""
+    return [
+        {
+            "control": str(control.number),
+            "name": control.name,
+            "distance_km": str(control.distance_km),
+            "from_previous_km": str(control.from_previous_km),
+            "opens": _format_time(control.opens_after, start),
+            "closes": _format_time(control.closes_after, start),
+        }
+        for control in controls
+    ]
+
+
+def write_brevet_card(
+    controls: List[BrevetControl], output: TextIO, card_format: BrevetCardFormat, start: Optional[datetime] = None
+) -> None:
+    records = brevet_card_records(controls, start)
+    if card_format == "json":
+        json.dump(records, output, ensure_ascii=False, indent=2)
+        output.write("\n")
+        return
+
+    writer = csv.DictWriter(output, fieldnames=BREVET_CARD_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(records)
+
+
+def _hours_through_bands(km: float, bands: Tuple[Tuple[int, float], ...]) -> float:
+    hours = 0.0
+    band_start = 0
+    for band_end, speed in bands:
+        if km <= band_start:
+            break
+        hours += (min(km, band_end) - band_start) / speed
+        band_start = band_end
+    return hours
+
+
+def _to_minutes(hours: float) -> timedelta:
+    return timedelta(minutes=round(hours * 60))
+
+
+def _format_time(offset: timedelta, start: Optional[datetime]) -> str:
+    if start:
+        return (start + offset).strftime("%Y-%m-%d %H:%M")
+    minutes = int(offset.total_seconds()) // 60
+    return f"{minutes // 60}:{minutes % 60:02d}"
@@ -0,0 +1,208 @@
+"""A SQLite catalog of known routes: their CSV, a parsed summary and the cuesheets generated from them.
+
+An output is stale when the CSV it was generated from no longer has the hash recorded for its route.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from .conversion import Cue, GenerationOptions, RouteSummary, parse_route
+from .utils import read_csv_to_array
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS routes (
+    route_id TEXT PRIMARY KEY,
+    csv_path TEXT NOT NULL,
+    csv_sha256 TEXT NOT NULL,
+    downloaded_at REAL,
+    total_distance TEXT NOT NULL,
+    cue_count INTEGER NOT NULL,
+    control_count INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    output_path TEXT PRIMARY KEY,
+    route_id TEXT NOT NULL REFERENCES routes (route_id),
+    csv_sha256 TEXT NOT NULL,
+    generated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_by_route ON outputs (route_id);
+CREATE TABLE IF NOT EXISTS synced_routes (
+    route_id TEXT PRIMARY KEY,
+    remote_updated_at TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class CatalogRoute:
+    route_id: str
+    csv_path: str
+    csv_sha256: str
+    downloaded_at: Optional[float]
+    summary: RouteSummary
+    updated_at: float
+
+
+@dataclass(frozen=True)
+class CatalogOutput:
+    route_id: str
+    output_path: str
+    generated_at: float
+    is_stale: bool
+
+
+@dataclass(frozen=True)
+class ParsedRoute:
+    csv_sha256: str
+    csv_values: List[List[str]]
+    cues: List[Cue]
+
+
+def route_id_for_csv(csv_path: Path) -> str:
+    """The RideWithGPS route ID for downloaded CSVs, otherwise the file's stem."""
+    match = re.fullmatch(r"downloaded_cues_for_(\d+)", csv_path.stem)
+    return match.group(1) if match else csv_path.stem
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_parsed_routes(
+    csv_paths: Iterable[Path], opts: GenerationOptions, known_hashes: Optional[Mapping[str, str]] = None
+) -> Iterator[Tuple[str, Path, Union[ParsedRoute, str]]]:
+    """
+    Read and parse every CSV in `csv_paths`, yielding its route ID, path, and the parsed route or why it failed.
+
+    A CSV whose hash is the one in `known_hashes` for its route has not changed and is skipped without being parsed.
+    """
+    for csv_path in csv_paths:
+        route_id = route_id_for_csv(csv_path)
+        try:
+            csv_sha256 = hash_file(csv_path)
+            if known_hashes is not None and known_hashes.get(route_id) == csv_sha256:
+                continue
+            csv_values = read_csv_to_array(str(csv_path))
+            cues = parse_route(csv_values, opts)
+        except (OSError, UnicodeDecodeError, ValueError, csv.Error) as e:
+            yield route_id, csv_path, str(e)
+            continue
+        yield route_id, csv_path, ParsedRoute(csv_sha256, csv_values, cues)
+
+
+class RouteCatalog:
+    def __init__(self, path: Path | str, timeout: float = 30.0):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path), timeout=timeout, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> RouteCatalog:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def record_csv(
+        self, route_id: str, csv_path: Path, summary: RouteSummary, downloaded_at: Optional[float] = None
+    ) -> str:
+        """Store (or refresh) a route's CSV and summary; returns the CSV's hash."""
+        csv_sha256 = hash_file(csv_path)
+        self._conn.execute(
+            "INSERT INTO routes (route_id, csv_path, csv_sha256, downloaded_at, total_distance, cue_count, "
+            "control_count, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (route_id) DO UPDATE SET csv_path = excluded.csv_path, csv_sha256 = excluded.csv_sha256, "
+            "downloaded_at = COALESCE(excluded.downloaded_at, routes.downloaded_at), "
+            "total_distance = excluded.total_distance, cue_count = excluded.cue_count, "
+            "control_count = excluded.control_count, updated_at = excluded.updated_at",
+            (
+                route_id,
+                str(csv_path.absolute()),
+                csv_sha256,
+                downloaded_at,
+                str(summary.total_distance),
+                summary.cue_count,
+                summary.control_count,
+                time.time(),
+            ),
+        )
+        return csv_sha256
+
+    def record_output(self, route_id: str, output_path: Path) -> None:
+        """Record a cuesheet generated from the route's current CSV."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO outputs (output_path, route_id, csv_sha256, generated_at) "
+            "SELECT ?, route_id, csv_sha256, ? FROM routes WHERE route_id = ?",
+            (str(output_path.absolute()), time.time(), route_id),
+        )
+
+    def record_sync(self, route_id: str, remote_updated_at: str) -> None:
+        """Remember the RideWithGPS version of a route that was downloaded and regenerated by a sync."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO synced_routes (route_id, remote_updated_at, synced_at) VALUES (?, ?, ?)",
+            (route_id, remote_updated_at, time.time()),
+        )
+
+    def synced_versions(self) -> Dict[str, str]:
+        """The RideWithGPS `updated_at` of every route as of its last sync."""
+        rows = self._conn.execute("SELECT route_id, remote_updated_at FROM synced_routes")
+        return {row["route_id"]: row["remote_updated_at"] for row in rows}
+
+    def get(self, route_id: str) -> Optional[CatalogRoute]:
+        row = self._conn.execute("SELECT * FROM routes WHERE route_id = ?", (route_id,)).fetchone()
+        return _as_route(row) if row else None
+
+    def routes(self) -> List[CatalogRoute]:
+        return [_as_route(row) for row in self._conn.execute("SELECT * FROM routes ORDER BY route_id")]
+
+    def outputs(self, route_id: Optional[str] = None, stale_only: bool = False) -> List[CatalogOutput]:
+        query = (
+            "SELECT outputs.route_id, output_path, generated_at, outputs.csv_sha256 != routes.csv_sha256 AS is_stale "
+            "FROM outputs JOIN routes USING (route_id) WHERE (? IS NULL OR outputs.route_id = ?)"
+        )
+        if stale_only:
+            query += " AND outputs.csv_sha256 != routes.csv_sha256"
+        rows = self._conn.execute(query + " ORDER BY outputs.route_id, output_path", (route_id, route_id))
+        return [
+            CatalogOutput(
+                route_id=row["route_id"],
+                output_path=row["output_path"],
+                generated_at=row["generated_at"],
+                is_stale=bool(row["is_stale"]),
+            )
+            for row in rows
+        ]
+
+
+def _as_route(row: sqlite3.Row) -> CatalogRoute:
+    return CatalogRoute(
+        route_id=row["route_id"],
+        csv_path=row["csv_path"],
+        csv_sha256=row["csv_sha256"],
+        downloaded_at=row["downloaded_at"],
+        summary=RouteSummary(
+            total_distance=Decimal(row["total_distance"]),
+            cue_count=row["cue_count"],
+            control_count=row["control_count"],
+        ),
+        updated_at=row["updated_at"],
+    )
@@ -0,0 +1,127 @@
+"""Elevation profile chart for cuesheets.
+
+Dense routes have far more points than a printed chart can show, so the profile is reduced with
+Largest-Triangle-Three-Buckets (Steinarsson, 2013), which keeps the peaks and valleys that shape the profile.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import xlsxwriter
+    from xlsxwriter.worksheet import Worksheet
+
+Point = Tuple[float, float]
+
+DATA_SHEET_NAME = "Elevation data"
+CHART_WIDTH_PX = 480
+CHART_HEIGHT_PX = 240
+CHART_ROWS = 13  # rows of the cuesheet the chart covers, for the print area
+
+
+def downsample_lttb(points: Sequence[Point], threshold: int) -> List[Point]:
+    """
+    Reduce `points` (sorted by x) to at most `threshold` points with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between contributes the point forming the largest
+    triangle with the previously kept point and the average of the next bucket.
+
+    Raises:
+        ValueError: If `threshold` is below 2, too few points to keep both ends
+    """
+    if threshold < 2:
+        raise ValueError(f"Cannot downsample to fewer than 2 points, got {threshold}")
+    if threshold >= len(points):
+        return list(points)
+    if threshold == 2:
+        return [points[0], points[-1]]
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    kept = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        next_start, next_end = end, min(int((bucket + 2) * bucket_size) + 1, len(points))
+        next_bucket = points[next_start:next_end]
+        avg_x = sum(x for x, _ in next_bucket) / len(next_bucket)
+        avg_y = sum(y for _, y in next_bucket) / len(next_bucket)
+
+        kept_x, kept_y = points[kept]
+        best_area = -1.0
+        for idx in range(start, end):
+            x, y = points[idx]
+            area = abs((kept_x - avg_x) * (y - kept_y) - (kept_x - x) * (avg_y - kept_y))
+            if area > best_area:
+                best_area = area
+                kept = idx
+        sampled.append(points[kept])
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def elevation_points(csv_values: List[List[str]]) -> List[Point]:
+    """(distance km, elevation m) for every row with a finite numeric distance and elevation."""
+    points = []
+    for row in csv_values:
+        try:
+            point = (float(row[2]), float(row[3]))
+        except (IndexError, ValueError):
+            continue
+        # float() accepts "nan" and "inf", which a chart series cannot plot
+        if math.isfinite(point[0]) and math.isfinite(point[1]):
+            points.append(point)
+    return points
+
+
+def add_elevation_chart(
+    workbook: xlsxwriter.Workbook,
+    worksheet: Worksheet,
+    row: int,
+    profile: Sequence[Point],
+    controls: Sequence[Point],
+    max_points: int,
+) -> None:
+    """Insert an elevation profile with control markers at `row` of `worksheet`, backed by a hidden data sheet."""
+    sampled = downsample_lttb(profile, max_points)
+
+    data_sheet = workbook.add_worksheet(DATA_SHEET_NAME)
+    data_sheet.hide()
+    data_sheet.write_column(0, 0, [x for x, _ in sampled])
+    data_sheet.write_column(0, 1, [y for _, y in sampled])
+    data_sheet.write_column(0, 2, [x for x, _ in controls])
+    data_sheet.write_column(0, 3, [y for _, y in controls])
+
+    chart = workbook.add_chart({"type": "scatter", "subtype": "straight"})
+    sheet_ref = f"'{DATA_SHEET_NAME}'"
+    chart.add_series(
+        {
+            "name": "Elevation",
+            "categories": [sheet_ref, 0, 0, len(sampled) - 1, 0],
+            "values": [sheet_ref, 0, 1, len(sampled) - 1, 1],
+            "line": {"color": "#4F6228", "width": 1.25},
+        }
+    )
+    if controls:
+        chart.add_series(
+            {
+                "name": "Controls",
+                "categories": [sheet_ref, 0, 2, len(controls) - 1, 2],
+                "values": [sheet_ref, 0, 3, len(controls) - 1, 3],
+                "line": {"none": True},
+                "marker": {"type": "triangle", "size": 7, "fill": {"color": "red"}, "border": {"color": "red"}},
+            }
+        )
+
+    font = {"name": "Arial", "size": 8}
+    chart.set_title({"name": "Elevation profile", "name_font": {"name": "Arial", "size": 10}})
+    chart.set_x_axis({"name": "km", "name_font": font, "num_font": font, "min": 0, "max": profile[-1][0]})
+    chart.set_y_axis({"name": "m", "name_font": font, "num_font": font, "major_gridlines": {"visible": False}})
+    chart.set_legend({"none": True})
+    chart.set_size({"width": CHART_WIDTH_PX, "height": CHART_HEIGHT_PX})
+
+    worksheet.insert_chart(row, 0, chart, {"x_offset": 4, "y_offset": 4})
@@ -4,36 +4,99 @@ This module provides a command-line interface for converting RideWithGPS route f
 to BC Randonneurs style cue sheets. It supports both local CSV files and direct URL downloads.
 """
 
+import csv
+import dataclasses
+import io
 import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, TypeVar, get_args
 from urllib.parse import ParseResult, urlparse
 
+import requests
 import typer
 from rich.console import Console
+from rich.table import Table
 
 from . import conversion as Converter
-from .logger import logger
-from .ridewithgps import authenticate, download_csv_content
-from .secrets import load_credentials
-from .utils import read_csv_to_array
+from .brevet import BREVET_TIME_LIMITS, BrevetCardFormat, extract_controls, write_brevet_card
+from .catalog import RouteCatalog, iter_parsed_routes, route_id_for_csv
+from .cue_export import CueExporter, PyArrowNotInstalledError, export_format_for, export_routes
+from .cue_stream import write_cue_stream
+from .jobs import DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS, Job, JobQueue, run_worker
+from .logger import logger, start_queued_logging, stop_queued_logging
+from .pipeline import DEFAULT_PIPELINE_QUEUE_SIZE, PipelineJob, run_pipeline
+from .preview import cuesheet_preview
+from .ridewithgps import (
+    AuthToken,
+    AuthTokenExpiredError,
+    RouteListing,
+    authenticate,
+    download_csv_content,
+    download_route_json,
+    iter_route_listing,
+)
+from .route_json import CSV_EXPORT_HEADER
+from .search_index import CueIndex, as_fts_query, refresh_index
+from .secrets import (
+    NoCredentialsError,
+    clear_cached_auth_token,
+    load_cached_auth_token,
+    load_credentials,
+    save_cached_auth_token,
+)
+from .similarity import DEFAULT_THRESHOLD, near_duplicate_groups, route_signatures
+from .utils import iter_csv_rows, iter_csv_stream, read_csv_to_array
+from .watch import DEFAULT_DEBOUNCE_SECONDS, watch_directory
+from .workspace import atomic_write_text, job_workspace, publish, route_lock
+
+T = TypeVar("T")
+
+DEFAULT_QUEUE_PATH = "jobs.sqlite"
+CATALOG_FILENAME = "catalog.sqlite"
+CUE_INDEX_FILENAME = "cue_index.sqlite"
+DEFAULT_SYNC_CONCURRENCY = 8
+
+# held while re-authenticating, so concurrent requests rejected together log in once between them
+_auth_refresh_lock = threading.Lock()
+
+# --filename/--output value for stdin/stdout
+STDIO_PATH = "-"
+PipeFormat = Literal["xlsx", "ndjson"]
+
+# --variant features, each overriding the options given by the flags
+VARIANT_FEATURES: Dict[str, Dict[str, Any]] = {
+    "standard": {},
+    "island": {"include_distance_from_last": True},
+    "direction": {"hide_direction": False},
+    "1dp": {"two_decimals_precision": False},
+    "2dp": {"two_decimals_precision": True},
+    "elevation": {"include_elevation_chart": True},
+}
 
 console = Console()
 app = typer.Typer(
     name="ridewithgps-to-cuesheet",
-    help="Convert RideWithGPS maps to BC Randonneurs style cuesheets",
     no_args_is_help=True,
 )
 
 
-@app.command()
+@app.callback(invoke_without_command=True)
 def main(
+    ctx: typer.Context,
     filename: Optional[str] = typer.Option(
         None,
         "--filename",
         "-f",
-        help="CSV file to convert locally",
+        help="CSV file to convert locally, or - to read it from stdin",
         callback=lambda v: validate_csv_file(v) if v else None,
     ),
     url: Optional[str] = typer.Option(
@@ -42,7 +105,18 @@ def main(
         "-u",
         help="RideWithGPS URL (e.g., https://ridewithgps.com/routes/1234)",
     ),
-    output: Optional[str] = typer.Option(None, "--output", "-o", help="Override output filename"),
+    route_json: bool = typer.Option(
+        False, "--route-json", help="Build the cues from the route's JSON rather than its CSV export (with --url)"
+    ),
+    output: Optional[str] = typer.Option(
+        None, "--output", "-o", help="Override output filename, or - to write the cuesheet to stdout"
+    ),
+    output_format: str = typer.Option(
+        "xlsx",
+        "--format",
+        help="With --filename - or --output -: xlsx, or ndjson for one JSON object per cue",
+        callback=lambda v: validate_pipe_format(v),
+    ),
     csv_directory: str = typer.Option("files", "--csv-directory", "-c", help="Directory for CSV files"),
     xlsx_directory: str = typer.Option("outputs", "--xlsx-directory", "-x", help="Directory for XLSX files"),
     island: bool = typer.Option(
@@ -54,39 +128,64 @@ def main(
     two_decimals_precision: bool = typer.Option(
         False, "--two-decimals-precision", "-tdp", help="Use two decimal places for distances"
     ),
+    reproducible: bool = typer.Option(
+        False, "--reproducible", help="Pin the workbook's creation date, so identical input gives identical bytes"
+    ),
+    elevation_chart: bool = typer.Option(
+        False, "--elevation-chart", "-e", help="Add an elevation profile chart below the cues"
+    ),
+    catalog_path: Optional[str] = typer.Option(
+        None, "--catalog", help="Route catalog database [default: <csv-directory>/catalog.sqlite]"
+    ),
+    variant: Optional[List[str]] = typer.Option(
+        None,
+        "--variant",
+        help="Write this variant instead of the standard sheet, e.g. 'island,direction' (features: "
+        + ", ".join(VARIANT_FEATURES)
+        + "); repeat for several",
+    ),
+    parallel: bool = typer.Option(False, "--parallel", help="Render variants in separate processes"),
+    preview: bool = typer.Option(
+        False, "--preview", help="Print the cuesheet as a table in the terminal instead of writing a workbook"
+    ),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose output"),
 ) -> None:
     """Convert RideWithGPS routes to BC Randonneurs style cuesheets.
 
     You must provide either a CSV file (--filename) or a RideWithGPS URL (--url).
     """
+    if ctx.invoked_subcommand:
+        return
+    piping = STDIO_PATH in (filename, output)
+    if piping:
+        # stdout carries the cuesheet, so messages go to stderr until the command is done
+        console.stderr = True
+        ctx.call_on_close(restore_console_to_stdout)
+
     file_path, url_info = validate_inputs(filename, url)
     inputs_path, outputs_path = Path(csv_directory), Path(xlsx_directory)
 
     if verbose:
-        console.print("[cyan]Running in verbose mode[/cyan]")
-
-        class ConsoleHandler(logging.Handler):
-            def emit(self, record: logging.LogRecord) -> None:
-                # colours from https://rich.readthedocs.io/en/stable/appendix/colors.html?highlight=color
-                if record.levelno <= logging.DEBUG:
-                    console.print(f"[medium_purple4]{record.msg}[/medium_purple4]")
-                elif record.levelno <= logging.WARNING:
-                    console.print(f"[slate_blue3]{record.msg}[/slate_blue3]")
+        enable_verbose_logging()
 
-        console_handler = ConsoleHandler()
-        console_handler.setLevel(logging.DEBUG)
-        logger.addHandler(console_handler)
-        logger.setLevel(logging.DEBUG)
+    options = build_generation_options(
+        island,
+        show_direction_column,
+        two_decimals_precision,
+        verbose,
+        elevation_chart=elevation_chart,
+        reproducible=reproducible,
+    )
 
-    features = []
-    if island:
-        features.append("include distance from last control")
-    if show_direction_column:
-        features.append("show direction column")
+    check_output_mode(piping, output_format, preview or bool(variant))
+    if piping:
+        pipe_format: PipeFormat = "ndjson" if output_format == "ndjson" else "xlsx"
+        convert_through_pipe(file_path, url_info, output, pipe_format, options, route_json)
+        return
 
-    if features:
-        console.print(f"[cyan]Cuesheet will:[/cyan] {', '.join(features)}")
+    if preview:
+        preview_route(file_path, url_info, inputs_path, options, verbose, route_json)
+        return
 
     excel_filename = generate_output_filename(url_info, file_path, output)
     console.print(f"[cyan]Output file:[/cyan] {excel_filename}")
@@ -98,23 +197,689 @@ def main(
         console.print(f"[red]Error creating directories:[/red] {e}")
         raise typer.Exit(1)
 
-    csv_filename = prepare_csv_file(file_path, url_info, outputs_path, verbose)
-    run_conversion(
-        input_csv=str(csv_filename),
-        output_xlsx=excel_filename,
-        options=Converter.GenerationOptions(
-            include_distance_from_last=island,
-            two_decimals_precision=two_decimals_precision,
-            hide_direction=not show_direction_column,
-            verbose=verbose,
-        ),
-    )
-    organize_output_files(excel_filename, inputs_path, outputs_path, file_path)
+    variants = [parse_variant(spec, options) for spec in variant or []]
+    if url_info:
+        route_id = url_info.id
+    else:
+        assert file_path, "validate_inputs returns either a file or a URL"
+        route_id = route_id_for_csv(file_path)
+
+    # other runs converting the same route wait here; results are only published once complete
+    with route_lock(inputs_path, route_id), job_workspace(outputs_path) as workspace:
+        csv_filename = prepare_csv_file(file_path, url_info, outputs_path, verbose, route_json)
+        if variants:
+            outputs = [(variant_output_filename(excel_filename, name), opts) for name, opts in variants]
+            csv_values = run_variant_conversion(
+                str(csv_filename), [(str(workspace / Path(name).name), opts) for name, opts in outputs], parallel
+            )
+        else:
+            outputs = [(excel_filename, options)]
+            csv_values = run_conversion(
+                input_csv=str(csv_filename),
+                output_xlsx=str(workspace / Path(excel_filename).name),
+                options=options,
+            )
+
+        output_filenames = [output_filename for output_filename, _ in outputs]
+        final_csv_path = (
+            organize_output_files(workspace, output_filenames, inputs_path, outputs_path, file_path) or csv_filename
+        )
+
+        for output_filename, output_options in outputs:
+            update_catalog(
+                Path(catalog_path) if catalog_path else inputs_path / CATALOG_FILENAME,
+                route_id,
+                final_csv_path,
+                outputs_path / output_filename,
+                csv_values,
+                output_options,
+                downloaded=url_info is not None,
+            )
 
     console.print("[green]🎉 Process completed successfully![/green]")
 
 
+@app.command()
+def watch(
+    csv_directory: str = typer.Option("files", "--csv-directory", "-c", help="Directory of CSV files to watch"),
+    xlsx_directory: str = typer.Option("outputs", "--xlsx-directory", "-x", help="Directory for XLSX files"),
+    island: bool = typer.Option(
+        False, "--island", "-i", help="Vancouver Island style: show distance from last control"
+    ),
+    show_direction_column: bool = typer.Option(
+        False, "--show-direction-column", "-sdc", help="Hide the direction column"
+    ),
+    two_decimals_precision: bool = typer.Option(
+        False, "--two-decimals-precision", "-tdp", help="Use two decimal places for distances"
+    ),
+    reproducible: bool = typer.Option(
+        False, "--reproducible", help="Pin the workbook's creation date, so identical input gives identical bytes"
+    ),
+    debounce: float = typer.Option(
+        DEFAULT_DEBOUNCE_SECONDS, "--debounce", help="Seconds a CSV must stop changing before it is converted"
+    ),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose output"),
+) -> None:
+    """Regenerate cuesheets whenever a CSV in the CSV directory is created or changed."""
+    inputs_path, outputs_path = Path(csv_directory), Path(xlsx_directory)
+
+    if verbose:
+        enable_verbose_logging()
+
+    options = build_generation_options(
+        island, show_direction_column, two_decimals_precision, verbose, reproducible=reproducible
+    )
+
+    try:
+        inputs_path.mkdir(parents=True, exist_ok=True)
+        outputs_path.mkdir(parents=True, exist_ok=True)
+    except Exception as e:
+        console.print(f"[red]Error creating directories:[/red] {e}")
+        raise typer.Exit(1)
+
+    catalog_file = inputs_path / CATALOG_FILENAME
+
+    def regenerate(csv_path: Path) -> None:
+        output_path = outputs_path / generate_output_filename(csv_file_path=csv_path)
+        started = time.perf_counter()
+        try:
+            with route_lock(inputs_path, route_id_for_csv(csv_path)), job_workspace(outputs_path) as workspace:
+                csv_values = read_csv_to_array(str(csv_path))
+                Converter.generate_excel(str(workspace / output_path.name), csv_values, options)
+                publish(workspace / output_path.name, output_path)
+        except Exception as e:
+            console.print(f"[red]Error converting {csv_path.name}:[/red] {e}")
+            return
+        update_catalog(catalog_file, route_id_for_csv(csv_path), csv_path, output_path, csv_values, options)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        console.print(f"[green]✓[/green] {csv_path.name} → {output_path} ({elapsed_ms:.0f} ms)")
+
+    console.print(f"[cyan]Watching {inputs_path} for CSV changes, press Ctrl+C to stop[/cyan]")
+    try:
+        watch_directory(inputs_path, regenerate, debounce=debounce)
+    except KeyboardInterrupt:
+        console.print("[cyan]Stopped watching[/cyan]")
+
+
+@app.command()
+def enqueue(
+    sources: List[str] = typer.Argument(..., help="CSV files, RideWithGPS route URLs or route IDs to convert"),
+    queue_path: str = typer.Option(DEFAULT_QUEUE_PATH, "--queue", "-q", help="SQLite job queue file"),
+    xlsx_directory: str = typer.Option("outputs", "--xlsx-directory", "-x", help="Directory for XLSX files"),
+    island: bool = typer.Option(
+        False, "--island", "-i", help="Vancouver Island style: show distance from last control"
+    ),
+    show_direction_column: bool = typer.Option(
+        False, "--show-direction-column", "-sdc", help="Hide the direction column"
+    ),
+    two_decimals_precision: bool = typer.Option(
+        False, "--two-decimals-precision", "-tdp", help="Use two decimal places for distances"
+    ),
+    reproducible: bool = typer.Option(
+        False, "--reproducible", help="Pin the workbook's creation date, so identical input gives identical bytes"
+    ),
+) -> None:
+    """Add conversions to a job queue for 'worker' processes to run."""
+    options = build_generation_options(
+        island, show_direction_column, two_decimals_precision, verbose=False, reproducible=reproducible
+    )
+    outputs_path = Path(xlsx_directory).absolute()
+
+    jobs = []
+    for source in sources:
+        if source.startswith("https://"):
+            url_info = validate_ridewithgps_url(source)
+            jobs.append((url_info.id, outputs_path / generate_output_filename(url_info=url_info)))
+        elif source.isdigit():
+            url_info = validate_ridewithgps_url(f"https://ridewithgps.com/routes/{source}")
+            jobs.append((source, outputs_path / generate_output_filename(url_info=url_info)))
+        else:
+            csv_path = Path(validate_csv_file(source)).absolute()
+            jobs.append((str(csv_path), outputs_path / generate_output_filename(csv_file_path=csv_path)))
+
+    with JobQueue(queue_path) as queue:
+        for source, output_path in jobs:
+            job_id = queue.enqueue(source, str(output_path), options)
+            console.print(f"[green]✓[/green] Queued job {job_id}: {source} → {output_path}")
+
+
+@app.command()
+def worker(
+    queue_path: str = typer.Option(DEFAULT_QUEUE_PATH, "--queue", "-q", help="SQLite job queue file"),
+    csv_directory: str = typer.Option(
+        "files", "--csv-directory", "-c", help="Directory for CSV files downloaded for route ID jobs"
+    ),
+    lease_seconds: float = typer.Option(
+        DEFAULT_LEASE_SECONDS, "--lease", help="Seconds a claimed job is reserved before other workers retry it"
+    ),
+    max_attempts: int = typer.Option(DEFAULT_MAX_ATTEMPTS, "--max-attempts", help="Attempts before a job fails"),
+    wait: bool = typer.Option(False, "--wait", help="Keep waiting for new jobs instead of exiting when idle"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose output"),
+) -> None:
+    """Run queued conversions until the queue is empty; start several workers to share the load."""
+    if verbose:
+        enable_verbose_logging()
+
+    inputs_path = Path(csv_directory)
+    catalog_file = inputs_path / CATALOG_FILENAME
+
+    def load_csv(source: str) -> List[List[str]]:
+        if source.isdigit():
+            inputs_path.mkdir(parents=True, exist_ok=True)
+            return read_csv_to_array(str(save_route_csv(source, inputs_path)))
+        return read_csv_to_array(source)
+
+    def report(job: Job, duration: float, error: Optional[str], csv_values: Optional[List[List[str]]]) -> None:
+        if error or csv_values is None:
+            console.print(f"[red]✗[/red] Job {job.id} ({job.source}) failed after {duration:.2f}s: {error}")
+            return
+        console.print(f"[green]✓[/green] Job {job.id}: {job.output} ({duration:.2f}s)")
+
+        downloaded = job.source.isdigit()
+        csv_path = downloaded_csv_path(job.source, inputs_path) if downloaded else Path(job.source)
+        route_id = job.source if downloaded else route_id_for_csv(csv_path)
+        update_catalog(catalog_file, route_id, csv_path, Path(job.output), csv_values, job.options, downloaded)
+
+    with JobQueue(queue_path) as queue:
+        processed = run_worker(
+            queue,
+            load_csv,
+            lease_seconds=lease_seconds,
+            max_attempts=max_attempts,
+            wait=wait,
+            on_result=report,
+            lock_directory=inputs_path,
+        )
+        counts = queue.counts()
+
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    console.print(f"[cyan]Processed {processed} job(s). Queue: {summary or 'empty'}[/cyan]")
+
+
+@app.command()
+def catalog(
+    route_id: Optional[str] = typer.Argument(None, help="Only show this route"),
+    stale: bool = typer.Option(False, "--stale", help="Only list cuesheets generated from an outdated CSV"),
+    csv_directory: str = typer.Option("files", "--csv-directory", "-c", help="Directory for CSV files"),
+    catalog_path: Optional[str] = typer.Option(
+        None, "--catalog", help="Route catalog database [default: <csv-directory>/catalog.sqlite]"
+    ),
+) -> None:
+    """List catalogued routes and their cuesheets, flagging cuesheets that are out of date."""
+    catalog_file = Path(catalog_path) if catalog_path else Path(csv_directory) / CATALOG_FILENAME
+    if not catalog_file.exists():
+        console.print(f"[red]Error:[/red] No route catalog at {catalog_file}")
+        raise typer.Exit(1)
+
+    with RouteCatalog(catalog_file) as route_catalog:
+        routes = {route.route_id: route for route in route_catalog.routes()}
+        outputs = route_catalog.outputs(route_id, stale_only=stale)
+
+    table = Table("Route", "Distance (km)", "Cues", "Controls", "Status")
+    table.add_column("Cuesheet", overflow="fold")
+    for output in outputs:
+        summary = routes[output.route_id].summary
+        table.add_row(
+            output.route_id,
+            str(summary.total_distance),
+            str(summary.cue_count),
+            str(summary.control_count),
+            "[yellow]stale[/yellow]" if output.is_stale else "[green]current[/green]",
+            output.output_path,
+        )
+    console.print(table)
+
+
+@app.command()
+def index(
+    csv_directory: str = typer.Option("files", "--csv-directory", "-c", help="Directory for CSV files"),
+    index_path: Optional[str] = typer.Option(
+        None, "--index", help="Cue search index database [default: <csv-directory>/cue_index.sqlite]"
+    ),
+) -> None:
+    """Index the cues of every CSV in the CSV directory for `search`, re-reading only the CSVs that changed."""
+    csv_paths = csv_directory_files(csv_directory)
+    index_file = Path(index_path) if index_path else Path(csv_directory) / CUE_INDEX_FILENAME
+    with CueIndex(index_file) as cue_index:
+        update = refresh_index(cue_index, csv_paths, Converter.GenerationOptions())
+
+    for route_id, reason in update.failed.items():
+        console.print(f"[yellow]Warning:[/yellow] Route {route_id} not indexed: {reason}")
+    console.print(
+        f"[cyan]Indexed {len(update.indexed)} route(s), {update.unchanged} unchanged, {update.removed} removed, "
+        f"{len(update.failed)} failed[/cyan]"
+    )
+
+
+@app.command()
+def search(
+    query: str = typer.Argument(..., help="Words every matching cue contains, e.g. 'Lions Gate' or 'Hwy 99'"),
+    limit: int = typer.Option(50, "--limit", "-n", help="Maximum number of cues listed"),
+    raw: bool = typer.Option(False, "--raw", help='Use SQLite FTS5 query syntax (OR, NOT, prefix*, "phrases")'),
+    csv_directory: str = typer.Option("files", "--csv-directory", "-c", help="Directory for CSV files"),
+    index_path: Optional[str] = typer.Option(
+        None, "--index", help="Cue search index database [default: <csv-directory>/cue_index.sqlite]"
+    ),
+) -> None:
+    """Find the routes and cue distances whose cues match the query, using the index built by `index`."""
+    index_file = Path(index_path) if index_path else Path(csv_directory) / CUE_INDEX_FILENAME
+    if not index_file.exists():
+        console.print(f"[red]Error:[/red] No cue index at {index_file}, run the index command first")
+        raise typer.Exit(1)
+
+    started = time.perf_counter()
+    try:
+        with CueIndex(index_file) as cue_index:
+            matches = cue_index.search(query if raw else as_fts_query(query), limit)
+    except sqlite3.OperationalError as e:
+        console.print(f"[red]Error:[/red] Invalid search query: {e}")
+        raise typer.Exit(1)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    table = Table("Route", "Distance (km)", "Turn", "Cue")
+    for match in matches:
+        description = f"[bold]{match.description}[/bold]" if match.is_control else match.description
+        table.add_row(match.route_id, str(match.distance), match.turn, description)
+    console.print(table)
+    routes = len({match.route_id for match in matches})
+    console.print(f"[cyan]{len(matches)} cue(s) in {routes} route(s) ({elapsed_ms:.1f} ms)[/cyan]")
+
+
+@app.command()
+def duplicates(
+    threshold: float = typer.Option(
+        DEFAULT_THRESHOLD, "--threshold", "-t", min=0.01, max=1.0, help="Estimated cue similarity (0-1) to group at"
+    ),
+    csv_directory: str = typer.Option("files", "--csv-directory", "-c", help="Directory for CSV files"),
+) -> None:
+    """Group the routes in the CSV directory that are near-duplicates of each other (forks, detours, reversals)."""
+    csv_paths = csv_directory_files(csv_directory)
+    started = time.perf_counter()
+    signatures, failed = route_signatures(csv_paths, Converter.GenerationOptions())
+    groups = near_duplicate_groups(signatures, threshold)
+    elapsed = time.perf_counter() - started
+
+    for route_id, reason in failed.items():
+        console.print(f"[yellow]Warning:[/yellow] Route {route_id} skipped: {reason}")
+    table = Table("Group", "Similarity", "Routes")
+    for number, group in enumerate(groups, start=1):
+        table.add_row(str(number), f"{group.similarity:.0%}", ", ".join(group.route_ids))
+    console.print(table)
+    console.print(
+        f"[cyan]{len(groups)} group(s) of near-duplicates among {len(signatures)} route(s) ({elapsed:.1f} s)[/cyan]"
+    )
+
+
+@app.command("rule-stats")
+def rule_stats(
+    csv_directory: str = typer.Option("files", "--csv-directory", "-c", help="Directory for CSV files"),
+    top: int = typer.Option(20, "--top", "-n", min=1, help="Unknown directions and unmatched descriptions to list"),
+) -> None:
+    """Parse every CSV in the CSV directory and report how often each cue rewriting rule fires and what it costs."""
+    csv_paths = csv_directory_files(csv_directory)
+    parsed = 0
+    with Converter.collect_rule_telemetry() as telemetry:
+        for route_id, _, route in iter_parsed_routes(csv_paths, Converter.GenerationOptions()):
+            if isinstance(route, str):
+                console.print(f"[yellow]Warning:[/yellow] Route {route_id} skipped: {route}")
+                continue
+            parsed += 1
+
+    table = Table("Rule", "Tried", "Matched", "Hit rate", "Time (ms)", "ns/try")
+    for report in telemetry.rule_reports(Converter.DESCRIPTION_RULE_NAMES):
+        per_try = f"{report.seconds * 1e9 / report.attempts:.0f}" if report.attempts else "-"
+        table.add_row(
+            report.name,
+            str(report.attempts),
+            str(report.hits),
+            f"{report.hit_rate:.1%}",
+            f"{report.seconds * 1000:.3f}",
+            per_try,
+        )
+    console.print(table)
+
+    if telemetry.unknown_directions:
+        directions = Table("Unknown direction", "Cues")
+        for direction, count in telemetry.unknown_directions.most_common(top):
+            directions.add_row(direction, str(count))
+        console.print(directions)
+    if telemetry.unmatched_shapes:
+        shapes = Table("Unmatched description", "Cues")
+        for shape, count in telemetry.unmatched_shapes.most_common(top):
+            shapes.add_row(shape, str(count))
+        console.print(shapes)
+
+    unknown = sum(telemetry.unknown_directions.values())
+    console.print(
+        f"[cyan]{sum(telemetry.directions.values())} cue(s) of {parsed} route(s), "
+        f"{unknown} with an unknown direction[/cyan]"
+    )
+
+
+@app.command()
+def export(
+    output: str = typer.Argument(..., help="Parquet file to write, or Arrow IPC for .arrow/.feather/.ipc"),
+    csv_directory: str = typer.Option("files", "--csv-directory", "-c", help="Directory for CSV files"),
+) -> None:
+    """Export the parsed cues of every CSV in the CSV directory to one Parquet or Arrow file, for pandas or DuckDB."""
+    csv_paths = csv_directory_files(csv_directory)
+    output_path = Path(output)
+    started = time.perf_counter()
+    try:
+        with job_workspace(output_path.absolute().parent) as workspace:
+            partial_path = workspace / output_path.name
+            with CueExporter(partial_path, export_format_for(output_path)) as exporter:
+                result = export_routes(exporter, csv_paths, Converter.GenerationOptions())
+            publish(partial_path, output_path)
+    except PyArrowNotInstalledError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    elapsed = time.perf_counter() - started
+
+    for route_id, reason in result.failed.items():
+        console.print(f"[yellow]Warning:[/yellow] Route {route_id} not exported: {reason}")
+    console.print(
+        f"[cyan]Exported {result.cue_count} cue(s) of {len(result.exported)} route(s) to {output_path} "
+        f"({elapsed:.1f} s)[/cyan]"
+    )
+
+
+@app.command()
+def batch(
+    sources: Optional[List[str]] = typer.Argument(
+        None, help="CSV files to convert [default: every CSV in the CSV directory]"
+    ),
+    csv_directory: str = typer.Option("files", "--csv-directory", "-c", help="Directory for CSV files"),
+    xlsx_directory: str = typer.Option("outputs", "--xlsx-directory", "-x", help="Directory for XLSX files"),
+    island: bool = typer.Option(
+        False, "--island", "-i", help="Vancouver Island style: show distance from last control"
+    ),
+    show_direction_column: bool = typer.Option(
+        False, "--show-direction-column", "-sdc", help="Hide the direction column"
+    ),
+    two_decimals_precision: bool = typer.Option(
+        False, "--two-decimals-precision", "-tdp", help="Use two decimal places for distances"
+    ),
+    reproducible: bool = typer.Option(
+        False, "--reproducible", help="Pin the workbook's creation date, so identical input gives identical bytes"
+    ),
+    elevation_chart: bool = typer.Option(
+        False, "--elevation-chart", "-e", help="Add an elevation profile with control markers below the cues"
+    ),
+    parsers: Optional[int] = typer.Option(
+        None, "--parsers", min=1, help="Processes parsing routes [default: one per 6 CPUs]"
+    ),
+    renderers: Optional[int] = typer.Option(
+        None, "--renderers", min=1, help="Processes writing workbooks [default: the remaining CPUs]"
+    ),
+    queue_size: int = typer.Option(
+        DEFAULT_PIPELINE_QUEUE_SIZE, "--queue-size", min=1, help="Parsed routes waiting for a renderer at most"
+    ),
+) -> None:
+    """Convert many CSVs at once, with separate parsing and rendering processes working side by side."""
+    inputs_path, outputs_path = Path(csv_directory), Path(xlsx_directory)
+    if sources:
+        csv_paths = [Path(validate_csv_file(source)) for source in sources]
+    else:
+        csv_paths = sorted(inputs_path.glob("*.csv"))
+    if not csv_paths:
+        console.print(f"[red]Error:[/red] No CSV files to convert in {inputs_path}")
+        raise typer.Exit(1)
+
+    options = build_generation_options(
+        island,
+        show_direction_column,
+        two_decimals_precision,
+        verbose=False,
+        elevation_chart=elevation_chart,
+        reproducible=reproducible,
+    )
+    cpus = os.cpu_count() or 1
+    parsers = parsers or max(1, round(cpus / 6))
+    renderers = renderers or max(1, cpus - parsers)
+    inputs_path.mkdir(parents=True, exist_ok=True)
+    outputs_path.mkdir(parents=True, exist_ok=True)
+    jobs = [
+        PipelineJob(csv_path, outputs_path / generate_output_filename(csv_file_path=csv_path), options)
+        for csv_path in csv_paths
+    ]
+
+    started = time.perf_counter()
+    failures = 0
+    with RouteCatalog(inputs_path / CATALOG_FILENAME) as route_catalog:
+        for result in run_pipeline(jobs, parsers, renderers, queue_size, lock_directory=inputs_path):
+            csv_path = result.job.csv_path
+            if result.summary is None:
+                failures += 1
+                console.print(f"[red]✗[/red] {csv_path}: {result.error}")
+                continue
+            route_id = route_id_for_csv(csv_path)
+            route_catalog.record_csv(route_id, csv_path, result.summary)
+            route_catalog.record_output(route_id, result.job.output_path)
+            console.print(f"[green]✓[/green] {csv_path} → {result.job.output_path} ({result.seconds:.2f}s)")
+    elapsed = time.perf_counter() - started
+
+    console.print(
+        f"[cyan]Converted {len(jobs) - failures} route(s), {failures} failed, with {parsers} parser(s) and "
+        f"{renderers} renderer(s) ({elapsed:.1f} s)[/cyan]"
+    )
+    if failures:
+        raise typer.Exit(1)
+
+
+@app.command()
+def sync(
+    user: Optional[str] = typer.Option(None, "--user", help="RideWithGPS user ID whose routes to sync"),
+    club: Optional[str] = typer.Option(None, "--club", help="RideWithGPS club ID whose routes to sync"),
+    csv_directory: str = typer.Option("files", "--csv-directory", "-c", help="Directory for CSV files"),
+    xlsx_directory: str = typer.Option("outputs", "--xlsx-directory", "-x", help="Directory for XLSX files"),
+    island: bool = typer.Option(
+        False, "--island", "-i", help="Vancouver Island style: show distance from last control"
+    ),
+    show_direction_column: bool = typer.Option(
+        False, "--show-direction-column", "-sdc", help="Hide the direction column"
+    ),
+    two_decimals_precision: bool = typer.Option(
+        False, "--two-decimals-precision", "-tdp", help="Use two decimal places for distances"
+    ),
+    reproducible: bool = typer.Option(
+        False, "--reproducible", help="Pin the workbook's creation date, so identical input gives identical bytes"
+    ),
+    concurrency: int = typer.Option(
+        DEFAULT_SYNC_CONCURRENCY, "--concurrency", "-j", help="Routes downloaded and converted at the same time"
+    ),
+    force: bool = typer.Option(False, "--force", help="Download and regenerate every route, changed or not"),
+    catalog_path: Optional[str] = typer.Option(
+        None, "--catalog", help="Route catalog database [default: <csv-directory>/catalog.sqlite]"
+    ),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose output"),
+) -> None:
+    """Download and regenerate the routes of a user or club that are new or changed since the last sync."""
+    if bool(user) == bool(club):
+        console.print("[red]Error:[/red] Provide exactly one of --user or --club")
+        raise typer.Exit(1)
+
+    if verbose:
+        enable_verbose_logging()
+
+    inputs_path, outputs_path = Path(csv_directory), Path(xlsx_directory)
+    inputs_path.mkdir(parents=True, exist_ok=True)
+    outputs_path.mkdir(parents=True, exist_ok=True)
+    catalog_file = Path(catalog_path) if catalog_path else inputs_path / CATALOG_FILENAME
+    options = build_generation_options(
+        island, show_direction_column, two_decimals_precision, verbose, reproducible=reproducible
+    )
+    owner: Literal["users", "clubs"] = "users" if user else "clubs"
+    owner_id = user or club
+
+    try:
+        listing = with_auth_token(lambda auth_token: list(iter_route_listing(owner, owner_id or "", auth_token)))
+    except (requests.RequestException, FileNotFoundError, ValueError, NoCredentialsError, AuthTokenExpiredError) as e:
+        console.print(f"[red]Could not list the routes of {owner}/{owner_id}:[/red] {e}")
+        raise typer.Exit(1)
+
+    def output_path_for(route: RouteListing) -> Path:
+        return outputs_path / f"{route.route_id}_cues.xlsx"
+
+    with RouteCatalog(catalog_file) as route_catalog:
+        synced = {} if force else route_catalog.synced_versions()
+    changed = [
+        route
+        for route in listing
+        if synced.get(route.route_id) != route.updated_at or not output_path_for(route).exists()
+    ]
+    console.print(f"[cyan]{len(listing)} route(s) listed, {len(changed)} new or changed[/cyan]")
+
+    def refresh(route: RouteListing) -> List[List[str]]:
+        with route_lock(inputs_path, route.route_id), job_workspace(outputs_path) as workspace:
+            csv_values = read_csv_to_array(str(save_route_csv(route.route_id, inputs_path)))
+            generated = workspace / output_path_for(route).name
+            Converter.generate_excel(str(generated), csv_values, options)
+            publish(generated, output_path_for(route))
+        return csv_values
+
+    failures = 0
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        futures = {executor.submit(refresh, route): route for route in changed}
+        with RouteCatalog(catalog_file) as route_catalog:
+            for future in as_completed(futures):
+                route = futures[future]
+                try:
+                    csv_values = future.result()
+                except Exception as e:
+                    failures += 1
+                    console.print(f"[red]✗[/red] Route {route.route_id} ({route.name}): {e}")
+                    continue
+
+                summary = Converter.summarize_route(csv_values, options)
+                csv_path = downloaded_csv_path(route.route_id, inputs_path)
+                route_catalog.record_csv(route.route_id, csv_path, summary, downloaded_at=time.time())
+                route_catalog.record_output(route.route_id, output_path_for(route))
+                route_catalog.record_sync(route.route_id, route.updated_at)
+                console.print(f"[green]✓[/green] Route {route.route_id} ({route.name}) → {output_path_for(route)}")
+
+    console.print(f"[cyan]Synced {len(changed) - failures} route(s), {failures} failed[/cyan]")
+    if failures:
+        raise typer.Exit(1)
+
+
+@app.command("brevet-card")
+def brevet_card(
+    filename: str = typer.Argument(
+        ..., help="CSV file of the route, or - for stdin", callback=lambda v: validate_csv_file(v)
+    ),
+    card_format: str = typer.Option("json", "--format", "-F", help="Output format: json or csv"),
+    brevet_distance: Optional[int] = typer.Option(
+        None,
+        "--brevet-distance",
+        "-d",
+        help=f"Brevet distance in km ({', '.join(map(str, BREVET_TIME_LIMITS))}) [default: nearest to the route]",
+    ),
+    start: Optional[str] = typer.Option(
+        None, "--start", help="Start date and time (e.g. 2024-05-04T06:00) to print clock times instead of elapsed"
+    ),
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Write to this file instead of stdout"),
+) -> None:
+    """Print the controls of a route with their distances and ACP/RUSA opening and closing times."""
+    if card_format not in ("json", "csv"):
+        raise typer.BadParameter(f"Format must be json or csv, got: {card_format}")
+    output_format: BrevetCardFormat = "json" if card_format == "json" else "csv"
+    try:
+        start_time = datetime.fromisoformat(start) if start else None
+    except ValueError:
+        raise typer.BadParameter(f"Start must be an ISO date and time like 2024-05-04T06:00, got: {start}")
+
+    try:
+        rows = iter_csv_stream(sys.stdin.buffer) if filename == STDIO_PATH else iter_csv_rows(filename)
+        controls = extract_controls(rows, Converter.GenerationOptions(), brevet_distance)
+    except ValueError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+
+    if output:
+        with open(output, "w", encoding="utf-8", newline="") as card_file:
+            write_brevet_card(controls, card_file, output_format, start_time)
+        console.print(f"[green]✓[/green] Brevet card with {len(controls)} controls saved to: {output}")
+    else:
+        write_brevet_card(controls, sys.stdout, output_format, start_time)
+
+
+class ConsoleHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        # colours from https://rich.readthedocs.io/en/stable/appendix/colors.html?highlight=color
+        if record.levelno <= logging.DEBUG:
+            console.print(record.getMessage(), style="medium_purple4", markup=False, highlight=False)
+        elif record.levelno <= logging.WARNING:
+            console.print(record.getMessage(), style="slate_blue3", markup=False, highlight=False)
+
+
+def enable_verbose_logging() -> None:
+    """Print the package's log records on the console, from a background thread so logging does not slow the work."""
+    console.print("[cyan]Running in verbose mode[/cyan]")
+
+    console_handler = ConsoleHandler()
+    console_handler.setLevel(logging.DEBUG)
+    start_queued_logging(console_handler)
+
+
+def build_generation_options(
+    island: bool,
+    show_direction_column: bool,
+    two_decimals_precision: bool,
+    verbose: bool,
+    elevation_chart: bool = False,
+    reproducible: bool = False,
+) -> Converter.GenerationOptions:
+    features = []
+    if island:
+        features.append("include distance from last control")
+    if show_direction_column:
+        features.append("show direction column")
+    if elevation_chart:
+        features.append("include an elevation profile")
+
+    if features:
+        console.print(f"[cyan]Cuesheet will:[/cyan] {', '.join(features)}")
+
+    return Converter.GenerationOptions(
+        include_distance_from_last=island,
+        two_decimals_precision=two_decimals_precision,
+        hide_direction=not show_direction_column,
+        verbose=verbose,
+        include_elevation_chart=elevation_chart,
+        reproducible=reproducible,
+    )
+
+
+def parse_variant(spec: str, base: Converter.GenerationOptions) -> Tuple[str, Converter.GenerationOptions]:
+    """Parse a --variant spec such as 'island,direction' into its name and the options it renders with."""
+    features = [feature.strip().lower() for feature in re.split(r"[,+]", spec) if feature.strip()]
+    unknown = [feature for feature in features if feature not in VARIANT_FEATURES]
+    if not features or unknown:
+        raise typer.BadParameter(
+            f"Unknown variant '{spec}', combine these features with commas: {', '.join(VARIANT_FEATURES)}"
+        )
+
+    overrides: Dict[str, Any] = {}
+    for feature in features:
+        overrides.update(VARIANT_FEATURES[feature])
+    return "-".join(features), dataclasses.replace(base, **overrides)
+
+
+def variant_output_filename(excel_filename: str, variant_name: str) -> str:
+    path = Path(excel_filename)
+    return str(path.with_name(f"{path.stem}_{variant_name}{path.suffix or '.xlsx'}"))
+
+
+def validate_pipe_format(value: str) -> str:
+    if value not in get_args(PipeFormat):
+        raise typer.BadParameter(f"Format must be xlsx or ndjson, got: {value}")
+    return value
+
+
 def validate_csv_file(value: str) -> str:
+    if value == STDIO_PATH:
+        return value
     if not value.endswith(".csv"):
         raise typer.BadParameter(f"File must be a CSV file, got: {value}")
 
@@ -125,6 +890,15 @@ def validate_csv_file(value: str) -> str:
     return value
 
 
+def csv_directory_files(csv_directory: str) -> List[Path]:
+    """The CSVs in the CSV directory, exiting with an error if there is no such directory."""
+    inputs_path = Path(csv_directory)
+    if not inputs_path.is_dir():
+        console.print(f"[red]Error:[/red] No CSV directory at {inputs_path}")
+        raise typer.Exit(1)
+    return sorted(inputs_path.glob("*.csv"))
+
+
 @dataclass(frozen=True)
 class RideWithGpsUrl:
     url: str
@@ -150,38 +924,88 @@ def validate_ridewithgps_url(value: str) -> RideWithGpsUrl:
     )
 
 
-def download_route(url_info: RideWithGpsUrl, outputs_path: Path, verbose: bool = False) -> Path:
+def download_route(
+    url_info: RideWithGpsUrl, outputs_path: Path, verbose: bool = False, from_route_json: bool = False
+) -> Path:
     """Download route data from RideWithGPS URL."""
 
-    output_file = outputs_path / f"downloaded_cues_for_{url_info.id}.csv"
+    output_file = downloaded_csv_path(url_info.id, outputs_path)
 
     if verbose:
         console.print(f"[cyan]Downloading route from {url_info.url}...[/cyan]")
         console.print(f"[cyan]Saving to:[/cyan] {output_file}")
 
     try:
-        credentials = load_credentials()
-        auth_token = authenticate(
-            email=credentials.username,
-            password=credentials.password,
-            session_name=f"ridewithgps-to-cuesheet-download-of-route-{url_info.id}",
-        )
-        csv_content = download_csv_content(url_info.id, auth_token)
-
-        with open(output_file.absolute(), "w", encoding="utf-8") as tmp_file:
-            tmp_file.write(csv_content)
+        save_route_csv(url_info.id, outputs_path, from_route_json)
 
         if verbose:
             console.print("[green]✓[/green] Download completed successfully")
 
         return output_file
 
-    except (FileNotFoundError, ValueError) as e:
+    except (FileNotFoundError, ValueError, NoCredentialsError, AuthTokenExpiredError) as e:
         console.print(f"[red]Authentication error:[/red] {e}")
         raise typer.Exit(1)
 
 
-def run_conversion(input_csv: str, output_xlsx: str, options: Converter.GenerationOptions) -> None:
+def downloaded_csv_path(route_id: str, directory: Path) -> Path:
+    return directory / f"downloaded_cues_for_{route_id}.csv"
+
+
+def save_route_csv(route_id: str, directory: Path, from_route_json: bool = False) -> Path:
+    """Download a route's CSV export (or a CSV built from its JSON) into `directory` and return its path."""
+    output_file = downloaded_csv_path(route_id, directory)
+    atomic_write_text(output_file, download_route_csv(route_id, from_route_json))
+    return output_file
+
+
+def download_route_csv(route_id: str, from_route_json: bool = False) -> str:
+    """A route's CSV export, or a CSV built from its JSON, as text."""
+    if from_route_json:
+        route = with_auth_token(lambda auth_token: download_route_json(route_id, auth_token))
+        csv_buffer = io.StringIO()
+        writer = csv.writer(csv_buffer)
+        writer.writerow(CSV_EXPORT_HEADER)
+        writer.writerows(route.to_csv_values())
+        return csv_buffer.getvalue()
+
+    return with_auth_token(lambda auth_token: download_csv_content(route_id, auth_token))
+
+
+def get_auth_token(refresh: bool = False) -> AuthToken:
+    """Return the cached auth token, authenticating with the .env credentials if needed."""
+    if not refresh:
+        cached_token = load_cached_auth_token()
+        if cached_token:
+            return cached_token
+
+    clear_cached_auth_token()
+    credentials = load_credentials()
+    auth_token = authenticate(email=credentials.username, password=credentials.password)
+    save_cached_auth_token(auth_token)
+    return auth_token
+
+
+def with_auth_token(request: Callable[[AuthToken], T]) -> T:
+    """Run an authenticated request, re-authenticating once if the cached token has expired."""
+    auth_token = get_auth_token()
+    try:
+        return request(auth_token)
+    except AuthTokenExpiredError:
+        return request(refresh_auth_token(auth_token))
+
+
+def refresh_auth_token(rejected: AuthToken) -> AuthToken:
+    """Re-authenticate after `rejected` was refused, unless another thread already replaced it meanwhile."""
+    with _auth_refresh_lock:
+        cached_token = load_cached_auth_token()
+        if cached_token and cached_token != rejected:
+            return cached_token
+        logger.debug("Cached auth token was rejected, re-authenticating")
+        return get_auth_token(refresh=True)
+
+
+def run_conversion(input_csv: str, output_xlsx: str, options: Converter.GenerationOptions) -> List[List[str]]:
     console.print("[cyan]Reading CSV file...[/cyan]")
 
     try:
@@ -194,22 +1018,174 @@ def run_conversion(input_csv: str, output_xlsx: str, options: Converter.Generati
         )
 
         console.print("[green]✓[/green] Conversion completed successfully!")
+        return values_array
 
+    except Converter.InvalidRouteError as e:
+        report_invalid_route(input_csv, e)
+        raise typer.Exit(1)
     except Exception as e:
         console.print(f"[red]Error during conversion:[/red] {e}")
         raise typer.Exit(1)
 
 
-def organize_output_files(
-    excel_filename: str, inputs_path: Path, outputs_path: Path, csv_file_path: Optional[Path] = None
+def run_variant_conversion(
+    input_csv: str, outputs: List[Tuple[str, Converter.GenerationOptions]], parallel: bool = False
+) -> List[List[str]]:
+    console.print("[cyan]Reading CSV file...[/cyan]")
+
+    try:
+        values_array = read_csv_to_array(input_csv)
+        console.print(f"[cyan]Generating {len(outputs)} Excel files...[/cyan]")
+        if parallel:
+            with ProcessPoolExecutor(max_workers=min(len(outputs), os.cpu_count() or 1)) as executor:
+                Converter.generate_excel_variants(values_array, outputs, executor)
+        else:
+            Converter.generate_excel_variants(values_array, outputs)
+
+        console.print("[green]✓[/green] Conversion completed successfully!")
+        return values_array
+
+    except Converter.InvalidRouteError as e:
+        report_invalid_route(input_csv, e)
+        raise typer.Exit(1)
+    except Exception as e:
+        console.print(f"[red]Error during conversion:[/red] {e}")
+        raise typer.Exit(1)
+
+
+def preview_route(
+    file_path: Optional[Path],
+    url_info: Optional[RideWithGpsUrl],
+    inputs_path: Path,
+    options: Converter.GenerationOptions,
+    verbose: bool,
+    from_route_json: bool = False,
 ) -> None:
-    """Move generated files to appropriate directories."""
+    """Print the cuesheet as a table; a downloaded route is only kept in a scratch workspace."""
+    inputs_path.mkdir(parents=True, exist_ok=True)
+    with job_workspace(inputs_path) as workspace:
+        csv_filename = prepare_csv_file(file_path, url_info, workspace, verbose, from_route_json)
+        try:
+            route = Converter.prepare_route(read_csv_to_array(str(csv_filename)), options)
+        except Converter.InvalidRouteError as e:
+            report_invalid_route(str(csv_filename), e)
+            raise typer.Exit(1)
+        except Exception as e:
+            console.print(f"[red]Error during conversion:[/red] {e}")
+            raise typer.Exit(1)
+
+    console.print(cuesheet_preview(route, options))
+
+
+def check_output_mode(piping: bool, output_format: str, preview_or_variants: bool) -> None:
+    if piping and preview_or_variants:
+        console.print("[red]Error:[/red] --preview and --variant cannot be combined with stdin or stdout")
+        raise typer.Exit(1)
+    if not piping and output_format != "xlsx":
+        console.print("[red]Error:[/red] --format ndjson is only written with --filename - or --output -")
+        raise typer.Exit(1)
+
+
+def convert_through_pipe(
+    file_path: Optional[Path],
+    url_info: Optional[RideWithGpsUrl],
+    output: Optional[str],
+    output_format: PipeFormat,
+    options: Converter.GenerationOptions,
+    from_route_json: bool = False,
+) -> None:
+    """
+    Convert a route read from stdin, a file or a download, writing the cuesheet to stdout (when `output` is - or
+    missing) or straight to `output`. Nothing else is written and no directories are created.
+    """
+    target = piped_output_target(output, output_format)
     try:
-        # Move Excel file to outputs directory
-        output_path = outputs_path / excel_filename
-        if Path(excel_filename).exists():
-            Path(excel_filename).rename(output_path)
-            console.print(f"[green]✓[/green] Output saved to: {output_path}")
+        csv_values = read_piped_route(file_path, url_info, from_route_json)
+        if output_format == "ndjson":
+            cues = Converter.parse_route(csv_values, options)
+        else:
+            workbook = Converter.generate_excel_bytes(csv_values, options)
+    except (NoCredentialsError, AuthTokenExpiredError) as e:
+        console.print(f"[red]Authentication error:[/red] {e}")
+        raise typer.Exit(1)
+    except Converter.InvalidRouteError as e:
+        source = url_info.url if url_info else "<stdin>" if file_path == Path(STDIO_PATH) else str(file_path)
+        report_invalid_route(source, e)
+        raise typer.Exit(1)
+    except Exception as e:
+        console.print(f"[red]Error during conversion:[/red] {e}")
+        raise typer.Exit(1)
+
+    if target is None:
+        if output_format == "xlsx":
+            sys.stdout.buffer.write(workbook)
+            sys.stdout.buffer.flush()
+        else:
+            write_cue_stream(cues, sys.stdout)
+            sys.stdout.flush()
+        return
+
+    try:
+        if output_format == "xlsx":
+            target.write_bytes(workbook)
+        else:
+            with open(target, "w", encoding="utf-8", newline="") as cue_file:
+                write_cue_stream(cues, cue_file)
+    except OSError as e:
+        console.print(f"[red]Error:[/red] Could not write {target}: {e}")
+        raise typer.Exit(1)
+
+
+def piped_output_target(output: Optional[str], output_format: PipeFormat) -> Optional[Path]:
+    """The file to write the cuesheet to, or None for stdout; exits if it cannot be written there."""
+    target = None if output in (None, STDIO_PATH) else Path(str(output))
+    if target is None and output_format == "xlsx" and sys.stdout.isatty():
+        console.print("[red]Error:[/red] Not writing a workbook to a terminal; redirect stdout or use --format ndjson")
+        raise typer.Exit(1)
+    if target is not None and not target.parent.is_dir():
+        console.print(f"[red]Error:[/red] No directory {target.parent} to write {target.name} in")
+        raise typer.Exit(1)
+    return target
+
+
+def read_piped_route(
+    file_path: Optional[Path], url_info: Optional[RideWithGpsUrl], from_route_json: bool
+) -> List[List[str]]:
+    """The CSV rows of a download (kept in memory), stdin, or a file, without the header."""
+    if url_info:
+        return list(csv.reader(io.StringIO(download_route_csv(url_info.id, from_route_json))))[1:]
+    if file_path == Path(STDIO_PATH):
+        return list(iter_csv_stream(sys.stdin.buffer))
+    return read_csv_to_array(str(file_path))
+
+
+def restore_console_to_stdout() -> None:
+    # verbose records still queued are printed first, while the console still writes to stderr
+    stop_queued_logging()
+    console.stderr = False
+
+
+def report_invalid_route(input_csv: str, error: Converter.InvalidRouteError) -> None:
+    console.print(f"[red]{input_csv} has {len(error.issues)} invalid cue(s), no cuesheet was written:[/red]")
+    for issue in error.issues:
+        console.print(f"  {issue}")
+
+
+def organize_output_files(
+    workspace: Path,
+    excel_filenames: List[str],
+    inputs_path: Path,
+    outputs_path: Path,
+    csv_file_path: Optional[Path] = None,
+) -> Optional[Path]:
+    """Publish generated files from the job workspace and move the input CSV, returning where the CSV ends up."""
+    try:
+        # Atomically replace the Excel files in the outputs directory
+        for excel_filename in excel_filenames:
+            generated = workspace / Path(excel_filename).name
+            if generated.exists():
+                output_path = publish(generated, outputs_path / excel_filename)
+                console.print(f"[green]✓[/green] Output saved to: {output_path}")
 
         if csv_file_path:
             is_csv_in_input_dir = inputs_path in csv_file_path.parents
@@ -218,10 +1194,32 @@ def organize_output_files(
                 if csv_file_path.exists():
                     csv_file_path.rename(moved_csv_path)
                     console.print(f"[green]✓[/green] Input CSV moved to: {moved_csv_path}")
+                    return moved_csv_path
 
     except OSError as e:
         console.print(f"[yellow]Warning:[/yellow] Could not organize files: {e}")
 
+    return csv_file_path
+
+
+def update_catalog(
+    catalog_path: Path,
+    route_id: str,
+    csv_path: Path,
+    output_path: Path,
+    csv_values: List[List[str]],
+    options: Converter.GenerationOptions,
+    downloaded: bool = False,
+) -> None:
+    """Record a converted route and its cuesheet in the route catalog; failures only warn."""
+    try:
+        with RouteCatalog(catalog_path) as catalog:
+            summary = Converter.summarize_route(csv_values, options)
+            catalog.record_csv(route_id, csv_path, summary, downloaded_at=time.time() if downloaded else None)
+            catalog.record_output(route_id, output_path)
+    except (sqlite3.Error, OSError) as e:
+        console.print(f"[yellow]Warning:[/yellow] Could not update route catalog: {e}")
+
 
 def generate_output_filename(
     url_info: Optional[RideWithGpsUrl] = None, csv_file_path: Optional[Path] = None, custom_output: Optional[str] = None
@@ -233,9 +1231,8 @@ def generate_output_filename(
     elif csv_file_path:
         return f"{csv_file_path.stem}_cues.xlsx"
     logger.warning(
-        "No output filename provided, "
-        f"will {'overwrite' if Path('output_cues.xlsx').exists() else 'default to'}"
-        " 'output_cues.xlsx'"
+        "No output filename provided, will %s 'output_cues.xlsx'",
+        "overwrite" if Path("output_cues.xlsx").exists() else "default to",
     )
     return "output_cues.xlsx"
 
@@ -262,11 +1259,15 @@ def validate_inputs(filename: Optional[str], url: Optional[str]) -> tuple[Option
 
 
 def prepare_csv_file(
-    file_path: Optional[Path], url_info: Optional[RideWithGpsUrl], outputs_path: Path, verbose: bool
+    file_path: Optional[Path],
+    url_info: Optional[RideWithGpsUrl],
+    outputs_path: Path,
+    verbose: bool,
+    from_route_json: bool = False,
 ) -> Path:
     csv_filename = file_path
     if url_info:
-        csv_filename = download_route(url_info, outputs_path, verbose)
+        csv_filename = download_route(url_info, outputs_path, verbose, from_route_json)
 
     # Ensure we have a valid CSV filename at this point
     if not csv_filename:
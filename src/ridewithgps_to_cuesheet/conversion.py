@@ -1,20 +1,37 @@
 from __future__ import annotations
 
+import io
 import re
-from dataclasses import dataclass, field
+import time
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
 from decimal import Decimal
-from typing import List, Literal
-
-import xlsxwriter
-from xlsxwriter.format import Format
-from xlsxwriter.worksheet import Worksheet
+from typing import IO, Any, Callable, Dict, Iterator, List, Literal, Optional, Sequence, Tuple, Union
 
 from .logger import logger
+from .telemetry import FALLBACK_RULE, RuleTelemetry
+from .text_metrics import excel_column_width_to_points, wrapped_line_count
 
 # Excel formatting constants
 DISTANCE_THRESHOLD_FOR_WIDE_COLUMN = 1000
 CONTROL_ROW_HEIGHT: Literal[25] = 25
 REGULAR_ROW_HEIGHT: Literal[15] = 15
+LINE_HEIGHT = 15  # each extra wrapped line of Arial 12
+DESCRIPTION_COLUMN_WIDTH = 39
+CUE_FONT_SIZE = 12
+
+# Page layout constants, in points: US Letter with xlsxwriter's default 0.75" top and bottom margins
+LETTER_PRINTABLE_HEIGHT = 11 * 72 - 2 * 0.75 * 72
+HEADER_BLOCK_HEIGHT = 5 * 15.75 + 50  # event detail rows plus the rotated column titles
+
+
+def _reduce_frozen(instance: Any) -> Tuple[Any, ...]:
+    """Pickle a frozen dataclass as a call to its constructor.
+
+    The mypyc-compiled classes refuse the field assignments of the default unpickling, which breaks process pools.
+    """
+    return type(instance), tuple(getattr(instance, item.name) for item in fields(instance))
 
 
 @dataclass(frozen=True)
@@ -26,6 +43,9 @@ class EventDetails:
     start_location: str = "Insert Start location"
     finish_location: str | None = "Insert Finish location"
 
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _reduce_frozen(self)
+
 
 @dataclass(frozen=True)
 class GenerationOptions:
@@ -38,22 +58,15 @@ class GenerationOptions:
     start_text: str = "DÉPART"
     end_text: str = "ARRIVÉE"
     page_break_row_interval: int = 40
+    printable_page_height: float = LETTER_PRINTABLE_HEIGHT
+    min_page_fill_for_control_break: float = 0.5
+    include_elevation_chart: bool = False
+    elevation_chart_points: int = 250
     event_details: EventDetails = field(default_factory=EventDetails)
+    reproducible: bool = False  # pin the workbook's creation date, so identical input gives identical bytes
 
-
-@dataclass(frozen=True)
-class _Formats:
-    title_format: Format
-    description_format: Format
-    control_format: Format
-    arial_12: Format
-    arial_12_no_border: Format
-    dist_format: Format
-    dist_since_format: Format
-    cue_format: Format
-    red_title: Format
-    black_title: Format
-    danger_format: Format
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _reduce_frozen(self)
 
 
 @dataclass(frozen=True)
@@ -66,266 +79,304 @@ class Cue:
     is_end: bool = False
     last_dist: Decimal = Decimal("0.0")
 
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _reduce_frozen(self)
 
-def generate_excel(filename: str, csv_values: List[List[str]], opts: GenerationOptions):
-    cues = _parse_to_cues(csv_values, opts)
-    assert cues, "No turns found in the provided CSV data."
-    try:
-        workbook = xlsxwriter.Workbook(filename)
-        worksheet = workbook.add_worksheet()
-
-        formats = _create_excel_formats(workbook, opts.two_decimals_precision)
-        last_col_letter, last_header_row = _setup_worksheet_headers(worksheet, formats, opts, cues)
-
-        # Data processing variables
-        row_num = last_header_row
-        ctrl_sum = Decimal("0.0")
-        last_dist = Decimal("0.0")
-        page_break_list = []
-        last_row_was_control = False
-
-        for cue_num, turn in enumerate(cues):
-            curr_dist = turn.dist - last_dist
-            last_dist = Decimal("0.0")
-
-            if opts.verbose:
-                logger.debug(f"{turn.description}: We're on turn {cue_num} at {turn.dist}km\n"
-                             f"\testimated distance is {curr_dist}km since last")
-
-            _write_data_row(
-                worksheet,
-                turn,
-                cue_num,
-                row_num,
-                last_col_letter,
-                last_row_was_control,
-                ctrl_sum,
-                curr_dist,
-                formats,
-                opts,
-            )
-
-            if turn.is_control:
-                ctrl_sum = Decimal("0.0")
-                last_row_was_control = True
-                last_dist -= curr_dist
-                page_break_list.append(row_num + 1)
-            else:
-                last_row_was_control = False
-                ctrl_sum += curr_dist
-                if page_break_list and (row_num - page_break_list[-1]) == opts.page_break_row_interval:
-                    page_break_list.append(row_num)
 
-            last_dist += turn.dist
-            row_num += 1
+@dataclass(frozen=True)
+class RouteSummary:
+    total_distance: Decimal
+    cue_count: int
+    control_count: int
 
-        final_row = _add_footer_information(worksheet, row_num, last_col_letter, formats)
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _reduce_frozen(self)
 
-        # Printing setup
-        worksheet.print_area("A1:{0}{1}".format(last_col_letter, final_row))
-        if len(page_break_list) > 2:
-            page_break_list = page_break_list[1:-1]
-            worksheet.set_h_pagebreaks(page_break_list)
 
-    finally:
-        if workbook is not None:
-            workbook.close()
-
-
-def _create_excel_formats(workbook: xlsxwriter.Workbook, two_decimals_for_dist: bool) -> _Formats:
-    defaults = {"font_size": 8, "font_name": "Arial"}
-    a_12_opts = {"font_size": 12, "font_name": "Arial"}
-    centered = {"align": "center", "valign": "vcenter", "text_wrap": True}
-    float_top = {"valign": "top"}
-    all_border = {"border": 1}
-
-    return _Formats(
-        title_format=workbook.add_format({**{"rotation": 90}, **defaults, **all_border}),
-        description_format=workbook.add_format({**centered, **defaults, **all_border}),
-        control_format=workbook.add_format(
-            {
-                **{"bold": True, "bg_color": "#C0C0C0", "text_wrap": True},
-                **centered,
-                **a_12_opts,
-                **all_border,
-            }
-        ),
-        arial_12=workbook.add_format({**a_12_opts, **float_top, **all_border}),
-        arial_12_no_border=workbook.add_format(
-            {**a_12_opts, **all_border, **{"left_color": "white", "right_color": "white"}}
-        ),
-        dist_format=workbook.add_format(
-            {**{"num_format": "0.00" if two_decimals_for_dist else "0.0"}, **float_top, **a_12_opts, **all_border}
-        ),
-        dist_since_format=workbook.add_format({**{"num_format": "0.0"}, **float_top, **a_12_opts, **all_border}),
-        cue_format=workbook.add_format({**{"text_wrap": True}, **float_top, **a_12_opts, **all_border}),
-        red_title=workbook.add_format({**{"font_color": "red"}, **a_12_opts, **centered}),
-        black_title=workbook.add_format({**{"font_color": "black"}, **a_12_opts, **centered}),
-        danger_format=workbook.add_format(
-            {
-                **{"bg_color": "#ffd700", "bold": True, "text_wrap": True},
-                **a_12_opts,
-                **all_border,
-            }
-        ),
-    )
+@dataclass(frozen=True)
+class ValidationIssue:
+    row: int | None  # index into the CSV values, None for issues with the route as a whole
+    message: str
+    severity: Literal["error", "warning"] = "error"
+
+    def __str__(self) -> str:
+        return self.message if self.row is None else f"Row {self.row + 1}: {self.message}"
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _reduce_frozen(self)
+
+
+class InvalidRouteError(ValueError):
+    def __init__(self, issues: List[ValidationIssue]):
+        self.issues = issues
+        super().__init__("Route has invalid cues:\n" + "\n".join(f"  {issue}" for issue in issues))
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return type(self), (self.issues,)
+
+
+@dataclass(frozen=True)
+class _Layout:
+    row_heights: List[float]
+    page_breaks: List[int]  # indices of the cues that start a new printed page
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _reduce_frozen(self)
+
+
+@dataclass(frozen=True)
+class DistanceColumns:
+    """Derived distance columns, one entry per cue."""
+
+    interval: List[Decimal]  # "Dist.(int.)": distance to the next cue, measured across controls
+    cumulative: List[Decimal]  # distance of the cue from the start
+    since_control: List[Decimal]  # "Dist. Since": distance since the last control, for island style
+    after_control: List[bool]  # whether the previous cue was a control
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _reduce_frozen(self)
+
+
+@dataclass(frozen=True)
+class PreparedRoute:
+    """Everything about a route that does not depend on how it is rendered, computed before any output is written."""
+
+    cues: List[Cue]
+    layout: _Layout
+    distances: DistanceColumns
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _reduce_frozen(self)
+
+
+CuesheetTarget = Union[str, IO[bytes]]
 
 
-def _setup_worksheet_headers(
-    worksheet: Worksheet, formats: _Formats, opts: GenerationOptions, cues: List[Cue]
-) -> tuple[str, int]:
-    curr_col = 0
-    num_cols = 4
-    if opts.include_distance_from_last:
-        num_cols += 1
-    if opts.hide_direction:
-        num_cols -= 1
-
-    row_num = 1
-    last_col_letter = _as_letter(num_cols)
-
-    # Header rows
-    worksheet.merge_range("A1:{0}1".format(last_col_letter), opts.event_details.name, formats.red_title)
-    row_num += 1
-    worksheet.merge_range("A2:{0}2".format(last_col_letter), opts.event_details.date, formats.red_title)
-    row_num += 1
-    worksheet.merge_range("A3:{0}3".format(last_col_letter), opts.event_details.organizer, formats.red_title)
-    row_num += 1
-    worksheet.merge_range("A4:{0}4".format(last_col_letter), opts.event_details.start_location, formats.red_title)
-    row_num += 1
-    if opts.event_details.finish_location:
-        worksheet.merge_range("A5:{0}5".format(last_col_letter), opts.event_details.finish_location, formats.red_title)
-        row_num += 1
-
-    # Column headers
-    worksheet.write(f"A{row_num}", "Dist.(cum.)", formats.title_format)
-    curr_col += 1
-
-    if opts.include_distance_from_last:
-        worksheet.write(_as_letter(curr_col) + str(row_num), "Dist. Since", formats.title_format)
-        curr_col += 1
-
-    worksheet.write(_as_letter(curr_col) + str(row_num), "Turn", formats.title_format)
-    curr_col += 1
-
-    if not opts.hide_direction:
-        worksheet.write(_as_letter(curr_col) + str(row_num), "Direction", formats.title_format)
-        curr_col += 1
-
-    # Column widths
-    width = 7.5 if cues[len(cues) - 1].dist > DISTANCE_THRESHOLD_FOR_WIDE_COLUMN else 6.5
-    worksheet.set_column("A:A", width)
-    worksheet.set_column("B:" + _as_letter(curr_col), 5.6)
-    worksheet.write(_as_letter(curr_col) + str(row_num), "Route Description", formats.description_format)
-    worksheet.set_column("{0}:{0}".format(_as_letter(curr_col)), 39)
-    curr_col += 1
-
-    worksheet.write(_as_letter(curr_col) + str(row_num), "Dist.(int.)", formats.title_format)
-    worksheet.set_column("{0}:{0}".format(_as_letter(curr_col)), 5.6)
-
-    return _as_letter(curr_col), row_num
-
-
-def _write_data_row(
-    worksheet: Worksheet,
-    cue: Cue,
-    cue_num: int,
-    row_num: int,
-    last_col_letter: str,
-    last_was_control: bool,
-    ctrl_sum: Decimal,
-    curr_dist: Decimal,
-    formats: _Formats,
-    opts: GenerationOptions,
+def generate_excel(filename: CuesheetTarget, csv_values: List[List[str]], opts: GenerationOptions):
+    """Write the cuesheet for `csv_values` to a file path or a writable binary file object."""
+    # the xlsxwriter rendering is only imported once a workbook is written, so parsing, validation and brevet cards
+    # stay light, and this module stays free of xlsxwriter for the compiled build
+    from .rendering import render_excel
+
+    render_excel(filename, csv_values, prepare_route(csv_values, opts), opts)
+
+
+def generate_excel_variants(
+    csv_values: List[List[str]],
+    variants: Sequence[Tuple[CuesheetTarget, GenerationOptions]],
+    executor: Optional[Executor] = None,
 ) -> None:
-    curr_col = 0
-
-    if cue_num == 1:  # no distance yet
-        worksheet.write(row_num, curr_col, 0, formats.dist_format)
-    else:
-        prev_row = row_num
-        if last_was_control and cue_num > 2:
-            prev_row -= 1  # read distance from before control
-        incremental_distance_formula = f"=A{prev_row}+{last_col_letter}{prev_row}"
-        worksheet.write(
-            row_num,
-            curr_col,
-            incremental_distance_formula,
-            formats.dist_format,
-        )
-    curr_col += 1
-
-    if opts.include_distance_from_last:
-        worksheet.write(row_num, curr_col, ctrl_sum, formats.dist_since_format)
-        curr_col += 1
-
-    if cue.is_control:
-        logger.info(f"Writing control at row {row_num} with description '{cue.description}'")
-
-        worksheet.write_string(row_num, curr_col, "", formats.arial_12_no_border)
-        curr_col += 1
-
-        if not opts.hide_direction:
-            worksheet.write_string(row_num, curr_col, "", formats.arial_12)
-            curr_col += 1
-
-        if cue_num == 0:  # depart, no data so far
-            worksheet.merge_range(
-                # n.b. convert row_num to 1-based index for Excel
-                f"A{row_num + 1}:{_as_letter(curr_col - 1)}{row_num + 1}",
-                "",
-                formats.arial_12,
-            )
-
-        worksheet.write_string(row_num, curr_col, cue.description, formats.control_format)
-        curr_col += 1
-        worksheet.write_string(row_num, curr_col, "", formats.arial_12)
-        worksheet.set_row(row=row_num, height=CONTROL_ROW_HEIGHT)
-    else:
-        worksheet.write_string(
-            row_num, curr_col, cue.turn, formats.danger_format if cue.is_danger else formats.arial_12
-        )
-        curr_col += 1
-
-        if not opts.hide_direction:
-            worksheet.write_string(row_num, curr_col, "", formats.arial_12)
-            curr_col += 1
-
-        worksheet.write_string(
-            row_num, curr_col, cue.description, formats.danger_format if cue.is_danger else formats.cue_format
-        )
-        curr_col += 1
-        worksheet.write_number(row_num, curr_col, curr_dist, formats.dist_format)
-        worksheet.set_row(row=row_num, height=REGULAR_ROW_HEIGHT)
-
-    assert _as_letter(curr_col) == last_col_letter, "Column letter mismatch"
-
-
-def _as_letter(num_after: int) -> str:
-    return chr(65 + num_after)
-
-
-def _add_footer_information(worksheet: Worksheet, row_num: int, last_col_letter: str, formats: _Formats) -> int:
-    row_num += 1
-    worksheet.merge_range(
-        "A{0}:{1}{0}".format(row_num, last_col_letter),
-        "IN CASE OF ABANDONMENT OR EMERGENCY",
-        formats.black_title,
+    """
+    Write one cuesheet per (target, options) variant of the same route, validating and parsing it only once.
+
+    Variants that differ only in presentation (island distances, direction column, precision, event details,
+    elevation chart) share the parsed cues, page layout and distance columns.
+
+    Args:
+        csv_values: CSV rows of the route, without the header
+        variants: File path or writable binary file object, and the options to render it with
+        executor: Renders the variants concurrently when given; a ProcessPoolExecutor needs file path targets
+    """
+    from .rendering import render_excel
+
+    prepared: Dict[tuple, PreparedRoute] = {}
+    renders = []
+    for target, opts in variants:
+        key = _preparation_key(opts)
+        if key not in prepared:
+            prepared[key] = prepare_route(csv_values, opts)
+        renders.append((target, csv_values, prepared[key], opts))
+
+    if executor is None:
+        for render in renders:
+            render_excel(*render)
+        return
+
+    for future in [executor.submit(render_excel, *render) for render in renders]:
+        future.result()
+
+
+def _preparation_key(opts: GenerationOptions) -> tuple:
+    """The options that affect validation, parsing and layout; variants with equal keys share a PreparedRoute."""
+    return (
+        tuple(opts.control_cue_indicators),
+        opts.end_indicator,
+        opts.start_text,
+        opts.end_text,
+        opts.page_break_row_interval,
+        opts.printable_page_height,
+        opts.min_page_fill_for_control_break,
     )
-    row_num += 1
-    worksheet.merge_range(
-        "A{0}:{1}{0}".format(row_num, last_col_letter),
-        "PHONE: ** ORGANIZER'S NUMBER **",
-        formats.black_title,
+
+
+def parse_route(csv_values: List[List[str]], opts: GenerationOptions) -> List[Cue]:
+    """
+    Validate `csv_values` and parse them into cues.
+
+    Raises:
+        InvalidRouteError: If validation finds errors
+    """
+    errors = [issue for issue in validate_csv_values(csv_values, opts) if issue.severity == "error"]
+    if errors:
+        raise InvalidRouteError(errors)
+    return _parse_to_cues(csv_values, opts)
+
+
+def prepare_route(csv_values: List[List[str]], opts: GenerationOptions) -> PreparedRoute:
+    """Validate and parse `csv_values`, then lay out the cues and compute their distance columns."""
+    cues = parse_route(csv_values, opts)
+    return PreparedRoute(cues=cues, layout=_layout_cues(cues, opts), distances=compute_distance_columns(cues))
+
+
+def compute_distance_columns(cues: List[Cue]) -> DistanceColumns:
+    """
+    Compute the derived distance columns of every cue as whole columns, ahead of rendering.
+
+    Distances are scaled to integers (by their largest number of decimal places), so the columns are exact and
+    cheaper to compute than with Decimal arithmetic.
+    """
+    scale = max((max(-cue.dist.as_tuple().exponent, 0) for cue in cues), default=0)  # type: ignore[operator]
+    next_dists = [int(cue.dist.scaleb(scale)) for cue in cues]
+    is_control = [cue.is_control for cue in cues]
+
+    interval: List[int] = []
+    since_control: List[int] = []
+    anchor = 0
+    ctrl_sum = 0
+    for next_dist, control in zip(next_dists, is_control):
+        curr_dist = next_dist - anchor
+        interval.append(curr_dist)
+        since_control.append(ctrl_sum)
+        # controls do not advance the interval distance, the next cue measures from the cue before the control
+        if control:
+            ctrl_sum = 0
+        else:
+            ctrl_sum += curr_dist
+            anchor = next_dist
+
+    return DistanceColumns(
+        interval=[Decimal(value).scaleb(-scale) for value in interval],
+        cumulative=[cue.last_dist for cue in cues],
+        # zero is kept as 0.0, the value the column restarts from at every control
+        since_control=[Decimal(value).scaleb(-scale) if value else Decimal("0.0") for value in since_control],
+        after_control=[False] + is_control[:-1],
     )
-    row_num += 2
-    worksheet.merge_range(
-        f"A{row_num}:{last_col_letter}{row_num}",
-        data="TA=Turn Around, BL=Bear Left, BR=Bear Right, CO=Continue On",
-        cell_format=formats.black_title,
+
+
+def generate_excel_bytes(csv_values: List[List[str]], opts: GenerationOptions) -> bytes:
+    """Return the cuesheet for `csv_values` as the bytes of an .xlsx file, without touching the disk."""
+    output = io.BytesIO()
+    generate_excel(output, csv_values, opts)
+    return output.getvalue()
+
+
+def summarize_route(csv_values: List[List[str]], opts: GenerationOptions) -> RouteSummary:
+    """Total distance, cue count and control count of validated CSV values."""
+    return RouteSummary(
+        total_distance=Decimal(csv_values[-1][2]) if csv_values else Decimal("0"),
+        cue_count=len(csv_values),
+        control_count=sum(1 for row in csv_values if _is_control_row(row, opts)),
     )
-    worksheet.set_row(row=row_num - 1, height=CONTROL_ROW_HEIGHT * 2)
-    return row_num + 1
+
+
+def validate_csv_values(csv_values: List[List[str]], opts: GenerationOptions) -> List[ValidationIssue]:
+    """
+    Check every CSV row in one pass and return all problems found, without parsing or writing anything.
+
+    Errors (short rows, non-numeric or decreasing distances, a missing start or end, duplicated controls) stop
+    generate_excel; warnings (unknown directions) are only reported.
+    """
+    issues: List[ValidationIssue] = []
+    if not csv_values:
+        return [ValidationIssue(None, "No cues found in the CSV data")]
+
+    last_dist: Decimal | None = None
+    seen_controls: set[tuple[str, Decimal]] = set()
+    for idx, row in enumerate(csv_values):
+        row_issues, dist = _validate_row(row, idx)
+        issues.extend(row_issues)
+        if dist is None:
+            continue
+
+        if last_dist is not None and dist < last_dist:
+            issues.append(ValidationIssue(idx, f"Distance {dist} is less than the previous cue's {last_dist}"))
+        last_dist = dist
+
+        if _is_control_row(row, opts):
+            control = (row[1], dist)
+            if control in seen_controls:
+                issues.append(ValidationIssue(idx, f"Duplicate control '{row[1]}' at {dist}km"))
+            seen_controls.add(control)
+
+    if csv_values[0][:1] != ["Start"]:
+        issues.append(ValidationIssue(None, "Route does not begin with a Start cue"))
+    if csv_values[-1][:1] not in (["End"], [opts.end_indicator]):
+        issues.append(ValidationIssue(None, f"Route does not finish with an End or {opts.end_indicator} cue"))
+
+    return issues
+
+
+def _validate_row(row: List[str], idx: int) -> Tuple[List[ValidationIssue], Decimal | None]:
+    """The problems of one row on its own, and its distance unless it has none that can be compared."""
+    if len(row) < 3:
+        return [ValidationIssue(idx, f"Expected at least 3 columns (type, notes, distance), got {len(row)}")], None
+
+    issues: List[ValidationIssue] = []
+    if row[0].lower() not in _DIRECTION_CODES:
+        issues.append(ValidationIssue(idx, f"Unknown direction '{row[0]}'", "warning"))
+
+    try:
+        dist = Decimal(row[2])
+    except ArithmeticError:
+        dist = Decimal("NaN")
+    if not dist.is_finite():
+        issues.append(ValidationIssue(idx, f"Distance '{row[2]}' is not a number"))
+        return issues, None
+    return issues, dist
+
+
+def _layout_cues(cues: List[Cue], opts: GenerationOptions) -> _Layout:
+    """
+    Size every cue row from its wrapped description and choose page breaks, in a single pass.
+
+    A page is broken when the next row would overflow it or it already holds page_break_row_interval cues.
+    The break goes right after the page's last control if that leaves the page at least
+    min_page_fill_for_control_break full, otherwise just before the row that did not fit.
+    """
+    description_width = excel_column_width_to_points(DESCRIPTION_COLUMN_WIDTH)
+    row_heights: List[float] = []
+    page_breaks: List[int] = []
+
+    capacity = opts.printable_page_height
+    used = HEADER_BLOCK_HEIGHT
+    page_start = 0  # index of the first cue on the current page
+    control_break: int | None = None
+    used_at_control_break = 0.0
+
+    for cue_num, cue in enumerate(cues):
+        lines = wrapped_line_count(cue.description, description_width, CUE_FONT_SIZE, cue.is_control or cue.is_danger)
+        height = (CONTROL_ROW_HEIGHT if cue.is_control else REGULAR_ROW_HEIGHT) + (lines - 1) * LINE_HEIGHT
+        row_heights.append(height)
+
+        while cue_num > page_start and (
+            used + height > capacity or cue_num - page_start >= opts.page_break_row_interval
+        ):
+            if control_break is not None and used_at_control_break >= capacity * opts.min_page_fill_for_control_break:
+                page_start = control_break
+                used -= used_at_control_break
+            else:
+                page_start = cue_num
+                used = 0.0
+            page_breaks.append(page_start)
+            control_break = None
+
+        used += height
+        if cue.is_control and cue_num + 1 < len(cues):
+            control_break = cue_num + 1
+            used_at_control_break = used
+
+    logger.debug("Laid out %d cues over %d pages", len(cues), len(page_breaks) + 1)
+    return _Layout(row_heights=row_heights, page_breaks=page_breaks)
 
 
 def _parse_to_cues(array: List[List[str]], opts: GenerationOptions) -> List[Cue]:
@@ -341,27 +392,32 @@ def _parse_to_cues(array: List[List[str]], opts: GenerationOptions) -> List[Cue]
         end_cue_present = end_cue_present or parsed.is_end
         last = parsed.last_dist
 
-    logger.debug(f"End cue {'is' if end_cue_present else 'is not'} present in the data.")
+    logger.debug("End cue %s present in the data.", "is" if end_cue_present else "is not")
     assert all(t for t in cues), "Some csv data could not be read as a cue."
     return cues
 
 
+def _is_control_row(row: List[str], opts: GenerationOptions) -> bool:
+    return bool(row[0] in opts.control_cue_indicators or _CONTROL_NOTE.match(row[1]))
+
+
 def _read_as_cue(row: List[str], idx: int, last_dist: Decimal, opts: GenerationOptions) -> Cue:
     has_end = False
-    is_control = bool(row[0] in opts.control_cue_indicators or re.match(r"^Control.*?:", row[1]))
+    is_control = _is_control_row(row, opts)
     is_danger = row[0].lower() == "danger"
     this_dist = Decimal(row[2])
 
     if idx == 1 and this_dist <= 0.1:
         this_dist = Decimal("0")
 
+    description = row[1]
     if row[0] == opts.end_indicator:
         has_end = True
-        row[1] = opts.end_text + ": " + row[1]
+        description = opts.end_text + ": " + description
 
     return Cue(
         turn=_map_direction(row[0]),
-        description=_map_cue_description(opts, row[1]).strip(),
+        description=_map_cue_description(opts, description).strip(),
         dist=last_dist,
         is_control=is_control,
         is_danger=is_danger,
@@ -370,46 +426,118 @@ def _read_as_cue(row: List[str], idx: int, last_dist: Decimal, opts: GenerationO
     )
 
 
+_DIRECTION_CODES = {
+    "straight": "CO",
+    "left": "L",
+    "sharp left": "L",
+    "slight left": "BL",
+    "right": "R",
+    "sharp right": "R",
+    "slight right": "BR",
+    "generic": "",
+    "food": "",
+    "start": "",
+    "end": "",
+    "summit": "",
+    "control": "",
+    "uturn": "TA",
+    "danger": "!!",
+}
+
+
+# compiled once, the parser matches every cue against them
+_CONTROL_NOTE = re.compile(r"^Control.*?:")
+_CONTROL_NAME = re.compile("Control.*?: *(?P<control_name>.*)")
+_ROUNDABOUT_EXIT = re.compile(r"^At roundabout, take exit (?P<exit>\d+) [io]nto (?P<road>.*)")
+_CONTINUE_ONTO = re.compile(r"^Continue (?:straight )?[io]nto (?P<road>.*)")
+_TURN_ONTO = re.compile(r"^(?:Keep|Turn) (?:slight )?(?:left|right) [io]nto (?P<road>.*)")
+_U_TURN_ONTO = re.compile(r"^(?:Make a )?U-turn on(?:to)? (?P<road>.*)")
+_TURN_TO = re.compile("Turn (?P<direction>left|right) to ([^(stay)])")
+
+# the rules of _map_cue_description as (name, matcher, rewrite of the match), in the same order, for the instrumented
+# path only: uninstrumented parsing keeps the plain if/elif chain, which is faster than walking a table
+_DESCRIPTION_RULES: List[Tuple[str, Callable[[str], Any], Callable[[Any, GenerationOptions], str]]] = [
+    ("start", "Start of route".__eq__, lambda match, opts: opts.start_text),
+    ("end", "End of route".__eq__, lambda match, opts: opts.end_text),
+    ("control_name", _CONTROL_NAME.match, lambda match, opts: match.group("control_name")),
+    (
+        "roundabout_exit",
+        _ROUNDABOUT_EXIT.match,
+        lambda match, opts: f"{match.group('road')} (roundabout exit {match.group('exit')})",
+    ),
+    ("continue_onto", _CONTINUE_ONTO.match, lambda match, opts: match.group("road")),
+    ("turn_onto", _TURN_ONTO.match, lambda match, opts: match.group("road")),
+    ("u_turn_onto", _U_TURN_ONTO.match, lambda match, opts: match.group("road")),
+    ("turn_to", _TURN_TO.match, lambda match, opts: match.string[match.start(2) :]),
+]
+DESCRIPTION_RULE_NAMES = [rule[0] for rule in _DESCRIPTION_RULES] + [FALLBACK_RULE]
+
+_telemetry: Optional[RuleTelemetry] = None
+
+
+@contextmanager
+def collect_rule_telemetry(telemetry: Optional[RuleTelemetry] = None) -> Iterator[RuleTelemetry]:
+    """
+    Count and time the description and direction rules of every cue parsed in this process while active.
+
+    Instrumented parsing is several times slower, so this is meant for surveying a corpus rather than production runs.
+    """
+    global _telemetry
+    previous, _telemetry = _telemetry, telemetry or RuleTelemetry()
+    try:
+        yield _telemetry
+    finally:
+        _telemetry = previous
+
+
 def _map_direction(direction: str) -> Literal["CO", "L", "BL", "R", "BR", "TA", ""] | str:
-    cue_dir = direction.lower()
-    if cue_dir == "straight":
-        return "CO"
-    elif cue_dir in ("left", "sharp left"):
-        return "L"
-    elif cue_dir == "slight left":
-        return "BL"
-    elif cue_dir in ("right", "sharp right"):
-        return "R"
-    elif cue_dir == "slight right":
-        return "BR"
-    elif cue_dir in ("generic", "food", "start", "end", "summit", "control"):
-        return ""
-    elif cue_dir == "uturn":
-        return "TA"
-    elif cue_dir == "danger":
-        return "!!"
-    logger.warning(f"Unknown direction '{direction}' encountered")
+    code = _DIRECTION_CODES.get(direction.lower())
+    if _telemetry is not None:
+        _telemetry.record_direction(direction, known=code is not None)
+    if code is not None:
+        return code
+    logger.warning("Unknown direction '%s' encountered", direction)
     return direction
 
 
 def _map_cue_description(opts: GenerationOptions, description: str) -> str:
+    if _telemetry is not None:
+        return _map_cue_description_with_telemetry(opts, description, _telemetry)
     if description == "Start of route":
         return opts.start_text
     elif description == "End of route":
         return opts.end_text
-    elif match := re.match("Control.*?: *(?P<control_name>.*)", description):
+    elif match := _CONTROL_NAME.match(description):
         return match.group('control_name')
-    elif match := re.match(r"^At roundabout, take exit (?P<exit>\d+) [io]nto (?P<road>.*)", description):
+    elif match := _ROUNDABOUT_EXIT.match(description):
         return f"{match.group('road')} (roundabout exit {match.group('exit')})"
-    elif match := re.match(r"^Continue (?:straight )?[io]nto (?P<road>.*)", description):
+    elif match := _CONTINUE_ONTO.match(description):
         return match.group('road')
-    elif match := re.match(r"^(?:Keep|Turn) (?:slight )?(?:left|right) [io]nto (?P<road>.*)", description):
+    elif match := _TURN_ONTO.match(description):
         return match.group('road')
-    elif match := re.match(r"^(?:Make a )?U-turn on(?:to)? (?P<road>.*)", description):
+    elif match := _U_TURN_ONTO.match(description):
         return match.group('road')
-    elif match := re.match(f"Turn (?P<direction>left|right) to ([^(stay)])", description):
+    elif match := _TURN_TO.match(description):
         return description[len(f"Turn {match.group('direction')} to ") :]
+    return _shorten_description(description)
+
+
+def _map_cue_description_with_telemetry(opts: GenerationOptions, description: str, telemetry: RuleTelemetry) -> str:
+    for name, matcher, rewrite in _DESCRIPTION_RULES:
+        started = time.perf_counter_ns()
+        match = matcher(description)
+        telemetry.record_rule(name, bool(match), time.perf_counter_ns() - started)
+        if match:
+            return rewrite(match, opts)
+
+    started = time.perf_counter_ns()
+    shortened = _shorten_description(description)
+    telemetry.record_rule(FALLBACK_RULE, True, time.perf_counter_ns() - started)
+    telemetry.record_unmatched(description)
+    return shortened
+
 
+def _shorten_description(description: str) -> str:
     description = description.replace("becomes", "b/c")
     description = description.replace("slightly ", "")
     return description
@@ -0,0 +1,157 @@
+"""Columnar export of the parsed cues of many routes to one Parquet or Arrow IPC file, for analysis in pandas/DuckDB.
+
+Every row is one cue, with its route's ID, CSV hash and summary repeated alongside, so questions across the archive
+(cue density, control spacing, danger cues) are a scan over a few columns instead of re-parsing every CSV. Rows are
+buffered and written a record batch (a Parquet row group) at a time, so memory stays flat however many routes go in.
+
+pyarrow is an optional dependency: pip install "ridewithgps-to-cuesheet[arrow]".
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Literal, Optional
+
+from .catalog import iter_parsed_routes
+from .conversion import Cue, GenerationOptions, RouteSummary, summarize_route
+from .cue_stream import cue_records
+
+if TYPE_CHECKING:
+    import pyarrow
+
+ExportFormat = Literal["parquet", "arrow"]
+
+DEFAULT_BATCH_ROWS = 65536
+
+# (column, pyarrow type factory name, nullable)
+_COLUMNS = [
+    ("route_id", "string", False),
+    ("csv_sha256", "string", False),
+    ("route_distance_km", "float64", False),
+    ("route_cue_count", "int32", False),
+    ("route_control_count", "int32", False),
+    ("cue_number", "int32", False),
+    ("turn", "string", False),
+    ("description", "string", False),
+    ("distance_km", "float64", False),
+    ("interval_km", "float64", True),  # null for controls, which have no interval on the cuesheet
+    ("since_control_km", "float64", False),
+    ("is_control", "bool_", False),
+    ("is_danger", "bool_", False),
+    ("is_end", "bool_", False),
+]
+
+
+class PyArrowNotInstalledError(Exception): ...
+
+
+@dataclass(frozen=True)
+class ExportResult:
+    exported: List[str]
+    cue_count: int
+    failed: Dict[str, str]  # route ID to the reason its CSV could not be exported
+
+
+def export_format_for(path: Path) -> ExportFormat:
+    """Arrow IPC for .arrow/.feather/.ipc files, Parquet otherwise."""
+    return "arrow" if path.suffix.lower() in (".arrow", ".feather", ".ipc") else "parquet"
+
+
+def cue_schema() -> pyarrow.Schema:
+    pa = _import_pyarrow()
+    return pa.schema([pa.field(name, getattr(pa, type_name)(), nullable) for name, type_name, nullable in _COLUMNS])
+
+
+class CueExporter:
+    """
+    Writes the cues of one route after another into a single Parquet or Arrow IPC file.
+
+    Raises:
+        PyArrowNotInstalledError: If pyarrow is not installed
+    """
+
+    def __init__(self, path: Path | str, fmt: Optional[ExportFormat] = None, batch_rows: int = DEFAULT_BATCH_ROWS):
+        self.path = Path(path)
+        self.format = fmt or export_format_for(self.path)
+        self.batch_rows = batch_rows
+        self.cue_count = 0
+        self._pa = _import_pyarrow()
+        self._schema = cue_schema()
+        self._columns: Dict[str, List[Any]] = {name: [] for name, _, _ in _COLUMNS}
+        self._writer: Any
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(str(self.path), self._schema, compression="zstd")
+        else:
+            self._writer = self._pa.ipc.new_file(str(self.path), self._schema)
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self) -> CueExporter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def add_route(self, route_id: str, csv_sha256: str, summary: RouteSummary, cues: List[Cue]) -> None:
+        """Buffer the rows of a route's cues, writing a record batch whenever `batch_rows` rows are buffered."""
+        route_columns = {
+            "route_id": route_id,
+            "csv_sha256": csv_sha256,
+            "route_distance_km": float(summary.total_distance),
+            "route_cue_count": summary.cue_count,
+            "route_control_count": summary.control_count,
+        }
+        columns = self._columns
+        for name, value in route_columns.items():
+            columns[name].extend([value] * len(cues))
+        for record in cue_records(cues):
+            for name, value in record.items():
+                columns[name].append(value)
+        self.cue_count += len(cues)
+        if len(columns["route_id"]) >= self.batch_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered rows as one record batch."""
+        if not self._columns["route_id"]:
+            return
+        batch = self._pa.RecordBatch.from_pydict(self._columns, schema=self._schema)
+        if self.format == "parquet":
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write(batch)
+        self._columns = {name: [] for name in self._columns}
+
+
+def export_routes(exporter: CueExporter, csv_paths: Iterable[Path], opts: GenerationOptions) -> ExportResult:
+    """
+    Parse every CSV in `csv_paths` and add its cues to `exporter`.
+
+    A CSV that cannot be read or has invalid cues is reported in ExportResult.failed and left out of the export.
+    """
+    exported: List[str] = []
+    failed: Dict[str, str] = {}
+    cue_count = exporter.cue_count
+    for route_id, _, parsed in iter_parsed_routes(csv_paths, opts):
+        if isinstance(parsed, str):
+            failed[route_id] = parsed
+            continue
+        exporter.add_route(route_id, parsed.csv_sha256, summarize_route(parsed.csv_values, opts), parsed.cues)
+        exported.append(route_id)
+    return ExportResult(exported=exported, cue_count=exporter.cue_count - cue_count, failed=failed)
+
+
+def _import_pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise PyArrowNotInstalledError(
+            'Exporting cues needs pyarrow, install it with: pip install "ridewithgps-to-cuesheet[arrow]"'
+        ) from e
+    return pyarrow
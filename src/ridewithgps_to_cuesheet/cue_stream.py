@@ -0,0 +1,35 @@
+"""Newline-delimited JSON of a route's cues, one object per cue, for the next stage of a shell pipeline (e.g. jq).
+
+Fields are named as in the columnar export (cue_export), without the per-route columns: cue_number, turn,
+description, distance_km, interval_km (null for controls), since_control_km, is_control, is_danger and is_end.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterator, List, TextIO
+
+from .conversion import Cue, compute_distance_columns
+
+
+def cue_records(cues: List[Cue]) -> Iterator[Dict[str, Any]]:
+    """The fields of each cue as on the cuesheet, also the cue columns of the columnar export."""
+    distances = compute_distance_columns(cues)
+    for number, cue in enumerate(cues):
+        yield {
+            "cue_number": number + 1,
+            "turn": cue.turn,
+            "description": cue.description,
+            "distance_km": float(cue.last_dist),
+            "interval_km": None if cue.is_control else float(distances.interval[number]),
+            "since_control_km": float(distances.since_control[number]),
+            "is_control": cue.is_control,
+            "is_danger": cue.is_danger,
+            "is_end": cue.is_end,
+        }
+
+
+def write_cue_stream(cues: List[Cue], output: TextIO) -> None:
+    """Write one JSON object per cue, each on its own line."""
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    output.writelines(encode(record) + "\n" for record in cue_records(cues))
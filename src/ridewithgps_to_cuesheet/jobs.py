@@ -0,0 +1,226 @@
+"""A SQLite-backed queue of cuesheet conversions shared by any number of worker processes.
+
+Workers claim jobs inside an immediate transaction and hold them under a time-limited lease, so a worker that dies
+mid-job only delays that job until its lease expires and another worker picks it up.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import time
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Literal, Optional
+
+from .catalog import route_id_for_csv
+from .conversion import EventDetails, GenerationOptions, generate_excel_bytes
+from .logger import logger
+from .workspace import atomic_write_bytes, route_lock
+
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+JobStatus = Literal["pending", "running", "done", "failed"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    output TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    duration REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, lease_expires);
+"""
+
+
+@dataclass(frozen=True)
+class Job:
+    id: int
+    source: str  # CSV path or RideWithGPS route ID
+    output: str
+    options: GenerationOptions
+    attempts: int
+
+
+def options_to_json(opts: GenerationOptions) -> str:
+    return json.dumps(asdict(opts), sort_keys=True)
+
+
+def options_from_json(data: str) -> GenerationOptions:
+    fields: Dict[str, Any] = json.loads(data)
+    fields["event_details"] = EventDetails(**fields["event_details"])
+    return GenerationOptions(**fields)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    def __init__(self, path: Path | str, timeout: float = 30.0):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path), timeout=timeout, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> JobQueue:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def enqueue(self, source: str, output: str, opts: GenerationOptions) -> int:
+        cursor = self._conn.execute(
+            "INSERT INTO jobs (source, output, options, enqueued_at) VALUES (?, ?, ?, ?)",
+            (source, output, options_to_json(opts), time.time()),
+        )
+        return int(cursor.lastrowid or 0)
+
+    def claim(
+        self,
+        worker_id: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> Optional[Job]:
+        """Lease the oldest pending job, or a running job whose lease has expired; None if there is no work."""
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = 'lease expired too many times' "
+                "WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                (now, now, max_attempts),
+            )
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' OR (status = 'running' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                self._conn.execute("COMMIT")
+                return None
+
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires = ?, started_at = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"]),
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        return Job(
+            id=row["id"],
+            source=row["source"],
+            output=row["output"],
+            options=options_from_json(row["options"]),
+            attempts=row["attempts"] + 1,
+        )
+
+    def complete(self, job: Job, worker_id: str, duration: float, error: Optional[str] = None) -> bool:
+        """Record a job's result; returns False if the lease was lost to another worker in the meantime."""
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, duration = ?, error = ?, lease_expires = NULL "
+            "WHERE id = ? AND status = 'running' AND lease_owner = ?",
+            ("failed" if error else "done", time.time(), duration, error, job.id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def counts(self) -> Dict[JobStatus, int]:
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def failures(self) -> List[sqlite3.Row]:
+        return self._conn.execute("SELECT id, source, error FROM jobs WHERE status = 'failed' ORDER BY id").fetchall()
+
+
+def run_job(
+    job: Job, load_csv: Callable[[str], List[List[str]]], lock_directory: Optional[Path] = None
+) -> List[List[str]]:
+    """
+    Convert a job's source and atomically replace its output, holding the route's lock if `lock_directory`.
+
+    Returns the CSV rows that were converted.
+    """
+    with route_lock(lock_directory, job_route_id(job)) if lock_directory else nullcontext():
+        csv_values = load_csv(job.source)
+        atomic_write_bytes(Path(job.output), generate_excel_bytes(csv_values, job.options))
+    return csv_values
+
+
+def job_route_id(job: Job) -> str:
+    return job.source if job.source.isdigit() else route_id_for_csv(Path(job.source))
+
+
+def run_worker(
+    queue: JobQueue,
+    load_csv: Callable[[str], List[List[str]]],
+    worker_id: Optional[str] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    wait: bool = False,
+    poll_interval: float = 1.0,
+    on_result: Optional[Callable[[Job, float, Optional[str], Optional[List[List[str]]]], None]] = None,
+    lock_directory: Optional[Path] = None,
+) -> int:
+    """
+    Claim and run jobs until the queue is empty (or forever if `wait`), returning how many jobs were processed.
+
+    A job whose lease expired before it finished is not counted and not passed to `on_result`: the queue discards
+    its result and another worker will run it again.
+
+    Args:
+        queue: Queue to take jobs from
+        load_csv: Returns the CSV rows (without header) for a job's source
+        worker_id: Lease owner recorded on claimed jobs; defaults to host:pid
+        lease_seconds: How long a claimed job is reserved before other workers may retry it
+        max_attempts: Jobs whose lease expired this many times are marked failed
+        wait: Keep polling for new jobs instead of returning when the queue is empty
+        poll_interval: Seconds between polls when waiting
+        on_result: Called with each job, its duration, its error message (None on success) and the CSV rows it
+            converted (None on failure)
+        lock_directory: Where per-route locks are kept, to serialise with other runs converting the same route
+    """
+    worker_id = worker_id or default_worker_id()
+    processed = 0
+    while True:
+        job = queue.claim(worker_id, lease_seconds, max_attempts)
+        if job is None:
+            if not wait:
+                return processed
+            time.sleep(poll_interval)
+            continue
+
+        started = time.perf_counter()
+        error: Optional[str] = None
+        csv_values: Optional[List[List[str]]] = None
+        try:
+            csv_values = run_job(job, load_csv, lock_directory)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        duration = time.perf_counter() - started
+
+        if not queue.complete(job, worker_id, duration, error):
+            logger.warning("Lease on job %s expired before it finished, result discarded", job.id)
+            continue
+        if on_result:
+            on_result(job, duration, error, csv_values)
+        processed += 1
@@ -1,3 +1,65 @@
+import atexit
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
 
 logger = logging.getLogger("ridewithgps-to-cuesheet")
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Queues records untouched: the stock QueueHandler formats the message in the logging thread, which is the cost we
+    want off the conversion loop. Records stay in this process, so their arguments need not be made picklable.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def start_queued_logging(*handlers: logging.Handler, level: int = logging.DEBUG) -> None:
+    """
+    Send the package's log records through a queue to `handlers`, which run on a background thread.
+
+    Logging a record then costs the caller little more than creating it. Replaces handlers from an earlier call;
+    the queue is flushed when the program exits, or earlier with stop_queued_logging.
+    """
+    global _listener, _queue_handler
+    stop_queued_logging()
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _queue_handler = _DeferredQueueHandler(records)
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    logger.addHandler(_queue_handler)
+    logger.setLevel(level)
+
+
+def stop_queued_logging() -> None:
+    """Handle every queued record, then stop the background thread."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logger.removeHandler(_queue_handler)
+    if _listener is not None:
+        _listener.stop()
+    _listener = _queue_handler = None
+
+
+def _handle_directly_after_fork() -> None:
+    # a forked worker process has the queue but not the listener thread, so its records would never be handled
+    global _listener, _queue_handler
+    if _listener is None or _queue_handler is None:
+        return
+    handlers: List[logging.Handler] = list(_listener.handlers)
+    logger.removeHandler(_queue_handler)
+    for handler in handlers:
+        logger.addHandler(handler)
+    _listener = _queue_handler = None
+
+
+atexit.register(stop_queued_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_handle_directly_after_fork)
@@ -0,0 +1,270 @@
+"""Pipelined batch conversion: parser processes hand packed routes to renderer processes through shared memory.
+
+Parsing (CSV reading, validation, description rewriting, layout) and rendering (xlsxwriter's XML and zip work) each
+take a large share of a route's CPU time. With a pool of processes for each stage and a bounded queue between them,
+both stages stay busy on a many-core machine. A parsed route crosses to its renderer as one flat buffer of number
+arrays and UTF-8 strings in a SharedMemory block, so no per-cue objects are pickled: only the block's name goes
+through the queue, and the queue's bound caps how many blocks exist at once.
+"""
+
+from __future__ import annotations
+
+import io
+import multiprocessing
+import queue
+import struct
+import time
+from array import array
+from contextlib import nullcontext
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import accumulate, islice
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from .catalog import route_id_for_csv
+from .conversion import (
+    Cue,
+    DistanceColumns,
+    GenerationOptions,
+    PreparedRoute,
+    RouteSummary,
+    _Layout,
+    prepare_route,
+    summarize_route,
+)
+from .utils import read_csv_to_array
+from .workspace import atomic_write_bytes, route_lock
+
+DEFAULT_PIPELINE_QUEUE_SIZE = 8
+
+# cue, page break, CSV row and string counts, then the length of the encoded text
+_HEADER = struct.Struct("<5q")
+_DECIMAL_COLUMNS = 5  # cue dist and last_dist, then the interval, cumulative and since-control distances
+_FLAG_COLUMNS = 4  # is_control, is_danger, is_end, after_control
+
+
+@dataclass(frozen=True)
+class PipelineJob:
+    csv_path: Path
+    output_path: Path
+    opts: GenerationOptions
+
+
+@dataclass(frozen=True)
+class PipelineResult:
+    job: PipelineJob
+    summary: Optional[RouteSummary]  # None when the job failed
+    error: Optional[str]
+    seconds: float  # from the start of parsing to the cuesheet being written
+
+
+def run_pipeline(
+    jobs: Sequence[PipelineJob],
+    parsers: int,
+    renderers: int,
+    queue_size: int = DEFAULT_PIPELINE_QUEUE_SIZE,
+    lock_directory: Optional[Path] = None,
+) -> Iterator[PipelineResult]:
+    """
+    Convert every job with `parsers` parsing and `renderers` rendering processes, yielding results as they finish.
+
+    Args:
+        jobs: Routes to convert; each output is replaced atomically
+        parsers: Processes reading, validating and laying out routes
+        renderers: Processes writing workbooks
+        queue_size: Parsed routes waiting for a renderer before parsers pause
+        lock_directory: Where per-route locks are kept, to serialise with other runs converting the same route
+
+    Raises:
+        RuntimeError: If a pipeline process dies without reporting its job
+    """
+    if not jobs:
+        return
+    # the job queue is held until the end: a collected queue closes its pipe before the parsers have drained it
+    todo, packed, results, stages = _start_stages(jobs, parsers, renderers, queue_size, lock_directory)
+    try:
+        for _ in range(len(jobs)):
+            index, summary, error, seconds = _next_result(results, stages)
+            yield PipelineResult(jobs[index], summary, error, seconds)
+        for _ in range(renderers):
+            packed.put(None)
+        for stage in stages:
+            stage.join()
+    finally:
+        for stage in stages:
+            if stage.is_alive():
+                stage.terminate()
+
+
+def _start_stages(
+    jobs: Sequence[PipelineJob], parsers: int, renderers: int, queue_size: int, lock_directory: Optional[Path]
+) -> Tuple[Any, Any, Any, List[Any]]:
+    # started here, the shared memory tracker is inherited by every stage, so blocks created by a parser and
+    # unlinked by a renderer are accounted for in one place
+    resource_tracker.ensure_running()
+    # forking a process that runs threads (e.g. the log listener) can deadlock the child, so stages start from a
+    # fork server where there is one, and are spawned elsewhere
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context: Any = multiprocessing.get_context("forkserver")
+    else:
+        context = multiprocessing.get_context("spawn")
+    todo: Any = context.Queue()
+    packed: Any = context.Queue(maxsize=queue_size)
+    results: Any = context.Queue()
+
+    stages = [
+        context.Process(target=_parse_stage, args=(jobs, todo, packed, results), daemon=True) for _ in range(parsers)
+    ] + [
+        context.Process(target=_render_stage, args=(jobs, packed, results, lock_directory), daemon=True)
+        for _ in range(renderers)
+    ]
+    for index in range(len(jobs)):
+        todo.put(index)
+    for _ in range(parsers):
+        todo.put(None)
+    for stage in stages:
+        stage.start()
+    return todo, packed, results, stages
+
+
+def pack_route(route: PreparedRoute, csv_values: List[List[str]]) -> bytes:
+    """A prepared route and its CSV rows as one flat buffer of arrays, for unpack_route in another process."""
+    return b"".join(_route_sections(route, csv_values))
+
+
+def _route_sections(route: PreparedRoute, csv_values: List[List[str]]) -> List[bytes]:
+    cues, distances = route.cues, route.distances
+    flags = array("B", [cue.is_control for cue in cues])
+    flags.extend(cue.is_danger for cue in cues)
+    flags.extend(cue.is_end for cue in cues)
+    flags.extend(distances.after_control)
+
+    # Decimals travel as text, which keeps their exact digits and exponent and converts faster than digit tuples
+    decimals = [cue.dist for cue in cues] + [cue.last_dist for cue in cues]
+    decimals += distances.interval + distances.cumulative + distances.since_control
+    strings = [cue.turn for cue in cues] + [cue.description for cue in cues] + [str(value) for value in decimals]
+    strings += [cell for row in csv_values for cell in row]
+    text = "".join(strings).encode()
+    # offsets count characters: the text is decoded in one piece and sliced
+    offsets = array("I", accumulate(map(len, strings), initial=0))
+
+    header = _HEADER.pack(len(cues), len(route.layout.page_breaks), len(csv_values), len(strings), len(text))
+    return [
+        header,
+        array("d", route.layout.row_heights).tobytes(),
+        array("q", route.layout.page_breaks).tobytes(),
+        array("q", [len(row) for row in csv_values]).tobytes(),
+        offsets.tobytes(),
+        flags.tobytes(),
+        text,
+    ]
+
+
+def unpack_route(buffer: bytes | memoryview) -> Tuple[PreparedRoute, List[List[str]]]:
+    """The route and CSV rows packed by pack_route; Decimals keep their exact digits and exponent."""
+    cue_count, page_break_count, csv_row_count, string_count, text_bytes = _HEADER.unpack_from(buffer)
+    position = _HEADER.size
+
+    def take(typecode: str, count: int) -> array:
+        nonlocal position
+        values = array(typecode)
+        end = position + count * values.itemsize
+        values.frombytes(buffer[position:end])
+        position = end
+        return values
+
+    row_heights = take("d", cue_count)
+    page_breaks = take("q", page_break_count)
+    row_lengths = take("q", csv_row_count)
+    offsets = take("I", string_count + 1).tolist()
+    flags = take("B", _FLAG_COLUMNS * cue_count).tolist()
+    text = bytes(buffer[position : position + text_bytes]).decode()
+    strings = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+
+    decimals_start = 2 * cue_count
+    decimals = [Decimal(value) for value in strings[decimals_start : decimals_start + _DECIMAL_COLUMNS * cue_count]]
+    columns = [decimals[column * cue_count : (column + 1) * cue_count] for column in range(_DECIMAL_COLUMNS)]
+    flag_columns = [[bool(flag) for flag in flags[n * cue_count : (n + 1) * cue_count]] for n in range(_FLAG_COLUMNS)]
+
+    cues = [
+        Cue(
+            turn=turn,
+            description=description,
+            dist=dist,
+            is_control=is_control,
+            is_danger=is_danger,
+            is_end=is_end,
+            last_dist=last_dist,
+        )
+        for turn, description, dist, last_dist, is_control, is_danger, is_end in zip(
+            strings[:cue_count], strings[cue_count:decimals_start], columns[0], columns[1], *flag_columns[:3]
+        )
+    ]
+    distances = DistanceColumns(
+        interval=columns[2], cumulative=columns[3], since_control=columns[4], after_control=flag_columns[3]
+    )
+    cells = iter(strings[decimals_start + _DECIMAL_COLUMNS * cue_count :])
+    csv_values = [list(islice(cells, length)) for length in row_lengths]
+    layout = _Layout(row_heights=row_heights.tolist(), page_breaks=page_breaks.tolist())
+    return PreparedRoute(cues=cues, layout=layout, distances=distances), csv_values
+
+
+def _parse_stage(jobs: Sequence[PipelineJob], todo: Any, packed: Any, results: Any) -> None:
+    for index in iter(todo.get, None):
+        job = jobs[index]
+        started = time.perf_counter()
+        try:
+            csv_values = read_csv_to_array(str(job.csv_path))
+            route = prepare_route(csv_values, job.opts)
+            # the renderer only reads the CSV rows for the elevation chart
+            sections = _route_sections(route, csv_values if job.opts.include_elevation_chart else [])
+            summary = summarize_route(csv_values, job.opts)
+            block = SharedMemory(create=True, size=sum(len(section) for section in sections))
+        except Exception as e:
+            results.put((index, None, f"{type(e).__name__}: {e}", time.perf_counter() - started))
+            continue
+        buffer, position = block.buf, 0
+        assert buffer is not None
+        for section in sections:
+            buffer[position : position + len(section)] = section
+            position += len(section)
+        block.close()
+        # the renderer unlinks the block; a blocking put is what holds parsers back while renderers catch up
+        packed.put((index, block.name, summary, started))
+
+
+def _render_stage(jobs: Sequence[PipelineJob], packed: Any, results: Any, lock_directory: Optional[Path]) -> None:
+    from .rendering import render_excel
+
+    for index, block_name, summary, started in iter(packed.get, None):
+        job = jobs[index]
+        error: Optional[str] = None
+        try:
+            block = SharedMemory(name=block_name)
+            try:
+                assert block.buf is not None
+                route, csv_values = unpack_route(block.buf)
+            finally:
+                block.close()
+                block.unlink()
+            workbook = io.BytesIO()
+            render_excel(workbook, csv_values, route, job.opts)
+            with route_lock(lock_directory, route_id_for_csv(job.csv_path)) if lock_directory else nullcontext():
+                atomic_write_bytes(job.output_path, workbook.getvalue())
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        # perf_counter is system-wide on the platforms we run on, so it is comparable across processes
+        results.put((index, None if error else summary, error, time.perf_counter() - started))
+
+
+def _next_result(results: Any, stages: List[Any]) -> Tuple[int, Optional[RouteSummary], Optional[str], float]:
+    while True:
+        try:
+            return results.get(timeout=1.0)
+        except queue.Empty:
+            crashed = [stage for stage in stages if stage.exitcode not in (None, 0)]
+            if crashed:
+                raise RuntimeError(f"Pipeline process {crashed[0].name} exited with code {crashed[0].exitcode}")
@@ -0,0 +1,77 @@
+"""Terminal preview of a cuesheet, laid out from the same PreparedRoute as the workbook but without xlsxwriter."""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import List, Optional
+
+from rich.table import Table
+
+from .conversion import GenerationOptions, PreparedRoute
+
+CONTROL_STYLE = "bold on grey37"
+DANGER_STYLE = "bold black on gold1"
+PAGE_BREAK_STYLE = "dim italic"
+
+
+def cuesheet_preview(route: PreparedRoute, opts: GenerationOptions) -> Table:
+    """
+    The cuesheet's columns and rows as a rich Table, with a marker row wherever the printed sheet starts a new page.
+
+    Controls and danger cues are highlighted as in the workbook; controls show no turn or interval distance. As in the
+    workbook, an empty Direction column follows Turn unless `opts.hide_direction` is set.
+    """
+    cues, distances = route.cues, route.distances
+    page_starts = set(route.layout.page_breaks)
+
+    table = Table(caption=f"{len(cues)} cues, {len(page_starts) + 1} page(s)", show_lines=False)
+    table.add_column("Dist.(cum.)", justify="right")
+    if opts.include_distance_from_last:
+        table.add_column("Dist. Since", justify="right")
+    table.add_column("Turn")
+    if not opts.hide_direction:
+        table.add_column("Direction")  # left blank in the workbook, for riders to write in
+    table.add_column("Route Description", overflow="fold")
+    table.add_column("Dist.(int.)", justify="right")
+
+    dist_places = 2 if opts.two_decimals_precision else 1
+    cumulative = sheet_cumulative_distances(route)
+    page = 1
+    for cue_num, cue in enumerate(cues):
+        if cue_num in page_starts:
+            page += 1
+            table.add_row(*([""] * (len(table.columns) - 2)), f"── page {page} ──", "", style=PAGE_BREAK_STYLE)
+
+        row = [_format_distance(cumulative[cue_num], dist_places)]
+        if opts.include_distance_from_last:
+            # the start's distance cells are merged away in the workbook
+            row.append(_format_distance(distances.since_control[cue_num], 1) if cue_num else "")
+        turn = "" if cue.is_control else cue.turn
+        row.extend([turn] if opts.hide_direction else [turn, ""])
+        if cue.is_control:
+            table.add_row(*row, cue.description, "", style=CONTROL_STYLE)
+        else:
+            interval = _format_distance(distances.interval[cue_num], dist_places)
+            table.add_row(*row, cue.description, interval, style=DANGER_STYLE if cue.is_danger else None)
+    return table
+
+
+def sheet_cumulative_distances(route: PreparedRoute) -> List[Optional[Decimal]]:
+    """
+    "Dist.(cum.)" as the workbook's formulas evaluate it: blank for the start, 0 for the first cue, then the previous
+    row's cumulative plus its interval, reading from the row before a control (controls have no interval).
+    """
+    cues, distances = route.cues, route.distances
+    cumulative: List[Optional[Decimal]] = []
+    for cue_num in range(len(cues)):
+        if cue_num < 2:
+            cumulative.append(None if cue_num == 0 else Decimal(0))
+            continue
+        prev = cue_num - 2 if distances.after_control[cue_num] and cue_num > 2 else cue_num - 1
+        interval = Decimal(0) if cues[prev].is_control else distances.interval[prev]
+        cumulative.append((cumulative[prev] or Decimal(0)) + interval)
+    return cumulative
+
+
+def _format_distance(distance: Optional[Decimal], places: int) -> str:
+    return "" if distance is None else f"{distance:.{places}f}"
@@ -0,0 +1,329 @@
+"""Write prepared routes as .xlsx cuesheets with xlsxwriter.
+
+Kept apart from conversion so that parsing, validation and layout never import xlsxwriter.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import List
+
+import xlsxwriter
+from xlsxwriter.format import Format
+from xlsxwriter.worksheet import Worksheet
+
+from .charts import CHART_ROWS, add_elevation_chart, elevation_points
+from .conversion import (
+    CONTROL_ROW_HEIGHT,
+    DESCRIPTION_COLUMN_WIDTH,
+    DISTANCE_THRESHOLD_FOR_WIDE_COLUMN,
+    Cue,
+    CuesheetTarget,
+    GenerationOptions,
+    PreparedRoute,
+    _is_control_row,
+)
+from .logger import logger
+
+# the zip entries of in-memory workbooks are already dated 1980-01-01; this pins the document properties'
+# created and modified dates to the same day, leaving nothing in the file that depends on when it was written
+REPRODUCIBLE_CREATED = datetime(1980, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class _Formats:
+    title_format: Format
+    description_format: Format
+    control_format: Format
+    arial_12: Format
+    arial_12_no_border: Format
+    dist_format: Format
+    dist_since_format: Format
+    cue_format: Format
+    red_title: Format
+    black_title: Format
+    danger_format: Format
+
+
+def render_excel(
+    filename: CuesheetTarget, csv_values: List[List[str]], route: PreparedRoute, opts: GenerationOptions
+) -> None:
+    """Write the workbook for a prepared route; the same PreparedRoute can be rendered with many options."""
+    cues, layout, distances = route.cues, route.layout, route.distances
+    # in_memory assembles the workbook XML in memory rather than in temporary files
+    workbook = xlsxwriter.Workbook(filename, {"in_memory": True})
+    if opts.reproducible:
+        workbook.set_properties({"created": REPRODUCIBLE_CREATED})
+    try:
+        worksheet = workbook.add_worksheet()
+
+        formats = _create_excel_formats(workbook, opts.two_decimals_precision)
+        last_col_letter, last_header_row = _setup_worksheet_headers(worksheet, formats, opts, cues)
+
+        row_num = last_header_row
+        log_cues = opts.verbose and logger.isEnabledFor(logging.DEBUG)
+        for cue_num, turn in enumerate(cues):
+            if log_cues:
+                logger.debug(
+                    "%s: We're on turn %d at %skm\n\testimated distance is %skm since last",
+                    turn.description,
+                    cue_num,
+                    turn.dist,
+                    distances.interval[cue_num],
+                    extra={
+                        "event": "cue",
+                        "cue_number": cue_num,
+                        "distance_km": turn.dist,
+                        "interval_km": distances.interval[cue_num],
+                    },
+                )
+
+            _write_data_row(
+                worksheet,
+                turn,
+                cue_num,
+                row_num,
+                last_col_letter,
+                distances.after_control[cue_num],
+                distances.since_control[cue_num],
+                distances.interval[cue_num],
+                layout.row_heights[cue_num],
+                formats,
+                opts,
+            )
+            row_num += 1
+
+        final_row = _add_footer_information(worksheet, row_num, last_col_letter, formats)
+
+        if opts.include_elevation_chart:
+            final_row = _add_elevation_chart(workbook, worksheet, final_row, csv_values, opts)
+
+        # Printing setup
+        worksheet.print_area("A1:{0}{1}".format(last_col_letter, final_row))
+        if layout.page_breaks:
+            worksheet.set_h_pagebreaks([last_header_row + cue_idx for cue_idx in layout.page_breaks])
+
+    finally:
+        workbook.close()
+
+
+def _create_excel_formats(workbook: xlsxwriter.Workbook, two_decimals_for_dist: bool) -> _Formats:
+    defaults = {"font_size": 8, "font_name": "Arial"}
+    a_12_opts = {"font_size": 12, "font_name": "Arial"}
+    centered = {"align": "center", "valign": "vcenter", "text_wrap": True}
+    float_top = {"valign": "top"}
+    all_border = {"border": 1}
+
+    return _Formats(
+        title_format=workbook.add_format({**{"rotation": 90}, **defaults, **all_border}),
+        description_format=workbook.add_format({**centered, **defaults, **all_border}),
+        control_format=workbook.add_format(
+            {
+                **{"bold": True, "bg_color": "#C0C0C0", "text_wrap": True},
+                **centered,
+                **a_12_opts,
+                **all_border,
+            }
+        ),
+        arial_12=workbook.add_format({**a_12_opts, **float_top, **all_border}),
+        arial_12_no_border=workbook.add_format(
+            {**a_12_opts, **all_border, **{"left_color": "white", "right_color": "white"}}
+        ),
+        dist_format=workbook.add_format(
+            {**{"num_format": "0.00" if two_decimals_for_dist else "0.0"}, **float_top, **a_12_opts, **all_border}
+        ),
+        dist_since_format=workbook.add_format({**{"num_format": "0.0"}, **float_top, **a_12_opts, **all_border}),
+        cue_format=workbook.add_format({**{"text_wrap": True}, **float_top, **a_12_opts, **all_border}),
+        red_title=workbook.add_format({**{"font_color": "red"}, **a_12_opts, **centered}),
+        black_title=workbook.add_format({**{"font_color": "black"}, **a_12_opts, **centered}),
+        danger_format=workbook.add_format(
+            {
+                **{"bg_color": "#ffd700", "bold": True, "text_wrap": True},
+                **a_12_opts,
+                **all_border,
+            }
+        ),
+    )
+
+
+def _setup_worksheet_headers(
+    worksheet: Worksheet, formats: _Formats, opts: GenerationOptions, cues: List[Cue]
+) -> tuple[str, int]:
+    curr_col = 0
+    num_cols = 4
+    if opts.include_distance_from_last:
+        num_cols += 1
+    if opts.hide_direction:
+        num_cols -= 1
+
+    row_num = 1
+    last_col_letter = _as_letter(num_cols)
+
+    # Header rows
+    worksheet.merge_range("A1:{0}1".format(last_col_letter), opts.event_details.name, formats.red_title)
+    row_num += 1
+    worksheet.merge_range("A2:{0}2".format(last_col_letter), opts.event_details.date, formats.red_title)
+    row_num += 1
+    worksheet.merge_range("A3:{0}3".format(last_col_letter), opts.event_details.organizer, formats.red_title)
+    row_num += 1
+    worksheet.merge_range("A4:{0}4".format(last_col_letter), opts.event_details.start_location, formats.red_title)
+    row_num += 1
+    if opts.event_details.finish_location:
+        worksheet.merge_range("A5:{0}5".format(last_col_letter), opts.event_details.finish_location, formats.red_title)
+        row_num += 1
+
+    # Column headers
+    worksheet.write(f"A{row_num}", "Dist.(cum.)", formats.title_format)
+    curr_col += 1
+
+    if opts.include_distance_from_last:
+        worksheet.write(_as_letter(curr_col) + str(row_num), "Dist. Since", formats.title_format)
+        curr_col += 1
+
+    worksheet.write(_as_letter(curr_col) + str(row_num), "Turn", formats.title_format)
+    curr_col += 1
+
+    if not opts.hide_direction:
+        worksheet.write(_as_letter(curr_col) + str(row_num), "Direction", formats.title_format)
+        curr_col += 1
+
+    # Column widths
+    width = 7.5 if cues[len(cues) - 1].dist > DISTANCE_THRESHOLD_FOR_WIDE_COLUMN else 6.5
+    worksheet.set_column("A:A", width)
+    worksheet.set_column("B:" + _as_letter(curr_col), 5.6)
+    worksheet.write(_as_letter(curr_col) + str(row_num), "Route Description", formats.description_format)
+    worksheet.set_column("{0}:{0}".format(_as_letter(curr_col)), DESCRIPTION_COLUMN_WIDTH)
+    curr_col += 1
+
+    worksheet.write(_as_letter(curr_col) + str(row_num), "Dist.(int.)", formats.title_format)
+    worksheet.set_column("{0}:{0}".format(_as_letter(curr_col)), 5.6)
+
+    return _as_letter(curr_col), row_num
+
+
+def _write_data_row(
+    worksheet: Worksheet,
+    cue: Cue,
+    cue_num: int,
+    row_num: int,
+    last_col_letter: str,
+    last_was_control: bool,
+    ctrl_sum: Decimal,
+    curr_dist: Decimal,
+    row_height: float,
+    formats: _Formats,
+    opts: GenerationOptions,
+) -> None:
+    curr_col = 0
+
+    if cue_num == 1:  # no distance yet
+        worksheet.write(row_num, curr_col, 0, formats.dist_format)
+    else:
+        prev_row = row_num
+        if last_was_control and cue_num > 2:
+            prev_row -= 1  # read distance from before control
+        incremental_distance_formula = f"=A{prev_row}+{last_col_letter}{prev_row}"
+        worksheet.write(
+            row_num,
+            curr_col,
+            incremental_distance_formula,
+            formats.dist_format,
+        )
+    curr_col += 1
+
+    if opts.include_distance_from_last:
+        worksheet.write(row_num, curr_col, ctrl_sum, formats.dist_since_format)
+        curr_col += 1
+
+    if cue.is_control:
+        logger.info(
+            "Writing control at row %d with description '%s'",
+            row_num,
+            cue.description,
+            extra={"event": "control", "cue_number": cue_num, "row": row_num},
+        )
+
+        worksheet.write_string(row_num, curr_col, "", formats.arial_12_no_border)
+        curr_col += 1
+
+        if not opts.hide_direction:
+            worksheet.write_string(row_num, curr_col, "", formats.arial_12)
+            curr_col += 1
+
+        if cue_num == 0:  # depart, no data so far
+            worksheet.merge_range(
+                # n.b. convert row_num to 1-based index for Excel
+                f"A{row_num + 1}:{_as_letter(curr_col - 1)}{row_num + 1}",
+                "",
+                formats.arial_12,
+            )
+
+        worksheet.write_string(row_num, curr_col, cue.description, formats.control_format)
+        curr_col += 1
+        worksheet.write_string(row_num, curr_col, "", formats.arial_12)
+        worksheet.set_row(row=row_num, height=row_height)
+    else:
+        worksheet.write_string(
+            row_num, curr_col, cue.turn, formats.danger_format if cue.is_danger else formats.arial_12
+        )
+        curr_col += 1
+
+        if not opts.hide_direction:
+            worksheet.write_string(row_num, curr_col, "", formats.arial_12)
+            curr_col += 1
+
+        worksheet.write_string(
+            row_num, curr_col, cue.description, formats.danger_format if cue.is_danger else formats.cue_format
+        )
+        curr_col += 1
+        worksheet.write_number(row_num, curr_col, curr_dist, formats.dist_format)
+        worksheet.set_row(row=row_num, height=row_height)
+
+    assert _as_letter(curr_col) == last_col_letter, "Column letter mismatch"
+
+
+def _add_elevation_chart(
+    workbook: xlsxwriter.Workbook,
+    worksheet: Worksheet,
+    row_num: int,
+    csv_values: List[List[str]],
+    opts: GenerationOptions,
+) -> int:
+    profile = elevation_points(csv_values)
+    if len(profile) < 2:
+        logger.warning("Not enough elevation data for an elevation chart")
+        return row_num
+
+    controls = elevation_points([row for row in csv_values if _is_control_row(row, opts)])
+    add_elevation_chart(workbook, worksheet, row_num, profile, controls, opts.elevation_chart_points)
+    return row_num + CHART_ROWS
+
+
+def _as_letter(num_after: int) -> str:
+    return chr(65 + num_after)
+
+
+def _add_footer_information(worksheet: Worksheet, row_num: int, last_col_letter: str, formats: _Formats) -> int:
+    row_num += 1
+    worksheet.merge_range(
+        "A{0}:{1}{0}".format(row_num, last_col_letter),
+        "IN CASE OF ABANDONMENT OR EMERGENCY",
+        formats.black_title,
+    )
+    row_num += 1
+    worksheet.merge_range(
+        "A{0}:{1}{0}".format(row_num, last_col_letter),
+        "PHONE: ** ORGANIZER'S NUMBER **",
+        formats.black_title,
+    )
+    row_num += 2
+    worksheet.merge_range(
+        f"A{row_num}:{last_col_letter}{row_num}",
+        data="TA=Turn Around, BL=Bear Left, BR=Bear Right, CO=Continue On",
+        cell_format=formats.black_title,
+    )
+    worksheet.set_row(row=row_num - 1, height=CONTROL_ROW_HEIGHT * 2)
+    return row_num + 1
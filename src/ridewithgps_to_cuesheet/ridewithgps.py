@@ -1,8 +1,16 @@
 from dataclasses import dataclass
+from email.message import Message
+from typing import Iterator, Literal, Optional
 
 import requests
 
 from .logger import logger
+from .route_json import RouteJson, parse_route_json
+from .utils import resolve_encoding
+
+SESSION_NAME = "ridewithgps-to-cuesheet"
+ROUTE_JSON_CHUNK_BYTES = 64 * 1024
+ROUTE_LISTING_PAGE_SIZE = 100
 
 
 @dataclass
@@ -11,8 +19,18 @@ class AuthToken:
     token: str
 
 
-def authenticate(email: str, password: str, session_name: str) -> AuthToken:
-    logger.debug(f"Authenticating with RideWithGPS and session name: {session_name}")
+@dataclass(frozen=True)
+class RouteListing:
+    route_id: str
+    name: str
+    updated_at: str  # as reported by RideWithGPS, only ever compared for equality
+
+
+class AuthTokenExpiredError(Exception): ...
+
+
+def authenticate(email: str, password: str, session_name: str = SESSION_NAME) -> AuthToken:
+    logger.debug("Authenticating with RideWithGPS and session name: %s", session_name)
     auth_url = "https://ridewithgps.com/users/current.json"
     response = requests.get(
         auth_url,
@@ -27,20 +45,86 @@ def authenticate(email: str, password: str, session_name: str) -> AuthToken:
     if not auth_token:
         raise ValueError("Failed to retrieve authentication token from RideWithGPS")
 
-    logger.debug("Authenticated successfully. Validating auth")
-    requests.get(auth_url, params={"version": str(2), "auth_token": auth_token, "api_key": session_name}, timeout=10)
-
+    logger.debug("Authenticated successfully")
     return AuthToken(token=auth_token, api_key=session_name)
 
 
 def download_csv_content(route_id: str, auth_token: AuthToken) -> str:
-    logger.debug(f"Downloading CSV content for route ID: {route_id}")
+    logger.debug("Downloading CSV content for route ID: %s", route_id)
     response = requests.get(
         f"https://ridewithgps.com/routes/{route_id}.csv",
         params={"version": str(2), "auth_token": auth_token.token, "api_key": auth_token.api_key},
         timeout=10,
     )
-    response.raise_for_status()
-    response.encoding = response.apparent_encoding
+    _raise_for_status(response)
+
+    content = response.content
+    return content.decode(resolve_encoding(content, _declared_charset(response)))
+
 
-    return response.text
+def download_route_json(route_id: str, auth_token: AuthToken) -> RouteJson:
+    """Fetch a route's course points and track points, decoding the response as it streams in."""
+    logger.debug("Downloading route JSON for route ID: %s", route_id)
+    response = requests.get(
+        f"https://ridewithgps.com/routes/{route_id}.json",
+        params={"version": str(2), "auth_token": auth_token.token, "api_key": auth_token.api_key},
+        timeout=10,
+        stream=True,
+    )
+    try:
+        _raise_for_status(response)
+        route = parse_route_json(response.iter_content(chunk_size=ROUTE_JSON_CHUNK_BYTES))
+    finally:
+        response.close()
+
+    logger.debug("Route %s: %d course points, %d track points", route_id, len(route.course_points), len(route.geometry))
+    return route
+
+
+def iter_route_listing(
+    owner: Literal["users", "clubs"],
+    owner_id: str,
+    auth_token: AuthToken,
+    page_size: int = ROUTE_LISTING_PAGE_SIZE,
+) -> Iterator[RouteListing]:
+    """Yield every route of a RideWithGPS user or club, requesting one page of `page_size` routes at a time."""
+    offset = 0
+    while True:
+        logger.debug("Listing routes of %s/%s from offset %d", owner, owner_id, offset)
+        response = requests.get(
+            f"https://ridewithgps.com/{owner}/{owner_id}/routes.json",
+            params={
+                "version": str(2),
+                "auth_token": auth_token.token,
+                "api_key": auth_token.api_key,
+                "offset": str(offset),
+                "limit": str(page_size),
+            },
+            timeout=10,
+        )
+        _raise_for_status(response)
+
+        page = response.json()
+        results = page.get("results", [])
+        for route in results:
+            yield RouteListing(
+                route_id=str(route["id"]), name=route.get("name") or "", updated_at=str(route.get("updated_at") or "")
+            )
+
+        offset += len(results)
+        total = page.get("results_count")
+        if len(results) < page_size or (total is not None and offset >= total):
+            return
+
+
+def _declared_charset(response: requests.Response) -> Optional[str]:
+    # requests assumes ISO-8859-1 for any text/* response without a charset, so read the header directly
+    header = Message()
+    header["content-type"] = response.headers.get("content-type", "")
+    return header.get_content_charset()
+
+
+def _raise_for_status(response: requests.Response) -> None:
+    if response.status_code == 401:
+        raise AuthTokenExpiredError("RideWithGPS rejected the auth token")
+    response.raise_for_status()
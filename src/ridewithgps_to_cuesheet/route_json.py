@@ -0,0 +1,229 @@
+"""Parse RideWithGPS route JSON (`routes/<id>.json`) into cues and track geometry.
+
+Long routes have tens of thousands of track points, so the JSON is decoded as a stream: each track point is read,
+copied into flat arrays and dropped, instead of the whole document being held as nested dicts. Course points (the
+cues) are few and are decoded normally.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+CSV_EXPORT_HEADER = ["Type", "Notes", "Distance (km) From Start", "Elevation (m)", "Description"]
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+@dataclass(frozen=True)
+class CoursePoint:
+    type: str  # the CSV export's Type column, e.g. "Right", "Control"
+    notes: str
+    distance_km: float
+    track_point_index: Optional[int] = None
+
+
+@dataclass
+class RouteGeometry:
+    """Track points as parallel arrays of doubles."""
+
+    latitudes: array = field(default_factory=lambda: array("d"))
+    longitudes: array = field(default_factory=lambda: array("d"))
+    distances_km: array = field(default_factory=lambda: array("d"))
+    elevations: array = field(default_factory=lambda: array("d"))
+
+    def __len__(self) -> int:
+        return len(self.distances_km)
+
+    def append(self, point: Dict[str, Any]) -> None:
+        self.latitudes.append(float(point.get("y", 0.0)))
+        self.longitudes.append(float(point.get("x", 0.0)))
+        self.distances_km.append(float(point.get("d", 0.0)) / 1000)
+        self.elevations.append(float(point.get("e") or 0.0))
+
+    def elevation_at(self, distance_km: float, index: Optional[int] = None) -> float:
+        """Elevation of a track point by index, or interpolated at a distance along the route."""
+        if not self.elevations:
+            return 0.0
+        if index is not None and 0 <= index < len(self):
+            return self.elevations[index]
+
+        after = bisect_left(self.distances_km, distance_km)
+        if after == 0:
+            return self.elevations[0]
+        if after == len(self):
+            return self.elevations[-1]
+        start, end = self.distances_km[after - 1], self.distances_km[after]
+        fraction = (distance_km - start) / (end - start) if end > start else 0.0
+        return self.elevations[after - 1] + fraction * (self.elevations[after] - self.elevations[after - 1])
+
+
+@dataclass
+class RouteJson:
+    route_id: str = ""
+    name: str = ""
+    course_points: List[CoursePoint] = field(default_factory=list)
+    geometry: RouteGeometry = field(default_factory=RouteGeometry)
+
+    @property
+    def total_distance_km(self) -> float:
+        if self.geometry.distances_km:
+            return self.geometry.distances_km[-1]
+        return self.course_points[-1].distance_km if self.course_points else 0.0
+
+    def to_csv_values(self) -> List[List[str]]:
+        """Rows shaped like the CSV export (type, notes, distance km, elevation m, description), without header."""
+        rows = [
+            [point.type, point.notes, *self._position(point.distance_km, point.track_point_index), ""]
+            for point in self.course_points
+        ]
+        if not rows or rows[0][0] != "Start":
+            rows.insert(0, ["Start", "Start of route", *self._position(0.0), ""])
+        if rows[-1][0] != "End":
+            rows.append(["End", "End of route", *self._position(self.total_distance_km, len(self.geometry) - 1), ""])
+        return rows
+
+    def _position(self, distance_km: float, index: Optional[int] = None) -> List[str]:
+        return [f"{distance_km:.2f}", f"{self.geometry.elevation_at(distance_km, index):.1f}"]
+
+
+def parse_route_json(chunks: Iterable[bytes]) -> RouteJson:
+    """
+    Decode route JSON arriving in `chunks` of UTF-8 bytes, e.g. from `requests.Response.iter_content`.
+
+    Both the bare route object and the `{"type": "route", "route": {...}}` envelope are accepted.
+
+    Raises:
+        ValueError: If the content is not valid JSON or not a route
+    """
+    stream = _JsonStream(codecs.iterdecode(chunks, "utf-8"))
+    route = RouteJson()
+    if stream.peek() != "{":
+        raise ValueError("Route JSON must be an object")
+    _read_route_object(stream, route)
+    return route
+
+
+def _read_route_object(stream: _JsonStream, route: RouteJson) -> None:
+    for key in _iter_object_keys(stream):
+        if key == "route" and stream.peek() == "{":
+            _read_route_object(stream, route)
+        elif key == "track_points" and stream.peek() == "[":
+            for point in _iter_array_items(stream):
+                route.geometry.append(point)
+        elif key == "course_points":
+            route.course_points = [_as_course_point(point) for point in stream.value() or []]
+        elif key == "id":
+            route.route_id = str(stream.value())
+        elif key == "name":
+            route.name = str(stream.value() or "")
+        else:
+            stream.value()
+
+
+def _as_course_point(point: Dict[str, Any]) -> CoursePoint:
+    index = point.get("i")
+    return CoursePoint(
+        type=str(point.get("t") or "Generic"),
+        notes=str(point.get("n") or ""),
+        distance_km=float(point.get("d") or 0.0) / 1000,
+        track_point_index=int(index) if index is not None else None,
+    )
+
+
+def _iter_object_keys(stream: _JsonStream) -> Iterator[str]:
+    """Yield each key of the object at the stream's position; the caller must consume its value before resuming."""
+    stream.expect("{")
+    if stream.peek() == "}":
+        stream.expect("}")
+        return
+    while True:
+        key = stream.value()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected an object key at offset {stream.offset}")
+        stream.expect(":")
+        yield key
+        if stream.peek() == "}":
+            stream.expect("}")
+            return
+        stream.expect(",")
+
+
+def _iter_array_items(stream: _JsonStream) -> Iterator[Any]:
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.expect("]")
+        return
+    while True:
+        yield stream.value()
+        if stream.peek() == "]":
+            stream.expect("]")
+            return
+        stream.expect(",")
+
+
+class _JsonStream:
+    """A pull decoder over chunks of JSON text that buffers only the value being decoded."""
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self._buffer = ""
+        self._pos = 0
+        self._consumed = 0  # characters dropped from the front of the buffer
+        self._eof = False
+
+    @property
+    def offset(self) -> int:
+        return self._consumed + self._pos
+
+    def peek(self) -> str:
+        """The next non-whitespace character, or "" at the end of the content."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._read_more():
+                return self._buffer[self._pos : self._pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.offset}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode the complete JSON value at the stream's position."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                error_offset = self._consumed + e.pos
+                if self._read_more(min_size=2 * (len(self._buffer) - self._pos)):
+                    continue
+                raise ValueError(f"Invalid route JSON at offset {error_offset}: {e.msg}") from e
+            # a number at the very end of the buffer may continue in the next chunk
+            if end == len(self._buffer) and self._read_more():
+                continue
+            self._pos = end
+            return value
+
+    def _read_more(self, min_size: int = 0) -> bool:
+        """Append chunks to the buffer (until it holds at least `min_size` characters); False at the end."""
+        if self._eof:
+            return False
+        self._buffer = self._buffer[self._pos :]
+        self._consumed += self._pos
+        self._pos = 0
+        appended = False
+        while not appended or len(self._buffer) < min_size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                break
+            self._buffer += chunk
+            appended = appended or bool(chunk)
+        return appended
@@ -0,0 +1,194 @@
+"""A SQLite FTS5 full-text index over the cues of every stored route.
+
+Each route's CSV is parsed into cues once and its hash recorded; refreshing the index only re-parses CSVs whose
+content changed and drops routes whose CSV is gone, so keeping it current is cheap. Searches are answered by the
+FTS5 index alone, without opening any CSV.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from .catalog import iter_parsed_routes, route_id_for_csv
+from .conversion import Cue, GenerationOptions
+
+# bumped when the layout changes; the index is rebuilt from the CSVs, so an index in an older layout is dropped
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed_routes (
+    route_id TEXT PRIMARY KEY,
+    csv_path TEXT NOT NULL,
+    csv_sha256 TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS cues USING fts5 (
+    description,
+    turn,
+    route_id UNINDEXED,
+    cue_number UNINDEXED,
+    distance UNINDEXED,
+    is_control UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+-- the route of every row of cues: FTS5 cannot index route_id, so a route's cues are found here by rowid
+CREATE TABLE IF NOT EXISTS cue_routes (
+    cue_rowid INTEGER PRIMARY KEY,
+    route_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cue_routes_by_route ON cue_routes (route_id);
+"""
+
+_DROP_SCHEMA = """
+DROP TABLE IF EXISTS cue_routes;
+DROP TABLE IF EXISTS cues;
+DROP TABLE IF EXISTS indexed_routes;
+"""
+
+
+@dataclass(frozen=True)
+class CueMatch:
+    route_id: str
+    cue_number: int
+    distance: Decimal
+    turn: str
+    description: str
+    is_control: bool
+
+
+@dataclass(frozen=True)
+class IndexUpdate:
+    indexed: List[str]
+    unchanged: int
+    removed: int
+    failed: Dict[str, str]  # route ID to the reason its CSV could not be indexed
+
+
+def as_fts_query(text: str) -> str:
+    """Quote every word of `text` so punctuation (e.g. "Hwy-99", "St.") is matched literally; all words must match."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class CueIndex:
+    def __init__(self, path: Path | str, timeout: float = 30.0):
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path), timeout=timeout, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            self._conn.executescript(_DROP_SCHEMA)
+            self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> CueIndex:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def indexed_hashes(self) -> Dict[str, str]:
+        """The CSV hash every indexed route was indexed from."""
+        rows = self._conn.execute("SELECT route_id, csv_sha256 FROM indexed_routes")
+        return {row["route_id"]: row["csv_sha256"] for row in rows}
+
+    def index_route(self, route_id: str, csv_path: Path, csv_sha256: str, cues: List[Cue]) -> None:
+        """Replace the indexed cues of a route."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._conn.execute("SELECT 1 FROM indexed_routes WHERE route_id = ?", (route_id,)).fetchone():
+                self._delete_cues(route_id)
+            first_rowid = self._conn.execute("SELECT COALESCE(MAX(cue_rowid), 0) + 1 FROM cue_routes").fetchone()[0]
+            rowids = range(first_rowid, first_rowid + len(cues))
+            self._conn.executemany(
+                "INSERT INTO cue_routes (cue_rowid, route_id) VALUES (?, ?)", ((rowid, route_id) for rowid in rowids)
+            )
+            self._conn.executemany(
+                "INSERT INTO cues (rowid, description, turn, route_id, cue_number, distance, is_control) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (rowid, cue.description, cue.turn, route_id, number, str(cue.last_dist), int(cue.is_control))
+                    for number, (rowid, cue) in enumerate(zip(rowids, cues), start=1)
+                ),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO indexed_routes (route_id, csv_path, csv_sha256, indexed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (route_id, str(csv_path.absolute()), csv_sha256, time.time()),
+            )
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def remove_route(self, route_id: str) -> None:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete_cues(route_id)
+            self._conn.execute("DELETE FROM indexed_routes WHERE route_id = ?", (route_id,))
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _delete_cues(self, route_id: str) -> None:
+        self._conn.execute(
+            "DELETE FROM cues WHERE rowid IN (SELECT cue_rowid FROM cue_routes WHERE route_id = ?)", (route_id,)
+        )
+        self._conn.execute("DELETE FROM cue_routes WHERE route_id = ?", (route_id,))
+
+    def search(self, query: str, limit: int = 50) -> List[CueMatch]:
+        """
+        Cues matching an FTS5 `query` (see as_fts_query for plain words), best matches first.
+
+        Raises:
+            sqlite3.OperationalError: If the query is not valid FTS5 syntax
+        """
+        rows = self._conn.execute(
+            "SELECT route_id, cue_number, distance, turn, description, is_control FROM cues WHERE cues MATCH ? "
+            "ORDER BY rank, route_id, cue_number LIMIT ?",
+            (query, limit),
+        )
+        return [
+            CueMatch(
+                route_id=row["route_id"],
+                cue_number=int(row["cue_number"]),
+                distance=Decimal(row["distance"]),
+                turn=row["turn"],
+                description=row["description"],
+                is_control=bool(row["is_control"]),
+            )
+            for row in rows
+        ]
+
+
+def refresh_index(index: CueIndex, csv_paths: Iterable[Path], opts: GenerationOptions) -> IndexUpdate:
+    """
+    Bring the index in line with `csv_paths`: (re)index the CSVs whose content changed and drop vanished routes.
+
+    A CSV that cannot be read or has invalid cues is reported in IndexUpdate.failed and keeps its previous entry.
+    """
+    csv_paths = list(csv_paths)
+    indexed_hashes = index.indexed_hashes()
+    indexed: List[str] = []
+    failed: Dict[str, str] = {}
+    for route_id, csv_path, parsed in iter_parsed_routes(csv_paths, opts, known_hashes=indexed_hashes):
+        if isinstance(parsed, str):
+            failed[route_id] = parsed
+            continue
+        index.index_route(route_id, csv_path, parsed.csv_sha256, parsed.cues)
+        indexed.append(route_id)
+
+    seen = {route_id_for_csv(csv_path) for csv_path in csv_paths}
+    unchanged = len(seen) - len(indexed) - len(failed)
+    removed = [route_id for route_id in indexed_hashes if route_id not in seen]
+    for route_id in removed:
+        index.remove_route(route_id)
+    return IndexUpdate(indexed=indexed, unchanged=unchanged, removed=len(removed), failed=failed)
@@ -1,9 +1,15 @@
+import json
 import os
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from typing import Optional
 
 from dotenv import load_dotenv
 
+from .logger import logger
+from .ridewithgps import AuthToken
+from .workspace import atomic_write_text
+
 
 @dataclass(frozen=True)
 class UserPasswordCredentials:
@@ -34,3 +40,35 @@ def load_credentials() -> UserPasswordCredentials:
         raise ValueError("Missing required environment variable: RIDEWITHGPS_PASSWORD")
 
     return UserPasswordCredentials(username=username, password=password)
+
+
+def default_token_cache_path() -> Path:
+    cache_home = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(cache_home) / "ridewithgps-to-cuesheet" / "auth_token.json"
+
+
+def load_cached_auth_token(cache_path: Optional[Path] = None) -> Optional[AuthToken]:
+    """Return the cached auth token, or None if there is no usable cache."""
+    cache_path = cache_path or default_token_cache_path()
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+        return AuthToken(api_key=data["api_key"], token=data["token"])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning("Ignoring unreadable auth token cache %s: %s", cache_path, e)
+        return None
+
+
+def save_cached_auth_token(auth_token: AuthToken, cache_path: Optional[Path] = None) -> None:
+    """Persist the auth token, readable by the current user only."""
+    cache_path = cache_path or default_token_cache_path()
+    cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    # the temporary file comes from mkstemp: created 0600 whatever else is in the directory, and under a name of
+    # its own, so concurrent saves do not write to or rename each other's file
+    atomic_write_text(cache_path, json.dumps(asdict(auth_token)), mode=0o600)
+
+
+def clear_cached_auth_token(cache_path: Optional[Path] = None) -> None:
+    (cache_path or default_token_cache_path()).unlink(missing_ok=True)
@@ -0,0 +1,170 @@
+"""Near-duplicate route detection from cue sequences, with MinHash signatures and locality-sensitive hashing.
+
+A route becomes a set of shingles: runs of consecutive cue descriptions (as printed on the cuesheet) together with
+the distance each run spans, rounded to the kilometre. Shingles read the same in either direction, so a reversed
+route naming the same roads still shares them. The share of MinHash values two signatures agree on estimates the
+Jaccard similarity of the routes' shingles, and LSH only compares routes whose signatures collide in at least one
+band, so grouping thousands of routes is not quadratic.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import struct
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from .catalog import iter_parsed_routes
+from .conversion import Cue, GenerationOptions
+
+DEFAULT_NUM_PERMUTATIONS = 128
+DEFAULT_SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.5
+
+_EMPTY_SLOT = 1 << 32  # signature value of a route without shingles, larger than any hash
+_NON_WORD = re.compile(r"\W+")
+
+Signature = Tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class DuplicateGroup:
+    route_ids: List[str]
+    similarity: float  # lowest estimated similarity among the pairs that linked the group
+
+
+def cue_shingles(cues: Sequence[Cue], size: int = DEFAULT_SHINGLE_SIZE) -> Set[str]:
+    """
+    Shingles of `size` consecutive turn cues; controls are left out since forks often rename or move them.
+
+    Args:
+        cues: Parsed cues of a route, e.g. from conversion.parse_route
+        size: Cues per shingle; routes with fewer turn cues give a single shingle
+    """
+    turns = [cue for cue in cues if not cue.is_control]
+    names = [_normalize(cue.description) for cue in turns]
+    shingles = set()
+    for start in range(max(len(turns) - size + 1, 1)):
+        window = names[start : start + size]
+        if not window:
+            break
+        span = turns[start + len(window) - 1].last_dist - turns[start].last_dist
+        km = span.quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+        shingles.add("\x1f".join(min(window, window[::-1]) + [str(km)]))
+    return shingles
+
+
+def minhash_signature(shingles: Iterable[str], num_permutations: int = DEFAULT_NUM_PERMUTATIONS) -> Signature:
+    """
+    For each of `num_permutations` hash functions, the smallest hash of any shingle.
+
+    The hash functions are consecutive 32-bit words of one SHAKE-128 digest per shingle, which costs a single C call
+    per shingle instead of one Python-level hash per shingle and function.
+    """
+    unpack = _hash_words(num_permutations).unpack
+    hashes = [unpack(hashlib.shake_128(shingle.encode()).digest(4 * num_permutations)) for shingle in shingles]
+    if not hashes:
+        return (_EMPTY_SLOT,) * num_permutations
+    return tuple(map(min, zip(*hashes)))
+
+
+def estimated_similarity(first: Signature, second: Signature) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+def lsh_bands(threshold: float, num_permutations: int = DEFAULT_NUM_PERMUTATIONS) -> Tuple[int, int]:
+    """
+    The (bands, rows per band) split of a signature whose collision threshold, (1 / bands) ^ (1 / rows), is closest
+    to `threshold`; pairs well above it almost always share a band, pairs well below almost never do.
+    """
+    splits = [(bands, num_permutations // bands) for bands in range(1, num_permutations + 1)]
+    return min(
+        (split for split in splits if split[0] * split[1] == num_permutations),
+        key=lambda split: abs((1 / split[0]) ** (1 / split[1]) - threshold),
+    )
+
+
+def near_duplicate_groups(
+    signatures: Dict[str, Signature], threshold: float = DEFAULT_THRESHOLD
+) -> List[DuplicateGroup]:
+    """
+    Group routes whose estimated similarity reaches `threshold`, directly or through other routes in the group.
+
+    Only routes sharing an LSH band are compared, and routes without turn cues (whose signatures are all empty slots,
+    and so equal to each other) are left out. Groups are sorted by size, then by their first route ID.
+    """
+    signatures = {route_id: signature for route_id, signature in signatures.items() if signature[0] != _EMPTY_SLOT}
+    if not signatures:
+        return []
+    num_permutations = len(next(iter(signatures.values())))
+    bands, rows = lsh_bands(threshold, num_permutations)
+
+    buckets: Dict[Tuple[int, Signature], List[str]] = defaultdict(list)
+    for route_id, signature in signatures.items():
+        for band in range(bands):
+            buckets[(band, signature[band * rows : (band + 1) * rows])].append(route_id)
+
+    candidates = {pair for members in buckets.values() for pair in combinations(sorted(members), 2)}
+    parents = {route_id: route_id for route_id in signatures}
+    linked: Dict[str, float] = {}
+    for first, second in sorted(candidates):
+        similarity = estimated_similarity(signatures[first], signatures[second])
+        if similarity < threshold:
+            continue
+        root_first, root_second = _find(parents, first), _find(parents, second)
+        root = min(root_first, root_second)
+        parents[root_first] = parents[root_second] = root
+        linked[root] = min(similarity, linked.get(root_first, 1.0), linked.get(root_second, 1.0))
+
+    members: Dict[str, List[str]] = defaultdict(list)
+    for route_id in sorted(signatures):
+        members[_find(parents, route_id)].append(route_id)
+    groups = [DuplicateGroup(route_ids, linked[root]) for root, route_ids in members.items() if len(route_ids) > 1]
+    return sorted(groups, key=lambda group: (-len(group.route_ids), group.route_ids[0]))
+
+
+def route_signatures(
+    csv_paths: Iterable[Path],
+    opts: GenerationOptions,
+    num_permutations: int = DEFAULT_NUM_PERMUTATIONS,
+    shingle_size: int = DEFAULT_SHINGLE_SIZE,
+) -> Tuple[Dict[str, Signature], Dict[str, str]]:
+    """
+    Signatures of the routes in `csv_paths` by route ID, and the reason each route was left out: its CSV is
+    unreadable or invalid, or it has no turn cues (controls only) to compare.
+    """
+    signatures: Dict[str, Signature] = {}
+    failed: Dict[str, str] = {}
+    for route_id, _, parsed in iter_parsed_routes(csv_paths, opts):
+        if isinstance(parsed, str):
+            failed[route_id] = parsed
+            continue
+        shingles = cue_shingles(parsed.cues, shingle_size)
+        if not shingles:
+            failed[route_id] = "Route has no turn cues to compare"
+            continue
+        signatures[route_id] = minhash_signature(shingles, num_permutations)
+    return signatures, failed
+
+
+def _normalize(description: str) -> str:
+    return _NON_WORD.sub(" ", description.lower()).strip()
+
+
+@lru_cache(maxsize=None)
+def _hash_words(num_permutations: int) -> struct.Struct:
+    return struct.Struct(f"<{num_permutations}I")
+
+
+def _find(parents: Dict[str, str], route_id: str) -> str:
+    while parents[route_id] != route_id:
+        parents[route_id] = parents[parents[route_id]]
+        route_id = parents[route_id]
+    return route_id
@@ -0,0 +1,31 @@
+"""Binary stream adapters.
+
+Kept out of the compiled modules (see the mypyc include list in pyproject.toml): mypyc cannot compile a subclass of
+one of the C-implemented io classes.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import BinaryIO
+
+
+class PrefixedStream(io.RawIOBase):
+    """The rest of a binary stream, with the bytes already read from it (to detect the encoding) put back in front."""
+
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        self._prefix = memoryview(prefix)
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: memoryview) -> int:  # type: ignore[override]
+        if self._prefix:
+            count = min(len(buffer), len(self._prefix))
+            buffer[:count] = self._prefix[:count]
+            self._prefix = self._prefix[count:]
+            return count
+        data = self._stream.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
@@ -0,0 +1,70 @@
+"""Counts and timings of the rules that rewrite cue descriptions and directions, gathered while parsing routes.
+
+Collection is opt-in (see conversion.collect_rule_telemetry): ordinary parsing only checks whether a collector is
+active. With one active, every description rule the parser tries is timed, whether it matches or not, so the
+totals show both which rules fire on real routes and which ones cost the most to try.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List
+
+FALLBACK_RULE = "fallback"  # descriptions no rule matched, only shortened
+
+_DIGITS = re.compile(r"\d+")
+
+
+@dataclass(frozen=True)
+class RuleReport:
+    name: str
+    attempts: int
+    hits: int
+    seconds: float
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.attempts if self.attempts else 0.0
+
+
+@dataclass
+class RuleTelemetry:
+    attempts: Counter[str] = field(default_factory=Counter)
+    hits: Counter[str] = field(default_factory=Counter)
+    nanoseconds: Counter[str] = field(default_factory=Counter)
+    directions: Counter[str] = field(default_factory=Counter)
+    unknown_directions: Counter[str] = field(default_factory=Counter)
+    unmatched_shapes: Counter[str] = field(default_factory=Counter)
+
+    def record_rule(self, name: str, hit: bool, nanoseconds: int) -> None:
+        self.attempts[name] += 1
+        self.hits[name] += hit
+        self.nanoseconds[name] += nanoseconds
+
+    def record_direction(self, direction: str, known: bool) -> None:
+        self.directions[direction] += 1
+        if not known:
+            self.unknown_directions[direction] += 1
+
+    def record_unmatched(self, description: str) -> None:
+        self.unmatched_shapes[description_shape(description)] += 1
+
+    def rule_reports(self, rule_order: List[str]) -> List[RuleReport]:
+        """A report per rule, in the order the parser tries them."""
+        return [
+            RuleReport(name, self.attempts[name], self.hits[name], self.nanoseconds[name] / 1e9) for name in rule_order
+        ]
+
+
+def description_shape(description: str) -> str:
+    """
+    A description with its names left out, so descriptions worded the same way count together: the leading words
+    up to the first capitalised one, numbers as "#", e.g. "Slight right onto Hwy 99" becomes "Slight right onto …".
+    """
+    words = _DIGITS.sub("#", description).split()
+    for position, word in enumerate(words[1:], start=1):
+        if word[:1].isupper():
+            return " ".join(words[:position] + ["…"])
+    return " ".join(words)
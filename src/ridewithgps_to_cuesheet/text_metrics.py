@@ -0,0 +1,93 @@
+"""Approximate text measurement for laying out cuesheet rows before they are written.
+
+Excel does not tell xlsxwriter how tall a wrapped cell will be, so row heights are estimated from Arial glyph
+advance widths (Arial is metric-compatible with Helvetica, whose AFM widths are used here, in 1/1000 em).
+"""
+
+from __future__ import annotations
+
+import unicodedata
+from functools import lru_cache
+from typing import Dict
+
+_DEFAULT_GLYPH_WIDTH = 556
+
+
+def _widths(glyphs: str, widths: list[int]) -> Dict[str, int]:
+    assert len(glyphs) == len(widths), "Glyph width table is misaligned"
+    return dict(zip(glyphs, widths))
+
+
+_ASCII = " !\"#$%&'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~"
+
+# fmt: off
+_ARIAL_WIDTHS = _widths(_ASCII, [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,  # space to /
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556,  # 0 to 9
+    278, 278, 584, 584, 584, 556, 1015,  # : to @
+    667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833,  # A to M
+    722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611,  # N to Z
+    278, 278, 278, 469, 556, 333,  # [ to `
+    556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833,  # a to m
+    556, 556, 556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500,  # n to z
+    334, 260, 334, 584,  # { to ~
+])
+
+_ARIAL_BOLD_WIDTHS = _widths(_ASCII, [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,  # space to /
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556,  # 0 to 9
+    333, 333, 584, 584, 584, 611, 975,  # : to @
+    722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833,  # A to M
+    722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611,  # N to Z
+    333, 278, 333, 584, 556, 333,  # [ to `
+    556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889,  # a to m
+    611, 611, 611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500,  # n to z
+    389, 280, 389, 584,  # { to ~
+])
+# fmt: on
+
+
+def excel_column_width_to_points(width: float) -> float:
+    """Convert an Excel column width (in default-font character units) to the usable text width in points."""
+    # Calibri 11 (the xlsxwriter default font) has a 7px maximum digit width, plus 5px of cell padding at 96 dpi
+    pixels = int(width * 7 + 0.5) + 5
+    return (pixels - 5) * 0.75
+
+
+def _glyph_width(char: str, widths: Dict[str, int]) -> int:
+    if char in widths:
+        return widths[char]
+    base = unicodedata.normalize("NFKD", char)[:1]  # É -> E
+    return widths.get(base, _DEFAULT_GLYPH_WIDTH)
+
+
+def text_width(text: str, font_size: float, bold: bool = False) -> float:
+    """Width of `text` in points when set in Arial at `font_size`."""
+    widths = _ARIAL_BOLD_WIDTHS if bold else _ARIAL_WIDTHS
+    return sum(_glyph_width(char, widths) for char in text) * font_size / 1000
+
+
+@lru_cache(maxsize=4096)
+def wrapped_line_count(text: str, available_width: float, font_size: float, bold: bool = False) -> int:
+    """
+    Estimate how many lines Excel needs to show `text` in a wrapping cell `available_width` points wide.
+
+    Words are wrapped greedily at spaces; a word wider than the cell is split across lines like Excel does.
+    """
+    space = text_width(" ", font_size, bold)
+    lines = 1
+    used = 0.0
+    for word in text.split():
+        word_width = text_width(word, font_size, bold)
+        needed = word_width if used == 0 else used + space + word_width
+        if needed <= available_width:
+            used = needed
+            continue
+
+        if used > 0:
+            lines += 1
+        while word_width > available_width:
+            lines += 1
+            word_width -= available_width
+        used = word_width
+    return lines
@@ -1,11 +1,71 @@
+import codecs
 import csv
+import io
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Iterator, List, Optional, TextIO
+
+from .streams import PrefixedStream
+
+# Only this many leading bytes are inspected when the encoding has to be guessed
+ENCODING_DETECTION_PREFIX_BYTES = 64 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def resolve_encoding(prefix: bytes, declared: Optional[str] = None) -> str:
+    """
+    Pick the text encoding for CSV content from its declared charset or its leading bytes.
+
+    A byte order mark always wins, then the declared charset if Python knows it. Otherwise the prefix is checked
+    for UTF-8, then handed to charset_normalizer (if installed), falling back to Latin-1.
+
+    Args:
+        prefix: The first bytes of the content; at most ENCODING_DETECTION_PREFIX_BYTES are inspected
+        declared: Charset declared by the source, e.g. from an HTTP Content-Type header
+
+    Returns:
+        A codec name suitable for bytes.decode() or open()
+    """
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+
+    if declared:
+        try:
+            return codecs.lookup(declared).name
+        except LookupError:
+            pass
+
+    prefix = prefix[:ENCODING_DETECTION_PREFIX_BYTES]
+
+    try:
+        # final=False tolerates a multi-byte character cut off at the end of the prefix
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return "latin-1"
+
+    best = from_bytes(prefix).best()
+    return best.encoding if best else "latin-1"
 
 
 def read_csv_to_array(filename: str) -> List[List[str]]:
     """
-    Read a UTF-8 CSV file and return its contents as a list of lists, skipping the header row.
+    Read a CSV file and return its contents as a list of lists, skipping the header row.
+
+    The encoding is resolved from the first bytes of the file (see resolve_encoding), so UTF-8 with or without a
+    BOM, UTF-16 and Latin-1 exports are all accepted.
 
     Args:
         filename: Path to the CSV file
@@ -16,9 +76,24 @@ def read_csv_to_array(filename: str) -> List[List[str]]:
     Raises:
         FileNotFoundError: If the CSV file doesn't exist
         PermissionError: If the file cannot be read due to permissions
-        UnicodeDecodeError: If the file is not valid UTF-8
+        UnicodeDecodeError: If the file does not decode with the detected encoding
         csv.Error: If there's an error parsing the CSV
     """
+    return list(iter_csv_rows(filename))
+
+
+def iter_csv_rows(filename: str) -> Iterator[List[str]]:
+    """
+    Yield the rows of a CSV file one at a time, skipping the header row.
+
+    Same encoding handling and errors as read_csv_to_array, for callers that only keep some of the rows.
+
+    Args:
+        filename: Path to the CSV file
+
+    Yields:
+        Each CSV row after the header
+    """
     file_path = Path(filename)
 
     if not file_path.exists():
@@ -27,24 +102,54 @@ def read_csv_to_array(filename: str) -> List[List[str]]:
     if not file_path.is_file():
         raise ValueError(f"Path is not a file: {filename}")
 
-    values: List[List[str]] = []
+    encoding = "utf-8"
     try:
-        with open(file_path, "r", encoding="utf-8", newline="") as csvfile:
-            reader = csv.reader(csvfile)
-            # Skip header row if file is not empty
-            try:
-                next(reader)
-            except StopIteration:
-                # File is empty or only has header
-                return values
-
-            values = list(reader)
+        with open(file_path, "rb") as rawfile:
+            encoding = resolve_encoding(rawfile.read(ENCODING_DETECTION_PREFIX_BYTES))
 
+        with open(file_path, "r", encoding=encoding, newline="") as csvfile:
+            yield from _rows_after_header(csvfile, filename, encoding)
     except PermissionError:
         raise PermissionError(f"Permission denied reading file: {filename}")
+
+
+def iter_csv_stream(stream: BinaryIO, name: str = "<stdin>") -> Iterator[List[str]]:
+    """
+    Yield the rows of CSV content read from a binary stream (e.g. stdin), skipping the header row.
+
+    The stream is decoded as it is read, with the encoding resolved from its first bytes as for files, so a pipe
+    is parsed without being saved or read whole first.
+
+    Args:
+        stream: Readable binary stream, read to its end
+        name: Name of the stream in error messages
+
+    Yields:
+        Each CSV row after the header
+
+    Raises:
+        UnicodeDecodeError: If the content does not decode with the detected encoding
+        csv.Error: If there's an error parsing the CSV
+    """
+    prefix = stream.read(ENCODING_DETECTION_PREFIX_BYTES)
+    encoding = resolve_encoding(prefix)
+    text = io.TextIOWrapper(io.BufferedReader(PrefixedStream(prefix, stream)), encoding=encoding, newline="")
+    yield from _rows_after_header(text, name, encoding)
+
+
+def _rows_after_header(csvfile: TextIO, name: str, encoding: str) -> Iterator[List[str]]:
+    try:
+        reader = csv.reader(csvfile)
+        # Skip header row if file is not empty
+        try:
+            next(reader)
+        except StopIteration:
+            # File is empty or only has header
+            return
+
+        yield from reader
+
     except UnicodeDecodeError as e:
-        raise UnicodeDecodeError(e.encoding, e.object, e.start, e.end, f"File is not valid UTF-8: {filename}")
+        raise UnicodeDecodeError(e.encoding, e.object, e.start, e.end, f"File is not valid {encoding}: {name}")
     except csv.Error as e:
-        raise csv.Error(f"Error parsing CSV file {filename}: {e}")
-
-    return values
+        raise csv.Error(f"Error parsing CSV file {name}: {e}")
@@ -0,0 +1,142 @@
+"""Watch a directory of RideWithGPS CSV exports and regenerate cuesheets as they change.
+
+File events come from watchdog (inotify on Linux) when it is installed, otherwise from polling the directory's
+modification times. Bursts of events for the same file are debounced so a CSV is converted once it stops changing.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .logger import logger
+
+DEFAULT_DEBOUNCE_SECONDS = 0.25
+DEFAULT_POLL_INTERVAL_SECONDS = 0.5
+
+_Snapshot = Dict[Path, Tuple[int, int]]
+
+
+class Debouncer:
+    """Collects changed paths and releases each one after it has been quiet for `delay` seconds."""
+
+    def __init__(self, delay: float = DEFAULT_DEBOUNCE_SECONDS):
+        self.delay = delay
+        self._pending: Dict[Path, float] = {}
+
+    def touch(self, path: Path, now: float) -> None:
+        self._pending[path] = now
+
+    def ready(self, now: float) -> List[Path]:
+        settled = [path for path, last_seen in self._pending.items() if now - last_seen >= self.delay]
+        for path in settled:
+            del self._pending[path]
+        return settled
+
+    def next_deadline(self) -> Optional[float]:
+        return min(self._pending.values()) + self.delay if self._pending else None
+
+
+def is_csv(path: Path) -> bool:
+    return path.suffix.lower() == ".csv" and not path.name.startswith(".")
+
+
+def snapshot_csv_files(directory: Path) -> _Snapshot:
+    snapshot: _Snapshot = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            path = Path(entry.path)
+            if entry.is_file() and is_csv(path):
+                stat = entry.stat()
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def changed_paths(before: _Snapshot, after: _Snapshot) -> List[Path]:
+    """Paths that were created or modified between two snapshots (deletions are ignored)."""
+    return [path for path, signature in after.items() if before.get(path) != signature]
+
+
+def _poll_for_changes(directory: Path, events: queue.Queue[Path], stop: threading.Event, interval: float) -> None:
+    previous = snapshot_csv_files(directory)
+    while not stop.wait(interval):
+        current = snapshot_csv_files(directory)
+        for path in changed_paths(previous, current):
+            events.put(path)
+        previous = current
+
+
+def _start_event_source(
+    directory: Path, events: queue.Queue[Path], stop: threading.Event, poll_interval: float
+) -> Callable[[], None]:
+    """Start feeding changed CSV paths into `events`; returns a function that stops the source."""
+    try:
+        from watchdog.events import FileSystemEvent, FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        logger.debug("watchdog is not installed, polling %s every %ss", directory, poll_interval)
+        poller = threading.Thread(target=_poll_for_changes, args=(directory, events, stop, poll_interval), daemon=True)
+        poller.start()
+        return lambda: poller.join()
+
+    class _CsvEventHandler(FileSystemEventHandler):
+        def on_any_event(self, event: FileSystemEvent) -> None:
+            if event.is_directory or event.event_type not in ("created", "modified", "moved", "closed"):
+                return
+            path = Path(os.fsdecode(event.dest_path or event.src_path))
+            if is_csv(path):
+                events.put(path)
+
+    observer = Observer()
+    observer.schedule(_CsvEventHandler(), str(directory), recursive=False)
+    observer.start()
+    logger.debug("Watching %s with %s", directory, type(observer).__name__)
+
+    def stop_observer() -> None:
+        observer.stop()
+        observer.join()
+
+    return stop_observer
+
+
+def watch_directory(
+    directory: Path,
+    on_change: Callable[[Path], None],
+    stop: Optional[threading.Event] = None,
+    debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+    poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+) -> None:
+    """
+    Call `on_change` for every CSV in `directory` that is created or modified, until `stop` is set.
+
+    Args:
+        directory: Directory to watch (not recursive)
+        on_change: Called with the path of each settled CSV, on the calling thread
+        stop: Event that ends the watch; runs until interrupted if not given
+        debounce: Seconds a file must be quiet before `on_change` is called
+        poll_interval: Seconds between directory scans when watchdog is unavailable
+    """
+    stop = stop or threading.Event()
+    events: queue.Queue[Path] = queue.Queue()
+    debouncer = Debouncer(debounce)
+    stop_source = _start_event_source(directory, events, stop, poll_interval)
+
+    try:
+        while not stop.is_set():
+            deadline = debouncer.next_deadline()
+            timeout = poll_interval if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                debouncer.touch(events.get(timeout=timeout), time.monotonic())
+            except queue.Empty:
+                pass
+
+            for path in debouncer.ready(time.monotonic()):
+                if path.exists():
+                    on_change(path)
+    finally:
+        stop.set()
+        stop_source()
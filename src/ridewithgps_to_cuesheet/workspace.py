@@ -0,0 +1,109 @@
+"""Private job workspaces, atomic publishing and per-route advisory locks.
+
+Results are written inside a temporary workspace next to their destination and moved into place with os.replace,
+which is atomic within a file system, so other runs only ever see complete files. Runs that work on the same route
+hold an exclusive lock on its route ID, so concurrent conversions of different routes proceed in parallel while
+conversions of the same route take turns.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager, suppress
+from pathlib import Path
+from typing import IO, Any, Iterator, Optional
+
+from .logger import logger
+
+LOCK_DIRECTORY_NAME = ".locks"
+
+# read once: os.umask can only be read by setting it, which would race with other threads creating files
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def job_workspace(directory: Path) -> Iterator[Path]:
+    """A private, empty directory inside `directory` (so results can be published atomically), removed afterwards."""
+    directory.mkdir(parents=True, exist_ok=True)
+    workspace = Path(tempfile.mkdtemp(prefix=".job-", dir=directory))
+    try:
+        yield workspace
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def publish(source: Path, destination: Path) -> Path:
+    """Atomically move a finished file from a workspace to its destination, replacing any previous version."""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(source, destination)
+    return destination
+
+
+def atomic_write_bytes(destination: Path, data: bytes, mode: Optional[int] = None) -> None:
+    """
+    Write `data` to a temporary file next to `destination` and move it into place.
+
+    The file gets `mode`, by default the permissions of a newly created file (0o666 less the umask) rather than the
+    owner-only permissions of the temporary file.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{destination.name}.", suffix=".tmp", dir=destination.parent)
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.chmod(tmp_path, 0o666 & ~_UMASK if mode is None else mode)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+
+
+def atomic_write_text(destination: Path, text: str, encoding: str = "utf-8", mode: Optional[int] = None) -> None:
+    atomic_write_bytes(destination, text.encode(encoding), mode)
+
+
+@contextmanager
+def route_lock(directory: Path, route_id: str) -> Iterator[None]:
+    """Hold an exclusive advisory lock on `route_id`, shared by every process using the same `directory`."""
+    lock_directory = directory / LOCK_DIRECTORY_NAME
+    lock_directory.mkdir(parents=True, exist_ok=True)
+    lock_path = lock_directory / (re.sub(r"[^\w.-]", "_", route_id) + ".lock")
+
+    with open(lock_path, "a+b") as lock_file:
+        logger.debug("Waiting for the lock on route %s", route_id)
+        _lock(lock_file)
+        try:
+            yield
+        finally:
+            _unlock(lock_file)
+
+
+try:
+    import fcntl
+
+    def _lock(lock_file: IO[Any]) -> None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+
+    def _unlock(lock_file: IO[Any]) -> None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock(lock_file: IO[Any]) -> None:
+        lock_file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)  # type: ignore[attr-defined]
+                return
+            except OSError:  # LK_LOCK gives up after 10 seconds
+                continue
+
+    def _unlock(lock_file: IO[Any]) -> None:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)  # type: ignore[attr-defined]
@@ -0,0 +1,102 @@
+import io
+import json
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from ridewithgps_to_cuesheet.brevet import (
+    closing_offset,
+    extract_controls,
+    nearest_brevet_distance,
+    opening_offset,
+    write_brevet_card,
+)
+from ridewithgps_to_cuesheet.conversion import GenerationOptions
+from ridewithgps_to_cuesheet.utils import iter_csv_rows
+
+TEST_ROUTE = Path(__file__).parent / "data" / "test_route.csv"
+
+
+def _hours(hours, minutes):
+    return timedelta(hours=hours, minutes=minutes)
+
+
+@pytest.mark.parametrize(
+    "distance, brevet, opens, closes",
+    [
+        (0, 200, _hours(0, 0), _hours(1, 0)),
+        (60, 200, _hours(1, 46), _hours(4, 0)),
+        (100, 200, _hours(2, 56), _hours(6, 40)),
+        (205, 200, _hours(5, 53), _hours(13, 30)),  # past the brevet distance, timed as the finish
+        (550, 600, _hours(17, 8), _hours(36, 40)),
+        (890, 1000, _hours(29, 9), _hours(65, 23)),
+    ],
+)
+def test_acp_control_times(distance, brevet, opens, closes):
+    assert opening_offset(distance, brevet) == opens
+    assert closing_offset(distance, brevet) == closes
+
+
+def test_nearest_brevet_distance():
+    assert nearest_brevet_distance(Decimal("203.4")) == 200
+    assert nearest_brevet_distance(612) == 600
+
+
+def test_extract_controls_keeps_only_controls():
+    rows = [
+        ["Start", "Start of route", "0", "0", ""],
+        ["Right", "Right on Main St", "10.0", "0", ""],
+        ["Generic", "Control: Café", "100.0", "0", ""],
+        ["Left", "Left on Oak St", "150.0", "0", ""],
+        ["End", "End of route", "203.0", "0", ""],
+    ]
+
+    controls = extract_controls(iter(rows), GenerationOptions())
+
+    assert [control.name for control in controls] == ["DÉPART", "Café", "ARRIVÉE"]
+    assert [control.from_previous_km for control in controls] == [Decimal("0"), Decimal("100.0"), Decimal("103.0")]
+    assert controls[-1].closes_after == _hours(13, 30)
+
+
+def test_extract_controls_rejects_bad_distance():
+    with pytest.raises(ValueError, match="Row 2"):
+        extract_controls(iter([["Start", "Start of route", "0"], ["End", "End of route", "far"]]), GenerationOptions())
+
+
+def test_write_brevet_card_formats():
+    controls = extract_controls(iter_csv_rows(str(TEST_ROUTE)), GenerationOptions(), brevet_distance=200)
+
+    as_json = io.StringIO()
+    write_brevet_card(controls, as_json, "json", start=datetime(2024, 5, 4, 6, 0))
+    records = json.loads(as_json.getvalue())
+    assert records[0] == {
+        "control": "1",
+        "name": "DÉPART",
+        "distance_km": "0",
+        "from_previous_km": "0",
+        "opens": "2024-05-04 06:00",
+        "closes": "2024-05-04 07:00",
+    }
+
+    as_csv = io.StringIO()
+    write_brevet_card(controls, as_csv, "csv")
+    lines = as_csv.getvalue().splitlines()
+    assert lines[0] == "control,name,distance_km,from_previous_km,opens,closes"
+    assert len(lines) == len(controls) + 1
+
+
+def test_brevet_card_does_not_import_xlsxwriter():
+    script = (
+        "import sys\n"
+        "from typer.testing import CliRunner\n"
+        "from ridewithgps_to_cuesheet.cli import app\n"
+        f"result = CliRunner().invoke(app, ['brevet-card', {str(TEST_ROUTE)!r}])\n"
+        "assert result.exit_code == 0, result.stdout\n"
+        "print('xlsxwriter' in sys.modules)\n"
+    )
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert completed.stdout.strip() == "False"
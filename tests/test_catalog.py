@@ -0,0 +1,84 @@
+import shutil
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from ridewithgps_to_cuesheet.catalog import ParsedRoute, RouteCatalog, hash_file, iter_parsed_routes, route_id_for_csv
+from ridewithgps_to_cuesheet.conversion import GenerationOptions, RouteSummary, summarize_route
+from ridewithgps_to_cuesheet.utils import read_csv_to_array
+
+TEST_ROUTE = Path(__file__).parent / "data" / "test_route.csv"
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    with RouteCatalog(tmp_path / "catalog.sqlite") as route_catalog:
+        yield route_catalog
+
+
+def test_route_id_for_csv():
+    assert route_id_for_csv(Path("files/downloaded_cues_for_12345.csv")) == "12345"
+    assert route_id_for_csv(Path("files/Fleche 2024.csv")) == "Fleche 2024"
+
+
+def test_iter_parsed_routes(tmp_path):
+    route = Path(shutil.copy(TEST_ROUTE, tmp_path / "downloaded_cues_for_7.csv"))
+    unchanged = Path(shutil.copy(TEST_ROUTE, tmp_path / "unchanged.csv"))
+    unreadable = tmp_path / "unreadable.csv"
+    unreadable.mkdir()
+
+    results = list(
+        iter_parsed_routes([route, unchanged, unreadable], GenerationOptions(), {"unchanged": hash_file(unchanged)})
+    )
+
+    assert [(route_id, csv_path) for route_id, csv_path, _ in results] == [("7", route), ("unreadable", unreadable)]
+    parsed = results[0][2]
+    assert isinstance(parsed, ParsedRoute)
+    assert parsed.csv_sha256 == hash_file(route)
+    assert len(parsed.csv_values) == len(parsed.cues) == 7
+    assert isinstance(results[1][2], str)
+
+
+def test_summarize_route():
+    summary = summarize_route(read_csv_to_array(str(TEST_ROUTE)), GenerationOptions())
+
+    assert summary == RouteSummary(total_distance=Decimal("20.0"), cue_count=7, control_count=4)
+
+
+def test_record_and_get_route(catalog):
+    summary = RouteSummary(total_distance=Decimal("20.0"), cue_count=7, control_count=3)
+
+    csv_sha256 = catalog.record_csv("12345", TEST_ROUTE, summary, downloaded_at=1000.0)
+    catalog.record_csv("12345", TEST_ROUTE, summary)
+
+    route = catalog.get("12345")
+    assert route.csv_sha256 == csv_sha256
+    assert route.downloaded_at == 1000.0  # kept when a later update is not a download
+    assert route.summary == summary
+    assert catalog.get("missing") is None
+
+
+def test_outputs_become_stale_when_csv_changes(catalog, tmp_path):
+    csv_path = tmp_path / "route.csv"
+    csv_path.write_text(TEST_ROUTE.read_text())
+    summary = RouteSummary(total_distance=Decimal("20.0"), cue_count=7, control_count=3)
+    catalog.record_csv("route", csv_path, summary)
+    catalog.record_output("route", tmp_path / "route_cues.xlsx")
+
+    assert [output.is_stale for output in catalog.outputs()] == [False]
+    assert catalog.outputs(stale_only=True) == []
+
+    csv_path.write_text(TEST_ROUTE.read_text() + "Right,Right on Oak St,21.0,30.0,\n")
+    catalog.record_csv("route", csv_path, summary)
+
+    stale = catalog.outputs("route", stale_only=True)
+    assert [output.output_path for output in stale] == [str(tmp_path / "route_cues.xlsx")]
+
+
+def test_record_sync(catalog):
+    catalog.record_sync("12345", "2024-05-01T10:00:00-07:00")
+    catalog.record_sync("12345", "2024-06-01T10:00:00-07:00")
+    catalog.record_sync("67890", "2024-01-01T10:00:00-07:00")
+
+    assert catalog.synced_versions() == {"12345": "2024-06-01T10:00:00-07:00", "67890": "2024-01-01T10:00:00-07:00"}
@@ -0,0 +1,65 @@
+import io
+import math
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from ridewithgps_to_cuesheet.charts import downsample_lttb, elevation_points
+from ridewithgps_to_cuesheet.conversion import GenerationOptions, generate_excel_bytes
+from ridewithgps_to_cuesheet.utils import read_csv_to_array
+
+
+def test_lttb_keeps_endpoints_and_budget():
+    points = [(i / 10, math.sin(i / 50) * 100) for i in range(5000)]
+
+    sampled = downsample_lttb(points, 200)
+
+    assert len(sampled) == 200
+    assert sampled[0] == points[0]
+    assert sampled[-1] == points[-1]
+    assert [x for x, _ in sampled] == sorted(x for x, _ in sampled)
+
+
+def test_lttb_keeps_a_spike():
+    points = [(float(i), 0.0) for i in range(1000)]
+    points[437] = (437.0, 500.0)
+
+    assert (437.0, 500.0) in downsample_lttb(points, 50)
+
+
+def test_lttb_small_inputs_unchanged():
+    points = [(0.0, 1.0), (1.0, 2.0), (2.0, 3.0)]
+
+    assert downsample_lttb(points, 10) == points
+    assert downsample_lttb(points, 3) == points
+
+
+def test_lttb_budget_of_two_keeps_the_endpoints():
+    points = [(0.0, 1.0), (1.0, 5.0), (2.0, 3.0)]
+
+    assert downsample_lttb(points, 2) == [(0.0, 1.0), (2.0, 3.0)]
+    with pytest.raises(ValueError, match="fewer than 2 points"):
+        downsample_lttb(points, 1)
+
+
+def test_elevation_points_skips_rows_without_elevation():
+    rows = [["Start", "Start", "0", "10"], ["Right", "Oak St", "1.5", ""], ["End", "End", "3", "12.5"]]
+
+    assert elevation_points(rows) == [(0.0, 10.0), (3.0, 12.5)]
+
+
+def test_elevation_points_skips_values_that_are_not_finite():
+    rows = [["Start", "Start", "0", "10"], ["Right", "Oak St", "1.5", "nan"], ["Left", "Elm St", "inf", "20"]]
+
+    assert elevation_points(rows) == [(0.0, 10.0)]
+
+
+def test_generate_excel_with_elevation_chart():
+    csv_data = read_csv_to_array(str(Path(__file__).parent / "data" / "test_route.csv"))
+
+    data = generate_excel_bytes(csv_data, GenerationOptions(include_elevation_chart=True))
+
+    names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+    assert "xl/charts/chart1.xml" in names
+    assert "xl/worksheets/sheet2.xml" in names
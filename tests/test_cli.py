@@ -1,10 +1,18 @@
+import json
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
 import typer
 from typer.testing import CliRunner
 
-from ridewithgps_to_cuesheet.cli import app
+from ridewithgps_to_cuesheet.catalog import RouteCatalog
+from ridewithgps_to_cuesheet.cli import app, with_auth_token
+from ridewithgps_to_cuesheet.ridewithgps import AuthToken, AuthTokenExpiredError
+from ridewithgps_to_cuesheet.secrets import UserPasswordCredentials, load_cached_auth_token, save_cached_auth_token
 
 
 @pytest.fixture
@@ -12,7 +20,8 @@ def runner():
     return CliRunner()
 
 
-def test_cli_with_filename(runner, tmp_path):
+def test_cli_with_filename(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
     csv_file = tmp_path / "test.csv"
     csv_file.write_text("Type,Notes,Distance (km) From Start,Elevation (m),Description\n")
     with open(csv_file, "a") as f:
@@ -25,14 +34,17 @@ def test_cli_with_filename(runner, tmp_path):
         mock_generate.assert_called_once()
 
 
-def test_cli_with_url(runner):
+def test_cli_with_url(runner, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
     test_url = "https://ridewithgps.com/routes/12345"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    save_cached_auth_token(AuthToken(api_key="key", token="token"))
 
     with patch("ridewithgps_to_cuesheet.ridewithgps.requests.get") as mock_get:
         mock_response = Mock()
-        mock_response.text = "Type,Notes,Distance (km) From Start,Elevation (m),Description\nStart,Start,0,0,\n"
+        mock_response.content = b"Type,Notes,Distance (km) From Start,Elevation (m),Description\nStart,Start,0,0,\n"
+        mock_response.headers = {"content-type": "text/csv; charset=utf-8"}
         mock_response.raise_for_status = Mock()
-        mock_response.apparent_encoding = "utf-8"
         mock_get.return_value = mock_response
 
         with patch("ridewithgps_to_cuesheet.cli.Converter.generate_excel") as mock_generate:
@@ -40,6 +52,286 @@ def test_cli_with_url(runner):
 
             assert result.exit_code == 0
             mock_generate.assert_called_once()
+            assert mock_get.call_count == 1  # cached token, no authentication round trip
+
+
+def test_cli_with_url_from_route_json(runner, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    save_cached_auth_token(AuthToken(api_key="key", token="token"))
+
+    route = {
+        "course_points": [{"t": "Right", "n": "Turn right onto Main St", "d": 500.0}],
+        "track_points": [
+            {"x": -123.0, "y": 49.0, "d": 0.0, "e": 10.0},
+            {"x": -123.1, "y": 49.1, "d": 2000.0, "e": 20.0},
+        ],
+    }
+    download = Mock(status_code=200)
+    download.iter_content.return_value = [json.dumps(route).encode()]
+
+    with patch("ridewithgps_to_cuesheet.ridewithgps.requests.get", return_value=download) as mock_get:
+        result = runner.invoke(app, ["--url", "https://ridewithgps.com/routes/12345", "--route-json"])
+
+    assert result.exit_code == 0
+    assert mock_get.call_args.args[0] == "https://ridewithgps.com/routes/12345.json"
+    assert (tmp_path / "outputs" / "12345_cues.xlsx").exists()
+    csv_text = (tmp_path / "outputs" / "downloaded_cues_for_12345.csv").read_text(encoding="utf-8")
+    assert "Right,Turn right onto Main St,0.50,12.5," in csv_text
+
+
+def test_cli_with_url_refreshes_expired_token(runner, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    test_url = "https://ridewithgps.com/routes/12345"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    save_cached_auth_token(AuthToken(api_key="key", token="stale"))
+
+    expired = Mock(status_code=401)
+    auth = Mock(status_code=200)
+    auth.json.return_value = {"user": {"auth_token": "fresh"}}
+    download = Mock(status_code=200, content=b"Type,Notes\nStart,Start,0,0,\n", headers={})
+
+    credentials = UserPasswordCredentials(username="user", password="pass")
+    with patch("ridewithgps_to_cuesheet.ridewithgps.requests.get", side_effect=[expired, auth, download]):
+        with patch("ridewithgps_to_cuesheet.cli.load_credentials", return_value=credentials):
+            with patch("ridewithgps_to_cuesheet.cli.Converter.generate_excel") as mock_generate:
+                result = runner.invoke(app, ["--url", test_url])
+
+                assert result.exit_code == 0
+                mock_generate.assert_called_once()
+                assert load_cached_auth_token() == AuthToken(api_key="ridewithgps-to-cuesheet", token="fresh")
+
+
+def test_cli_reports_invalid_rows(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_file = tmp_path / "test.csv"
+    csv_file.write_text(
+        "Type,Notes,Distance (km) From Start,Elevation (m),Description\n"
+        "Start,Start of route,0,0,\n"
+        "Right,Right on Test St,x,0,\n"
+        "Left,Left on Main St,y,0,\n"
+    )
+
+    result = runner.invoke(app, ["--filename", str(csv_file), "--xlsx-directory", str(tmp_path / "out")])
+
+    assert result.exit_code == 1
+    assert "Row 2: Distance 'x' is not a number" in result.stdout
+    assert "Row 3: Distance 'y' is not a number" in result.stdout
+    assert "does not finish" in result.stdout
+
+
+def test_cli_enqueue_and_worker(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_file = tmp_path / "route.csv"
+    csv_file.write_text((Path(__file__).parent / "data" / "test_route.csv").read_text())
+    queue_file = tmp_path / "jobs.sqlite"
+    output_dir = tmp_path / "out"
+
+    result = runner.invoke(app, ["enqueue", str(csv_file), "--queue", str(queue_file), "-x", str(output_dir)])
+    assert result.exit_code == 0
+    assert "Queued job 1" in result.stdout
+
+    result = runner.invoke(app, ["worker", "--queue", str(queue_file)])
+    assert result.exit_code == 0
+    assert "Processed 1 job(s). Queue: 1 done" in result.stdout
+    assert (output_dir / "route_cues.xlsx").exists()
+
+
+def test_cli_conversion_updates_catalog(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_file = tmp_path / "route.csv"
+    csv_file.write_text((Path(__file__).parent / "data" / "test_route.csv").read_text())
+
+    result = runner.invoke(app, ["--filename", str(csv_file)])
+    assert result.exit_code == 0
+
+    result = runner.invoke(app, ["catalog"])
+    assert result.exit_code == 0
+    assert "route" in result.stdout
+    assert "current" in result.stdout
+
+    assert not (tmp_path / "route_cues.xlsx").exists()  # written in a workspace, never the working directory
+    assert [path.name for path in (tmp_path / "outputs").iterdir()] == ["route_cues.xlsx"]
+
+    moved_csv = tmp_path / "files" / "route.csv"
+    moved_csv.write_text(moved_csv.read_text() + "Right,Right on Oak St,21.0,30.0,\n")
+    with RouteCatalog(tmp_path / "files" / "catalog.sqlite") as route_catalog:
+        route_catalog.record_csv("route", moved_csv, route_catalog.get("route").summary)
+
+    result = runner.invoke(app, ["catalog", "--stale"])
+    assert result.exit_code == 0
+    assert "stale" in result.stdout
+
+
+def test_cli_writes_variants(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_file = tmp_path / "route.csv"
+    csv_file.write_text((Path(__file__).parent / "data" / "test_route.csv").read_text())
+
+    result = runner.invoke(app, ["--filename", str(csv_file), "--variant", "standard", "--variant", "island,direction"])
+
+    assert result.exit_code == 0
+    assert (tmp_path / "outputs" / "route_cues_standard.xlsx").exists()
+    assert (tmp_path / "outputs" / "route_cues_island-direction.xlsx").exists()
+    assert (tmp_path / "files" / "route.csv").exists()
+
+
+def test_cli_renders_variants_in_parallel(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_file = tmp_path / "route.csv"
+    csv_file.write_text((Path(__file__).parent / "data" / "test_route.csv").read_text())
+
+    result = runner.invoke(
+        app, ["--filename", str(csv_file), "--variant", "standard", "--variant", "island,2dp", "--parallel"]
+    )
+
+    assert result.exit_code == 0, result.stdout
+    assert zipfile.is_zipfile(tmp_path / "outputs" / "route_cues_standard.xlsx")
+    assert zipfile.is_zipfile(tmp_path / "outputs" / "route_cues_island-2dp.xlsx")
+
+
+def test_cli_keeps_the_output_directory_of_variants(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_file = tmp_path / "route.csv"
+    csv_file.write_text((Path(__file__).parent / "data" / "test_route.csv").read_text())
+
+    result = runner.invoke(app, ["--filename", str(csv_file), "-o", "club/fleche.xlsx", "--variant", "island"])
+
+    assert result.exit_code == 0, result.stdout
+    assert (tmp_path / "outputs" / "club" / "fleche_island.xlsx").exists()
+
+
+def test_cli_rejects_unknown_variant(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    csv_file = tmp_path / "route.csv"
+    csv_file.write_text((Path(__file__).parent / "data" / "test_route.csv").read_text())
+
+    result = runner.invoke(app, ["--filename", str(csv_file), "--variant", "island,sideways"])
+
+    assert result.exit_code != 0
+
+
+def test_cli_sync_only_refreshes_changed_routes(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    save_cached_auth_token(AuthToken(api_key="key", token="token"))
+    listing = {"1": "2024-05-01", "2": "2024-05-01"}
+    route_csv = (Path(__file__).parent / "data" / "test_route.csv").read_bytes()
+
+    def fake_get(url, params, **kwargs):
+        if url.endswith("/routes.json"):
+            response = Mock(status_code=200)
+            results = [{"id": route_id, "name": "", "updated_at": updated} for route_id, updated in listing.items()]
+            response.json.return_value = {"results": results, "results_count": len(results)}
+            return response
+        return Mock(status_code=200, content=route_csv, headers={})
+
+    with patch("ridewithgps_to_cuesheet.ridewithgps.requests.get", side_effect=fake_get) as mock_get:
+        result = runner.invoke(app, ["sync", "--club", "42"])
+        assert result.exit_code == 0
+        assert "2 new or changed" in result.stdout
+        assert (tmp_path / "outputs" / "1_cues.xlsx").exists()
+        assert (tmp_path / "outputs" / "2_cues.xlsx").exists()
+
+        listing["2"] = "2024-06-01"
+        mock_get.reset_mock()
+        result = runner.invoke(app, ["sync", "--club", "42"])
+        assert result.exit_code == 0
+        assert "1 new or changed" in result.stdout
+        downloaded = [call.args[0] for call in mock_get.call_args_list if call.args[0].endswith(".csv")]
+        assert downloaded == ["https://ridewithgps.com/routes/2.csv"]
+
+
+def test_cli_sync_requires_one_owner(runner):
+    result = runner.invoke(app, ["sync"])
+    assert result.exit_code == 1
+
+
+def test_cli_index_and_search(runner, tmp_path):
+    csv_directory = tmp_path / "files"
+    csv_directory.mkdir()
+    route_csv = (Path(__file__).parent / "data" / "test_route.csv").read_bytes()
+    (csv_directory / "downloaded_cues_for_7.csv").write_bytes(route_csv)
+
+    result = runner.invoke(app, ["index", "-c", str(csv_directory)])
+    assert result.exit_code == 0
+    assert "Indexed 1 route(s), 0 unchanged" in result.stdout
+
+    result = runner.invoke(app, ["index", "-c", str(csv_directory)])
+    assert "Indexed 0 route(s), 1 unchanged" in result.stdout
+
+    result = runner.invoke(app, ["search", "Main St", "-c", str(csv_directory)])
+    assert result.exit_code == 0
+    assert "1 cue(s) in 1 route(s)" in result.stdout
+    assert "2.0" in result.stdout
+
+
+def test_cli_search_without_index(runner, tmp_path):
+    result = runner.invoke(app, ["search", "Main", "-c", str(tmp_path)])
+    assert result.exit_code == 1
+
+
+def test_cli_duplicates(runner, tmp_path):
+    route_csv = (Path(__file__).parent / "data" / "test_route.csv").read_text()
+    (tmp_path / "downloaded_cues_for_1.csv").write_text(route_csv)
+    (tmp_path / "downloaded_cues_for_2.csv").write_text(route_csv)
+    (tmp_path / "other.csv").write_text(route_csv.replace("Main St", "Cambie St").replace("Test St", "Oak St"))
+
+    result = runner.invoke(app, ["duplicates", "-c", str(tmp_path)])
+
+    assert result.exit_code == 0
+    assert "1 group(s) of near-duplicates among 3 route(s)" in result.stdout
+    assert "1, 2" in result.stdout
+
+
+def test_cli_export(runner, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    csv_directory = tmp_path / "files"
+    csv_directory.mkdir()
+    route_csv = (Path(__file__).parent / "data" / "test_route.csv").read_bytes()
+    (csv_directory / "downloaded_cues_for_7.csv").write_bytes(route_csv)
+
+    result = runner.invoke(app, ["export", str(tmp_path / "cues.parquet"), "-c", str(csv_directory)])
+
+    assert result.exit_code == 0
+    assert "Exported 7 cue(s) of 1 route(s)" in result.stdout
+    assert pq.read_table(tmp_path / "cues.parquet").column("route_id").to_pylist() == ["7"] * 7
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["cues.parquet", "files"]
+
+
+def test_cli_batch(runner, tmp_path):
+    csv_directory, xlsx_directory = tmp_path / "files", tmp_path / "outputs"
+    csv_directory.mkdir()
+    route_csv = (Path(__file__).parent / "data" / "test_route.csv").read_bytes()
+    for route_id in ("1", "2"):
+        (csv_directory / f"downloaded_cues_for_{route_id}.csv").write_bytes(route_csv)
+
+    result = runner.invoke(
+        app, ["batch", "-c", str(csv_directory), "-x", str(xlsx_directory), "--parsers", "1", "--renderers", "2"]
+    )
+
+    assert result.exit_code == 0, result.stdout
+    assert "Converted 2 route(s), 0 failed, with 1 parser(s) and 2 renderer(s)" in result.stdout
+    assert sorted(path.name for path in xlsx_directory.iterdir()) == [
+        "downloaded_cues_for_1_cues.xlsx",
+        "downloaded_cues_for_2_cues.xlsx",
+    ]
+    with RouteCatalog(csv_directory / "catalog.sqlite") as route_catalog:
+        assert route_catalog.get("2") is not None
+
+
+def test_cli_batch_csv_outside_csv_directory(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    route_csv = tmp_path / "elsewhere" / "route.csv"
+    route_csv.parent.mkdir()
+    route_csv.write_bytes((Path(__file__).parent / "data" / "test_route.csv").read_bytes())
+
+    result = runner.invoke(app, ["batch", str(route_csv), "--parsers", "1", "--renderers", "1"])
+
+    assert result.exit_code == 0, result.stdout
+    assert (tmp_path / "outputs" / "route_cues.xlsx").exists()
+    with RouteCatalog(tmp_path / "files" / "catalog.sqlite") as route_catalog:
+        assert route_catalog.get("route") is not None
 
 
 def test_cli_no_args(runner):
@@ -49,7 +341,8 @@ def test_cli_no_args(runner):
     assert "Error" in result.stdout or "Usage" in result.stdout
 
 
-def test_cli_both_filename_and_url(runner, tmp_path):
+def test_cli_both_filename_and_url(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
     csv_file = tmp_path / "test.csv"
     csv_file.write_text("Type,Notes,Distance (km) From Start,Elevation (m),Description\n")
 
@@ -73,7 +366,8 @@ def test_cli_nonexistent_file(runner):
     assert result.exit_code != 0
 
 
-def test_cli_with_options(runner, tmp_path):
+def test_cli_with_options(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
     csv_file = tmp_path / "test.csv"
     csv_file.write_text("Type,Notes,Distance (km) From Start,Elevation (m),Description\n")
     with open(csv_file, "a") as f:
@@ -86,7 +380,8 @@ def test_cli_with_options(runner, tmp_path):
         mock_generate.assert_called_once()
 
 
-def test_cli_with_custom_output(runner, tmp_path):
+def test_cli_with_custom_output(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
     csv_file = tmp_path / "test.csv"
     csv_file.write_text("Type,Notes,Distance (km) From Start,Elevation (m),Description\n")
     with open(csv_file, "a") as f:
@@ -127,3 +422,116 @@ def test_cli_help(runner):
 
     assert result.exit_code == 0
     assert "Convert RideWithGPS routes" in result.stdout
+
+
+def test_cli_rule_stats(runner, tmp_path):
+    route_csv = (Path(__file__).parent / "data" / "test_route.csv").read_text()
+    (tmp_path / "downloaded_cues_for_1.csv").write_text(route_csv.replace("Right,", "Merge,", 1))
+
+    result = runner.invoke(app, ["rule-stats", "-c", str(tmp_path)])
+
+    assert result.exit_code == 0
+    assert "fallback" in result.stdout
+    assert "Merge" in result.stdout
+    assert "7 cue(s) of 1 route(s), 1 with an unknown direction" in result.stdout
+
+
+def test_cli_pipes_stdin_to_stdout(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    route_csv = (Path(__file__).parent / "data" / "test_route.csv").read_bytes()
+
+    result = runner.invoke(app, ["--filename", "-", "--output", "-"], input=route_csv)
+
+    assert result.exit_code == 0, result.stderr
+    assert result.stdout_bytes.startswith(b"PK")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cli_pipes_cues_as_ndjson(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    route_csv = (Path(__file__).parent / "data" / "test_route.csv").read_bytes()
+
+    result = runner.invoke(app, ["-f", "-", "--format", "ndjson", "--verbose"], input=route_csv)
+
+    assert result.exit_code == 0, result.stderr
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [record["turn"] for record in records][1:3] == ["R", "L"]
+    assert "Running in verbose mode" in result.stderr
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cli_pipe_writes_the_given_file_only(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    route_csv = (Path(__file__).parent / "data" / "test_route.csv").read_bytes()
+    reference = tmp_path / "reference"
+    reference.write_bytes(b"")
+
+    result = runner.invoke(app, ["-f", "-", "-o", "route.xlsx"], input=route_csv)
+
+    assert result.exit_code == 0, result.stderr
+    assert zipfile.is_zipfile(tmp_path / "route.xlsx")
+    assert (tmp_path / "route.xlsx").stat().st_mode == reference.stat().st_mode
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["reference", "route.xlsx"]
+
+
+def test_cli_pipe_does_not_create_the_output_directory(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    route_csv = (Path(__file__).parent / "data" / "test_route.csv").read_bytes()
+
+    result = runner.invoke(app, ["-f", "-", "-o", "missing/route.xlsx"], input=route_csv)
+
+    assert result.exit_code == 1
+    assert "No directory missing to write route.xlsx in" in result.stderr
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cli_pipe_reports_invalid_stdin(runner, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    route_csv = "Type,Notes,Distance (km) From Start,Elevation (m),Description\nStart,Start of route,abc,0,\n"
+
+    result = runner.invoke(app, ["-f", "-", "-o", "-"], input=route_csv)
+
+    assert result.exit_code == 1
+    assert result.stdout == ""
+    assert "<stdin> has" in result.stderr
+
+
+def test_cli_ndjson_needs_a_pipe(runner, tmp_path):
+    csv_file = tmp_path / "route.csv"
+    csv_file.write_bytes((Path(__file__).parent / "data" / "test_route.csv").read_bytes())
+
+    result = runner.invoke(app, ["-f", str(csv_file), "--format", "ndjson"])
+
+    assert result.exit_code == 1
+    assert "only written with --filename - or --output -" in result.stdout
+
+
+def test_cli_brevet_card_from_stdin(runner):
+    route_csv = (Path(__file__).parent / "data" / "test_route.csv").read_bytes()
+
+    result = runner.invoke(app, ["brevet-card", "-"], input=route_csv)
+
+    assert result.exit_code == 0
+    assert json.loads(result.stdout)[0]["distance_km"] == "0"
+
+
+def test_concurrent_rejected_requests_authenticate_once(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    save_cached_auth_token(AuthToken(api_key="key", token="stale"))
+    fresh = AuthToken(api_key="key", token="fresh")
+    rejected = threading.Barrier(4)
+
+    def request(auth_token):
+        if auth_token.token == "stale":
+            rejected.wait(timeout=5)  # every thread is turned away before any re-authenticates
+            raise AuthTokenExpiredError("expired")
+        return auth_token.token
+
+    credentials = UserPasswordCredentials(username="user", password="pass")
+    with patch("ridewithgps_to_cuesheet.cli.load_credentials", return_value=credentials):
+        with patch("ridewithgps_to_cuesheet.cli.authenticate", return_value=fresh) as mock_authenticate:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(lambda _: with_auth_token(request), range(4)))
+
+    assert results == ["fresh"] * 4
+    mock_authenticate.assert_called_once()
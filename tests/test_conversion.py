@@ -1,8 +1,21 @@
+import pickle
 from decimal import Decimal, InvalidOperation
 
 import pytest
 
-from ridewithgps_to_cuesheet.conversion import Cue, EventDetails, GenerationOptions, _map_direction, _parse_to_cues
+from ridewithgps_to_cuesheet.conversion import (
+    CONTROL_ROW_HEIGHT,
+    Cue,
+    EventDetails,
+    GenerationOptions,
+    InvalidRouteError,
+    ValidationIssue,
+    _layout_cues,
+    _map_direction,
+    _parse_to_cues,
+    compute_distance_columns,
+    validate_csv_values,
+)
 
 
 def test_default_options():
@@ -147,6 +160,19 @@ def test_parse_with_summit_end():
     assert cues[1].description == "ARRIVÉE: Summit at viewpoint"  # Summit is the end_indicator
 
 
+def test_parse_does_not_modify_csv_values():
+    csv_data = [
+        ["Start", "Start of route", "0", "0", ""],
+        ["Summit", "Summit at viewpoint", "15.0", "100.0", ""],
+    ]
+
+    first = _parse_to_cues(csv_data, GenerationOptions())
+    second = _parse_to_cues(csv_data, GenerationOptions())
+
+    assert csv_data[1][1] == "Summit at viewpoint"
+    assert first == second
+
+
 def test_parse_with_custom_end_indicator():
     csv_data = [
         ["Start", "Start of route", "0", "0", ""],
@@ -219,3 +245,144 @@ def test_parse_invalid_distance(dist, expected):
 
     with pytest.raises(expected):
         _parse_to_cues(csv_data, opts)
+
+
+def _route(num_turns, control_every=None, description="Main St"):
+    rows = [["Start", "Start of route", "0", "0", ""]]
+    for i in range(1, num_turns + 1):
+        if control_every and i % control_every == 0:
+            rows.append(["Control", f"Control {i}: Cafe", str(i), "0", ""])
+        else:
+            rows.append(["Right", description, str(i), "0", ""])
+    rows.append(["End", "End of route", str(num_turns + 1), "0", ""])
+    return rows
+
+
+def test_layout_sizes_rows_from_wrapped_descriptions():
+    long_description = "Continue on Hwy 99 through the tunnel; watch for traffic merging from the right"
+    cues = _parse_to_cues(_route(2, description=long_description), GenerationOptions())
+
+    layout = _layout_cues(cues, GenerationOptions())
+
+    assert layout.row_heights == [CONTROL_ROW_HEIGHT, 45, 45, CONTROL_ROW_HEIGHT]
+
+
+def test_layout_short_route_has_no_page_breaks():
+    cues = _parse_to_cues(_route(20, control_every=5), GenerationOptions())
+
+    assert _layout_cues(cues, GenerationOptions()).page_breaks == []
+
+
+def test_layout_breaks_when_page_is_full():
+    opts = GenerationOptions(page_break_row_interval=1000)
+    cues = _parse_to_cues(_route(100), opts)
+
+    layout = _layout_cues(cues, opts)
+
+    page_heights = []
+    bounds = [0, *layout.page_breaks, len(cues)]
+    for start, end in zip(bounds, bounds[1:]):
+        page_heights.append(sum(layout.row_heights[start:end]))
+    assert len(layout.page_breaks) >= 2
+    assert all(height <= opts.printable_page_height for height in page_heights)
+
+
+def test_layout_prefers_breaking_after_a_control():
+    opts = GenerationOptions(page_break_row_interval=1000)
+    cues = _parse_to_cues(_route(100, control_every=30), opts)
+
+    layout = _layout_cues(cues, opts)
+
+    assert layout.page_breaks[0] == 31  # the cue after "Control 30"
+    assert cues[layout.page_breaks[0] - 1].is_control
+
+
+def test_layout_caps_cues_per_page():
+    opts = GenerationOptions(page_break_row_interval=10)
+    cues = _parse_to_cues(_route(25), opts)
+
+    assert _layout_cues(cues, opts).page_breaks == [10, 20]
+
+
+def test_validate_valid_route():
+    csv_data = [
+        ["Start", "Start of route", "0", "0", ""],
+        ["Right", "Right on Test St", "0.5", "10.0", ""],
+        ["End", "End of route", "5.0", "20.0", ""],
+    ]
+
+    assert validate_csv_values(csv_data, GenerationOptions()) == []
+
+
+def test_validate_reports_every_bad_row():
+    csv_data = [
+        ["Start", "Start of route", "0", "0", ""],
+        ["Right", "Right on Test St"],
+        ["Left", "Left on Main St", "abc", "15.0", ""],
+        ["Hop", "Hop over the creek", "3.0", "15.0", ""],
+        ["Control", "Control 1: Cafe", "4.0", "20.0", ""],
+        ["Control", "Control 1: Cafe", "4.0", "20.0", ""],
+        ["Right", "Right on Oak St", "2.0", "20.0", ""],
+    ]
+
+    issues = validate_csv_values(csv_data, GenerationOptions())
+
+    assert [(issue.row, issue.severity) for issue in issues] == [
+        (1, "error"),
+        (2, "error"),
+        (3, "warning"),
+        (5, "error"),
+        (6, "error"),
+        (None, "error"),
+    ]
+    assert str(issues[1]) == "Row 3: Distance 'abc' is not a number"
+    assert "Duplicate control" in issues[3].message
+    assert "less than the previous" in issues[4].message
+    assert "does not finish" in issues[5].message
+
+
+def test_validate_missing_start():
+    csv_data = [["Right", "Right on Test St", "0.5", "10.0", ""], ["Summit", "Top", "5.0", "20.0", ""]]
+
+    issues = validate_csv_values(csv_data, GenerationOptions())
+
+    assert [issue.message for issue in issues] == ["Route does not begin with a Start cue"]
+
+
+def test_distance_columns_measure_across_controls():
+    cues = [
+        Cue(turn="", description="DÉPART", dist=Decimal("0"), is_control=True, last_dist=Decimal("0")),
+        Cue(turn="R", description="Main St", dist=Decimal("5.0"), last_dist=Decimal("0")),
+        Cue(turn="", description="Control", dist=Decimal("8.0"), is_control=True, last_dist=Decimal("5.0")),
+        Cue(turn="L", description="Oak St", dist=Decimal("12.0"), last_dist=Decimal("8.0")),
+    ]
+
+    distances = compute_distance_columns(cues)
+
+    assert distances.interval == [Decimal("0"), Decimal("5.0"), Decimal("3.0"), Decimal("7.0")]
+    assert distances.since_control == [Decimal("0"), Decimal("0"), Decimal("5.0"), Decimal("0")]
+    assert distances.after_control == [False, True, False, True]
+    assert distances.cumulative == [Decimal("0"), Decimal("0"), Decimal("5.0"), Decimal("8.0")]
+
+
+def test_distance_columns_are_exact():
+    cues = [Cue(turn="R", description="", dist=Decimal(dist)) for dist in ("0.1", "0.3", "0.35")]
+
+    assert compute_distance_columns(cues).interval == [Decimal("0.1"), Decimal("0.2"), Decimal("0.05")]
+
+
+def test_options_and_cues_survive_pickling():
+    opts = GenerationOptions(hide_direction=True, event_details=EventDetails(name="Fall Flèche"))
+    cue = Cue(turn="L", description="Oak St", dist=Decimal("12.0"), is_control=True, last_dist=Decimal("8.0"))
+
+    assert pickle.loads(pickle.dumps(opts)) == opts
+    assert pickle.loads(pickle.dumps(cue)) == cue
+
+
+def test_invalid_route_error_survives_pickling():
+    error = InvalidRouteError([ValidationIssue(row=3, message="Missing distance")])
+
+    restored = pickle.loads(pickle.dumps(error))
+
+    assert restored.issues == error.issues
+    assert str(restored) == str(error)
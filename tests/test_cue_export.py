@@ -0,0 +1,64 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+from ridewithgps_to_cuesheet.conversion import GenerationOptions
+from ridewithgps_to_cuesheet.cue_export import CueExporter, PyArrowNotInstalledError, export_format_for, export_routes
+
+TEST_ROUTE = Path(__file__).parent / "data" / "test_route.csv"
+
+
+def test_export_format_for():
+    assert export_format_for(Path("cues.parquet")) == "parquet"
+    assert export_format_for(Path("cues.Feather")) == "arrow"
+    assert export_format_for(Path("cues.arrow")) == "arrow"
+
+
+def test_exporter_needs_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+
+    with pytest.raises(PyArrowNotInstalledError, match=r"ridewithgps-to-cuesheet\[arrow\]"):
+        CueExporter(tmp_path / "cues.parquet")
+
+
+@pytest.mark.parametrize("filename", ["cues.parquet", "cues.arrow"])
+def test_export_routes(tmp_path, filename):
+    pa = pytest.importorskip("pyarrow")
+    csv_paths = [Path(shutil.copy(TEST_ROUTE, tmp_path / name)) for name in ("downloaded_cues_for_7.csv", "b.csv")]
+    broken = tmp_path / "broken.csv"
+    broken.write_text("Type,Notes,Distance (km) From Start,Elevation (m),Description\nRight,Turn right,far,0,\n")
+
+    with CueExporter(tmp_path / filename, batch_rows=7) as exporter:
+        result = export_routes(exporter, [*csv_paths, broken], GenerationOptions())
+
+    assert (result.exported, result.cue_count) == (["7", "b"], 14)
+    assert "far" in result.failed["broken"]
+    if filename.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        assert pq.ParquetFile(tmp_path / filename).num_row_groups == 2
+        table = pq.read_table(tmp_path / filename)
+    else:
+        table = pa.ipc.open_file(tmp_path / filename).read_all()
+    rows = table.to_pylist()
+    assert len(rows) == 14
+    assert [row["route_id"] for row in rows] == ["7"] * 7 + ["b"] * 7
+    assert rows[2] == {
+        "route_id": "7",
+        "csv_sha256": rows[0]["csv_sha256"],
+        "route_distance_km": 20.0,
+        "route_cue_count": 7,
+        "route_control_count": 4,
+        "cue_number": 3,
+        "turn": "L",
+        "description": "Left on Main St",
+        "distance_km": 2.0,
+        "interval_km": 3.0,
+        "since_control_km": 2.0,
+        "is_control": False,
+        "is_danger": False,
+        "is_end": False,
+    }
+    assert rows[4]["is_control"] and rows[4]["interval_km"] is None
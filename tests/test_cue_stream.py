@@ -0,0 +1,33 @@
+import io
+import json
+from pathlib import Path
+
+from ridewithgps_to_cuesheet.conversion import GenerationOptions, parse_route
+from ridewithgps_to_cuesheet.cue_stream import write_cue_stream
+from ridewithgps_to_cuesheet.utils import read_csv_to_array
+
+TEST_ROUTE = Path(__file__).parent / "data" / "test_route.csv"
+
+
+def test_one_json_object_per_cue():
+    cues = parse_route(read_csv_to_array(str(TEST_ROUTE)), GenerationOptions())
+    output = io.StringIO()
+
+    write_cue_stream(cues, output)
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record["cue_number"] for record in records] == list(range(1, 8))
+    assert records[0]["description"] == "DÉPART"
+    assert records[0]["interval_km"] is None
+    assert records[1] == {
+        "cue_number": 2,
+        "turn": "R",
+        "description": "Right on Test St",
+        "distance_km": 0.5,
+        "interval_km": 2.0,
+        "since_control_km": 0.0,
+        "is_control": False,
+        "is_danger": False,
+        "is_end": False,
+    }
+    assert "DÉPART" in output.getvalue()
@@ -1,9 +1,14 @@
+import asyncio
+import io
 import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pytest
 
 from ridewithgps_to_cuesheet import conversion
+from ridewithgps_to_cuesheet.aio import generate_excel_async
 from ridewithgps_to_cuesheet.utils import read_csv_to_array
 
 
@@ -80,9 +85,87 @@ def test_empty_route_handling():
     try:
         opts = conversion.GenerationOptions()
 
-        # Empty CSV data should raise an assertion error
-        with pytest.raises(AssertionError, match="No turns found in the provided CSV data"):
+        # Empty CSV data is reported by validation, which also runs under python -O
+        with pytest.raises(conversion.InvalidRouteError, match="No cues found in the CSV data"):
             conversion.generate_excel(output_file, csv_data, opts)
 
     finally:
         Path(output_file).unlink(missing_ok=True)
+
+
+def test_invalid_route_is_not_written(tmp_path):
+    csv_data = [["Start", "Start of route", "0", "0", ""], ["End", "End of route", "ten", "50.0", ""]]
+    output_file = tmp_path / "invalid.xlsx"
+
+    with pytest.raises(conversion.InvalidRouteError) as exc_info:
+        conversion.generate_excel(str(output_file), csv_data, conversion.GenerationOptions())
+
+    assert len(exc_info.value.issues) == 1
+    assert not output_file.exists()
+
+
+def test_generate_excel_bytes_matches_file_output(tmp_path):
+    csv_data = read_csv_to_array(str(Path(__file__).parent / "data" / "test_route.csv"))
+    # pinned creation date, so the two workbooks can be compared byte for byte
+    opts = conversion.GenerationOptions(reproducible=True)
+
+    conversion.generate_excel(str(tmp_path / "cues.xlsx"), csv_data, opts)
+    data = conversion.generate_excel_bytes(csv_data, opts)
+
+    assert data == (tmp_path / "cues.xlsx").read_bytes()
+    assert zipfile.ZipFile(io.BytesIO(data)).testzip() is None
+
+
+def test_reproducible_output_is_byte_identical(tmp_path):
+    csv_data = read_csv_to_array(str(Path(__file__).parent / "data" / "test_route.csv"))
+    opts = conversion.GenerationOptions(reproducible=True, include_elevation_chart=True)
+
+    conversion.generate_excel(str(tmp_path / "cues.xlsx"), csv_data, opts)
+    data = conversion.generate_excel_bytes(csv_data, opts)
+
+    assert (tmp_path / "cues.xlsx").read_bytes() == data
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        assert {info.date_time for info in workbook.infolist()} == {(1980, 1, 1, 0, 0, 0)}
+        assert workbook.read("docProps/core.xml").decode().count(">1980-01-01T00:00:00Z<") == 2  # created, modified
+
+
+def test_generate_excel_to_file_object(tmp_path):
+    csv_data = read_csv_to_array(str(Path(__file__).parent / "data" / "test_route.csv"))
+    output_file = tmp_path / "from_file_object.xlsx"
+
+    with open(output_file, "wb") as file_object:
+        conversion.generate_excel(file_object, csv_data, conversion.GenerationOptions())
+
+    assert zipfile.is_zipfile(output_file)
+
+
+def test_generate_excel_variants_match_single_generation(tmp_path):
+    csv_path = str(Path(__file__).parent / "data" / "test_route.csv")
+    csv_data = read_csv_to_array(csv_path)
+    variants = [
+        conversion.GenerationOptions(),
+        conversion.GenerationOptions(include_distance_from_last=True),
+        conversion.GenerationOptions(hide_direction=True, two_decimals_precision=False),
+    ]
+    targets = [tmp_path / f"variant_{idx}.xlsx" for idx in range(len(variants))]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        conversion.generate_excel_variants(csv_data, list(zip(map(str, targets), variants)), executor)
+
+    for target, opts in zip(targets, variants):
+        expected = conversion.generate_excel_bytes(read_csv_to_array(csv_path), opts)
+        with zipfile.ZipFile(target) as actual, zipfile.ZipFile(io.BytesIO(expected)) as single:
+            assert actual.read("xl/worksheets/sheet1.xml") == single.read("xl/worksheets/sheet1.xml")
+
+
+def test_generate_excel_async():
+    csv_data = read_csv_to_array(str(Path(__file__).parent / "data" / "test_route.csv"))
+    opts = conversion.GenerationOptions()
+
+    async def generate_concurrently():
+        return await asyncio.gather(*(generate_excel_async(csv_data, opts) for _ in range(3)))
+
+    results = asyncio.run(generate_concurrently())
+
+    assert len(results) == 3
+    assert all(zipfile.is_zipfile(io.BytesIO(data)) for data in results)
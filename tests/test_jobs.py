@@ -0,0 +1,122 @@
+import threading
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from ridewithgps_to_cuesheet.conversion import EventDetails, GenerationOptions
+from ridewithgps_to_cuesheet.jobs import JobQueue, options_from_json, options_to_json, run_worker
+from ridewithgps_to_cuesheet.utils import read_csv_to_array
+
+TEST_ROUTE = Path(__file__).parent / "data" / "test_route.csv"
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with JobQueue(tmp_path / "jobs.sqlite") as job_queue:
+        yield job_queue
+
+
+def test_options_round_trip():
+    opts = GenerationOptions(include_distance_from_last=True, event_details=EventDetails(name="Fleche"))
+
+    assert options_from_json(options_to_json(opts)) == opts
+
+
+def test_claim_is_exclusive_and_ordered(queue):
+    first = queue.enqueue("a.csv", "a.xlsx", GenerationOptions())
+    second = queue.enqueue("b.csv", "b.xlsx", GenerationOptions())
+
+    assert queue.claim("worker-1").id == first
+    assert queue.claim("worker-2").id == second
+    assert queue.claim("worker-3") is None
+
+
+def test_expired_lease_is_retried(queue):
+    job_id = queue.enqueue("a.csv", "a.xlsx", GenerationOptions())
+    stale = queue.claim("worker-1", lease_seconds=-1)
+
+    retried = queue.claim("worker-2")
+
+    assert retried.id == job_id
+    assert retried.attempts == 2
+    assert not queue.complete(stale, "worker-1", 1.0)
+    assert queue.complete(retried, "worker-2", 1.0)
+    assert queue.counts() == {"done": 1}
+
+
+def test_job_fails_after_max_attempts(queue):
+    queue.enqueue("a.csv", "a.xlsx", GenerationOptions())
+    queue.claim("worker-1", lease_seconds=-1, max_attempts=1)
+
+    assert queue.claim("worker-2", max_attempts=1) is None
+    assert queue.counts() == {"failed": 1}
+
+
+def test_run_worker_records_results(queue, tmp_path):
+    good_output = tmp_path / "out" / "good.xlsx"
+    queue.enqueue(str(TEST_ROUTE), str(good_output), GenerationOptions())
+    queue.enqueue(str(tmp_path / "missing.csv"), str(tmp_path / "out" / "missing.xlsx"), GenerationOptions())
+
+    processed = run_worker(queue, read_csv_to_array)
+
+    assert processed == 2
+    assert zipfile.is_zipfile(good_output)
+    assert queue.counts() == {"done": 1, "failed": 1}
+    assert "FileNotFoundError" in queue.failures()[0]["error"]
+
+
+def test_run_worker_hands_the_converted_rows_to_on_result(queue, tmp_path):
+    queue.enqueue(str(TEST_ROUTE), str(tmp_path / "good.xlsx"), GenerationOptions())
+    queue.enqueue(str(tmp_path / "missing.csv"), str(tmp_path / "missing.xlsx"), GenerationOptions())
+    results = []
+
+    run_worker(queue, read_csv_to_array, on_result=lambda job, duration, error, rows: results.append((error, rows)))
+
+    assert results[0] == (None, read_csv_to_array(str(TEST_ROUTE)))
+    assert results[1][0].startswith("FileNotFoundError")
+    assert results[1][1] is None
+
+
+def test_run_worker_skips_results_whose_lease_expired(queue, tmp_path):
+    queue.enqueue(str(TEST_ROUTE), str(tmp_path / "good.xlsx"), GenerationOptions())
+    results = []
+
+    def load_csv_while_another_worker_takes_over(source):
+        assert queue.claim("worker-2") is not None
+        return read_csv_to_array(source)
+
+    processed = run_worker(
+        queue,
+        load_csv_while_another_worker_takes_over,
+        worker_id="worker-1",
+        lease_seconds=-1,
+        on_result=lambda job, duration, error, rows: results.append(job),
+    )
+
+    assert processed == 0
+    assert results == []
+    assert queue.counts() == {"running": 1}
+
+
+def test_concurrent_workers_share_the_queue(tmp_path):
+    queue_path = tmp_path / "jobs.sqlite"
+    with JobQueue(queue_path) as job_queue:
+        for i in range(12):
+            job_queue.enqueue(str(TEST_ROUTE), str(tmp_path / f"{i}.xlsx"), GenerationOptions())
+
+    processed = []
+
+    def work(worker_id):
+        with JobQueue(queue_path) as worker_queue:
+            processed.append(run_worker(worker_queue, read_csv_to_array, worker_id=worker_id))
+
+    workers = [threading.Thread(target=work, args=(f"worker-{i}",)) for i in range(3)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    assert sum(processed) == 12
+    with JobQueue(queue_path) as job_queue:
+        assert job_queue.counts() == {"done": 12}
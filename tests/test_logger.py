@@ -0,0 +1,80 @@
+import io
+import logging
+import os
+import threading
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from ridewithgps_to_cuesheet.conversion import GenerationOptions, generate_excel
+from ridewithgps_to_cuesheet.logger import logger, start_queued_logging, stop_queued_logging
+from ridewithgps_to_cuesheet.utils import read_csv_to_array
+
+TEST_ROUTE = Path(__file__).parent / "data" / "test_route.csv"
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.current_thread())
+
+
+@pytest.fixture
+def recorded():
+    handler = RecordingHandler()
+    level = logger.level
+    start_queued_logging(handler)
+    yield handler
+    stop_queued_logging()
+    logger.setLevel(level)
+
+
+def test_records_are_handled_and_formatted_on_the_listener_thread(recorded):
+    logger.debug("Route %s has %d cues", "123", 7)
+    stop_queued_logging()
+
+    [record] = recorded.records
+    assert (record.msg, record.args) == ("Route %s has %d cues", ("123", 7))
+    assert record.getMessage() == "Route 123 has 7 cues"
+    assert threading.current_thread() not in recorded.threads
+
+
+def test_restarting_replaces_the_handlers(recorded):
+    replacement = RecordingHandler()
+    start_queued_logging(replacement)
+    logger.debug("only once")
+    stop_queued_logging()
+
+    assert [record.getMessage() for record in recorded.records + replacement.records] == ["only once"]
+    assert len(logger.handlers) == 0
+
+
+def test_verbose_generation_logs_structured_cue_events(recorded):
+    generate_excel(io.BytesIO(), read_csv_to_array(str(TEST_ROUTE)), GenerationOptions(verbose=True))
+    stop_queued_logging()
+
+    cue_events = [record for record in recorded.records if getattr(record, "event", None) == "cue"]
+    control_events = [record for record in recorded.records if getattr(record, "event", None) == "control"]
+    assert [record.cue_number for record in cue_events] == list(range(7))
+    assert (cue_events[2].distance_km, cue_events[2].interval_km) == (Decimal("5.0"), Decimal("3.0"))
+    assert [record.cue_number for record in control_events] == [0, 4, 5, 6]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+@pytest.mark.filterwarnings("ignore:This process .* is multi-threaded:DeprecationWarning")
+def test_forked_process_handles_records_itself(recorded):
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        logger.debug("from the child")
+        os.write(write_end, str(len(recorded.records)).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    assert os.read(read_end, 16) == b"1"
@@ -0,0 +1,58 @@
+import shutil
+import zipfile
+from pathlib import Path
+
+from ridewithgps_to_cuesheet.conversion import GenerationOptions, generate_excel, prepare_route
+from ridewithgps_to_cuesheet.pipeline import PipelineJob, pack_route, run_pipeline, unpack_route
+from ridewithgps_to_cuesheet.utils import read_csv_to_array
+
+TEST_ROUTE = Path(__file__).parent / "data" / "test_route.csv"
+
+
+def sheet_xml(path: Path) -> bytes:
+    with zipfile.ZipFile(path) as workbook:
+        return workbook.read("xl/worksheets/sheet1.xml") + workbook.read("xl/sharedStrings.xml")
+
+
+def test_pack_and_unpack_route_round_trip():
+    csv_values = read_csv_to_array(str(TEST_ROUTE))
+    csv_values[1][1] = "Right on Rue Saint-Étienne ✓"
+    route = prepare_route(csv_values, GenerationOptions(include_distance_from_last=True))
+
+    unpacked, unpacked_csv_values = unpack_route(memoryview(pack_route(route, csv_values)))
+
+    assert unpacked == route
+    assert unpacked_csv_values == csv_values
+    # Decimals keep their exponent, e.g. 2.0 rather than 2
+    assert [str(cue.dist) for cue in unpacked.cues] == [str(cue.dist) for cue in route.cues]
+    assert [str(d) for d in unpacked.distances.interval] == [str(d) for d in route.distances.interval]
+
+
+def test_unpack_route_without_csv_values():
+    route = prepare_route(read_csv_to_array(str(TEST_ROUTE)), GenerationOptions())
+
+    assert unpack_route(pack_route(route, [])) == (route, [])
+
+
+def test_run_pipeline_matches_direct_conversion(tmp_path):
+    opts = GenerationOptions(include_elevation_chart=True)
+    csv_paths = [Path(shutil.copy(TEST_ROUTE, tmp_path / f"route_{n}.csv")) for n in range(3)]
+    broken = tmp_path / "broken.csv"
+    broken.write_text("Type,Notes,Distance (km) From Start,Elevation (m),Description\nRight,Turn right,far,0,\n")
+    jobs = [PipelineJob(path, tmp_path / f"{path.stem}.xlsx", opts) for path in [*csv_paths, broken]]
+
+    results = list(run_pipeline(jobs, parsers=2, renderers=1, queue_size=1, lock_directory=tmp_path))
+
+    assert sorted(result.job.csv_path.name for result in results) == sorted(path.name for path in [*csv_paths, broken])
+    [failed] = [result for result in results if result.error]
+    assert failed.job.csv_path == broken and failed.summary is None
+    assert "InvalidRouteError" in failed.error
+    generate_excel(str(tmp_path / "direct.xlsx"), read_csv_to_array(str(TEST_ROUTE)), opts)
+    for path in csv_paths:
+        assert sheet_xml(path.with_suffix(".xlsx")) == sheet_xml(tmp_path / "direct.xlsx")
+    assert not (tmp_path / "broken.xlsx").exists()
+    assert {result.summary.cue_count for result in results if result.summary} == {7}
+
+
+def test_run_pipeline_without_jobs():
+    assert list(run_pipeline([], parsers=1, renderers=1)) == []
@@ -0,0 +1,108 @@
+import subprocess
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+from rich.console import Console
+
+from ridewithgps_to_cuesheet.conversion import GenerationOptions, prepare_route
+from ridewithgps_to_cuesheet.preview import CONTROL_STYLE, DANGER_STYLE, cuesheet_preview, sheet_cumulative_distances
+from ridewithgps_to_cuesheet.utils import read_csv_to_array
+
+TEST_ROUTE = Path(__file__).parent / "data" / "test_route.csv"
+
+
+def render(table) -> str:
+    console = Console(width=120, record=True)
+    console.print(table)
+    return console.export_text()
+
+
+def test_sheet_cumulative_distances_follow_the_workbook_formulas():
+    route = prepare_route(read_csv_to_array(str(TEST_ROUTE)), GenerationOptions())
+
+    assert sheet_cumulative_distances(route) == [
+        None,
+        Decimal("0"),
+        Decimal("2.0"),
+        Decimal("5.0"),
+        Decimal("10.0"),
+        Decimal("10.0"),
+        Decimal("10.0"),
+    ]
+
+
+def test_preview_marks_page_breaks():
+    opts = GenerationOptions(page_break_row_interval=3)
+    route = prepare_route(read_csv_to_array(str(TEST_ROUTE)), opts)
+
+    text = render(cuesheet_preview(route, opts))
+
+    assert text.count("── page") == len(route.layout.page_breaks) == 2
+    assert "7 cues, 3 page(s)" in text
+    assert text.index("Left on Main St") < text.index("── page 2 ──") < text.index("Food stop at cafe")
+
+
+def test_preview_columns_follow_options():
+    csv_values = read_csv_to_array(str(TEST_ROUTE))
+    opts = GenerationOptions(include_distance_from_last=True, two_decimals_precision=False, hide_direction=True)
+
+    table = cuesheet_preview(prepare_route(csv_values, opts), opts)
+
+    assert [column.header for column in table.columns] == [
+        "Dist.(cum.)",
+        "Dist. Since",
+        "Turn",
+        "Route Description",
+        "Dist.(int.)",
+    ]
+    assert list(table.columns[4].cells)[1:3] == ["2.0", "3.0"]
+
+
+def test_preview_shows_the_direction_column_like_the_workbook():
+    csv_values = read_csv_to_array(str(TEST_ROUTE))
+    opts = GenerationOptions(hide_direction=False)
+
+    table = cuesheet_preview(prepare_route(csv_values, opts), opts)
+
+    assert [column.header for column in table.columns] == [
+        "Dist.(cum.)",
+        "Turn",
+        "Direction",
+        "Route Description",
+        "Dist.(int.)",
+    ]
+    assert list(table.columns[1].cells)[1] == "R"
+    assert set(table.columns[2].cells) == {""}
+    assert list(table.columns[3].cells)[1] == "Right on Test St"
+
+
+def test_preview_highlights_controls_and_danger():
+    csv_values = read_csv_to_array(str(TEST_ROUTE))
+    csv_values.insert(3, ["Danger", "Rough railway crossing", "3.0", "0", ""])
+    opts = GenerationOptions()
+
+    table = cuesheet_preview(prepare_route(csv_values, opts), opts)
+
+    styles = [row.style for row in table.rows]
+    assert styles[0] == CONTROL_STYLE
+    assert styles[3] == DANGER_STYLE
+    assert styles[1] is None
+
+
+def test_cli_preview_writes_nothing_and_does_not_import_xlsxwriter(tmp_path):
+    script = (
+        "import sys\n"
+        "from typer.testing import CliRunner\n"
+        "from ridewithgps_to_cuesheet.cli import app\n"
+        f"args = ['--filename', {str(TEST_ROUTE)!r}, '--preview', '-c', 'files', '-x', 'outputs']\n"
+        "result = CliRunner().invoke(app, args)\n"
+        "assert result.exit_code == 0, result.stdout\n"
+        "assert 'Right on Test St' in result.stdout, result.stdout\n"
+        "print('xlsxwriter' in sys.modules)\n"
+    )
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=tmp_path)
+
+    assert completed.stdout.strip().splitlines()[-1] == "False"
+    assert not (tmp_path / "outputs").exists()
+    assert list((tmp_path / "files").iterdir()) == []
@@ -0,0 +1,40 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ridewithgps_to_cuesheet.ridewithgps import AuthToken, AuthTokenExpiredError, RouteListing, iter_route_listing
+
+AUTH_TOKEN = AuthToken(api_key="key", token="token")
+
+
+def _page(route_ids, total):
+    response = Mock(status_code=200)
+    results = [{"id": route_id, "name": f"Route {route_id}", "updated_at": "2024-05-01"} for route_id in route_ids]
+    response.json.return_value = {"results": results, "results_count": total}
+    return response
+
+
+def test_iter_route_listing_pages_until_all_results():
+    pages = [_page([1, 2], 5), _page([3, 4], 5), _page([5], 5)]
+    with patch("ridewithgps_to_cuesheet.ridewithgps.requests.get", side_effect=pages) as mock_get:
+        routes = list(iter_route_listing("clubs", "42", AUTH_TOKEN, page_size=2))
+
+    assert [route.route_id for route in routes] == ["1", "2", "3", "4", "5"]
+    assert routes[0] == RouteListing(route_id="1", name="Route 1", updated_at="2024-05-01")
+    assert [call.kwargs["params"]["offset"] for call in mock_get.call_args_list] == ["0", "2", "4"]
+    assert mock_get.call_args.args[0] == "https://ridewithgps.com/clubs/42/routes.json"
+
+
+def test_iter_route_listing_stops_on_exact_multiple_of_page_size():
+    pages = [_page([1, 2], 2)]
+    with patch("ridewithgps_to_cuesheet.ridewithgps.requests.get", side_effect=pages) as mock_get:
+        routes = list(iter_route_listing("users", "7", AUTH_TOKEN, page_size=2))
+
+    assert len(routes) == 2
+    assert mock_get.call_count == 1
+
+
+def test_iter_route_listing_expired_token():
+    with patch("ridewithgps_to_cuesheet.ridewithgps.requests.get", return_value=Mock(status_code=401)):
+        with pytest.raises(AuthTokenExpiredError):
+            list(iter_route_listing("users", "7", AUTH_TOKEN))
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from ridewithgps_to_cuesheet.conversion import GenerationOptions, validate_csv_values
+from ridewithgps_to_cuesheet.route_json import parse_route_json
+
+
+def _route_document(track_point_count=200):
+    return {
+        "type": "route",
+        "route": {
+            "id": 12345,
+            "name": "Tour de Café",
+            "description": {"nested": [1, 2, {"deep": "value"}]},
+            "course_points": [
+                {"t": "Right", "n": "Turn right onto Main St", "d": 500.0, "i": 5},
+                {"t": "Control", "n": "Control: Café", "d": 1200.0},
+            ],
+            "track_points": [
+                {"x": -123.0 + idx / 1000, "y": 49.0 + idx / 1000, "d": idx * 10.0, "e": 100.0 + idx}
+                for idx in range(track_point_count)
+            ],
+        },
+    }
+
+
+def _chunked(document, size):
+    data = json.dumps(document, ensure_ascii=False).encode("utf-8")
+    return [data[idx : idx + size] for idx in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 1 << 20])
+def test_parse_route_json_in_any_chunk_size(chunk_size):
+    route = parse_route_json(_chunked(_route_document(), chunk_size))
+
+    assert route.route_id == "12345"
+    assert route.name == "Tour de Café"
+    assert len(route.geometry) == 200
+    assert route.geometry.distances_km[-1] == pytest.approx(1.99)
+    assert route.geometry.latitudes[1] == pytest.approx(49.001)
+    assert [point.type for point in route.course_points] == ["Right", "Control"]
+
+
+def test_parse_route_json_without_envelope():
+    route = parse_route_json(_chunked(_route_document()["route"], 16))
+
+    assert route.route_id == "12345"
+    assert len(route.course_points) == 2
+
+
+def test_route_json_to_csv_values():
+    route = parse_route_json(_chunked(_route_document(), 64))
+
+    assert route.to_csv_values() == [
+        ["Start", "Start of route", "0.00", "100.0", ""],
+        ["Right", "Turn right onto Main St", "0.50", "105.0", ""],
+        ["Control", "Control: Café", "1.20", "220.0", ""],  # interpolated from the track points
+        ["End", "End of route", "1.99", "299.0", ""],
+    ]
+    issues = validate_csv_values(route.to_csv_values(), GenerationOptions())
+    assert not [issue for issue in issues if issue.severity == "error"]
+
+
+def test_parse_route_json_rejects_invalid_json():
+    with pytest.raises(ValueError, match="Invalid route JSON"):
+        parse_route_json([b'{"route": {"track_points": [{"d": 1}, {"d": ]}}'])
+
+    with pytest.raises(ValueError):
+        parse_route_json([b"[1, 2, 3]"])
@@ -0,0 +1,126 @@
+import shutil
+import sqlite3
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from ridewithgps_to_cuesheet.conversion import GenerationOptions
+from ridewithgps_to_cuesheet.search_index import CueIndex, as_fts_query, refresh_index
+
+TEST_ROUTE = Path(__file__).parent / "data" / "test_route.csv"
+HEADER = "Type,Notes,Distance (km) From Start,Elevation (m),Description\n"
+
+
+@pytest.fixture
+def index(tmp_path):
+    with CueIndex(tmp_path / "cue_index.sqlite") as cue_index:
+        yield cue_index
+
+
+def write_route(path: Path, *cues: str) -> Path:
+    path.write_text(HEADER + "Start,Start of route,0,0,\n" + "".join(cue + "\n" for cue in cues), encoding="utf-8")
+    return path
+
+
+def test_as_fts_query_quotes_words():
+    assert as_fts_query('Hwy-99  "Sea"') == '"Hwy-99" """Sea"""'
+
+
+def test_refresh_index_and_search(tmp_path, index):
+    bridge = write_route(
+        tmp_path / "downloaded_cues_for_111.csv",
+        "Right,Turn right onto Lions Gate Bridge,3.2,0,",
+        "End,End of route,9.0,0,",
+    )
+    write_route(tmp_path / "Fleche.csv", "Left,Turn left onto Hwy 99,1.5,0,", "End,End of route,4.0,0,")
+
+    update = refresh_index(index, [bridge, tmp_path / "Fleche.csv"], GenerationOptions())
+
+    assert sorted(update.indexed) == ["111", "Fleche"]
+    [match] = index.search(as_fts_query("lions gate"))
+    assert (match.route_id, match.distance, match.turn, match.description) == (
+        "111",
+        Decimal("3.2"),
+        "R",
+        "Lions Gate Bridge",
+    )
+    assert [match.route_id for match in index.search(as_fts_query("Hwy 99"))] == ["Fleche"]
+    assert index.search(as_fts_query("Granville")) == []
+
+
+def test_refresh_index_only_reindexes_changed_csvs(tmp_path, index):
+    unchanged = shutil.copy(TEST_ROUTE, tmp_path / "unchanged.csv")
+    changed = write_route(tmp_path / "changed.csv", "Right,Turn right onto Oak St,1.0,0,", "End,End of route,2.0,0,")
+    gone = shutil.copy(TEST_ROUTE, tmp_path / "gone.csv")
+    refresh_index(index, [Path(unchanged), changed, Path(gone)], GenerationOptions())
+
+    write_route(changed, "Right,Turn right onto Cambie St,1.0,0,", "End,End of route,2.0,0,")
+    update = refresh_index(index, [Path(unchanged), changed], GenerationOptions())
+
+    assert (update.indexed, update.unchanged, update.removed) == (["changed"], 1, 1)
+    assert index.search(as_fts_query("Oak")) == []
+    assert [match.route_id for match in index.search(as_fts_query("Cambie"))] == ["changed"]
+    assert set(index.indexed_hashes()) == {"unchanged", "changed"}
+
+
+def test_refresh_index_reports_invalid_routes(tmp_path, index):
+    broken = write_route(tmp_path / "broken.csv", "Right,Turn right,not a number,0,")
+
+    update = refresh_index(index, [broken], GenerationOptions())
+
+    assert update.indexed == []
+    assert "not a number" in update.failed["broken"]
+
+
+def test_refresh_index_reports_unreadable_csvs_and_carries_on(tmp_path, index):
+    dangling = tmp_path / "dangling.csv"
+    dangling.symlink_to(tmp_path / "missing.csv")
+    bridge = write_route(
+        tmp_path / "bridge.csv", "Right,Right onto Lions Gate Bridge,1.0,0,", "End,End of route,2.0,0,"
+    )
+
+    update = refresh_index(index, [dangling, bridge], GenerationOptions())
+
+    assert update.indexed == ["bridge"]
+    assert "dangling" in update.failed
+
+
+def test_search_marks_controls(tmp_path, index):
+    refresh_index(index, [Path(shutil.copy(TEST_ROUTE, tmp_path / "route.csv"))], GenerationOptions())
+
+    [match] = index.search(as_fts_query("checkpoint"))
+
+    assert match.is_control
+    assert match.cue_number == 5
+
+
+def test_reindexing_a_route_replaces_only_its_cues(tmp_path, index):
+    oak = write_route(tmp_path / "oak.csv", "Right,Turn right onto Oak St,1.0,0,", "End,End of route,2.0,0,")
+    elm = write_route(tmp_path / "elm.csv", "Right,Turn right onto Oak St,1.0,0,", "End,End of route,2.0,0,")
+    refresh_index(index, [oak, elm], GenerationOptions())
+
+    write_route(oak, "Right,Turn right onto Elm St,1.0,0,", "End,End of route,2.0,0,")
+    refresh_index(index, [oak, elm], GenerationOptions())
+    assert [match.route_id for match in index.search(as_fts_query("Oak St"))] == ["elm"]
+
+    index.remove_route("elm")
+    assert index.search(as_fts_query("Oak St")) == []
+    assert [match.route_id for match in index.search(as_fts_query("Elm St"))] == ["oak"]
+
+
+def test_index_in_an_older_layout_is_rebuilt(tmp_path):
+    index_path = tmp_path / "cue_index.sqlite"
+    connection = sqlite3.connect(str(index_path))
+    connection.executescript(
+        "CREATE TABLE indexed_routes (route_id TEXT PRIMARY KEY, csv_path TEXT, csv_sha256 TEXT, indexed_at REAL);"
+        "INSERT INTO indexed_routes VALUES ('oak', 'oak.csv', 'abc', 0);"
+        "CREATE VIRTUAL TABLE cues USING fts5 (description, turn, route_id UNINDEXED, cue_number UNINDEXED, "
+        "distance UNINDEXED, is_control UNINDEXED);"
+        "INSERT INTO cues VALUES ('Oak St', 'R', 'oak', 1, '1.0', 0);"
+    )
+    connection.close()
+
+    with CueIndex(index_path) as index:
+        assert index.indexed_hashes() == {}
+        assert index.search(as_fts_query("Oak St")) == []
@@ -0,0 +1,74 @@
+import stat
+from concurrent.futures import ThreadPoolExecutor
+
+from ridewithgps_to_cuesheet.ridewithgps import AuthToken
+from ridewithgps_to_cuesheet.secrets import (
+    clear_cached_auth_token,
+    default_token_cache_path,
+    load_cached_auth_token,
+    save_cached_auth_token,
+)
+
+
+def test_cached_token_round_trip(tmp_path):
+    cache_path = tmp_path / "cache" / "auth_token.json"
+    token = AuthToken(api_key="ridewithgps-to-cuesheet", token="abc123")
+
+    save_cached_auth_token(token, cache_path)
+
+    assert load_cached_auth_token(cache_path) == token
+
+
+def test_cached_token_is_private(tmp_path):
+    cache_path = tmp_path / "cache" / "auth_token.json"
+
+    save_cached_auth_token(AuthToken(api_key="key", token="token"), cache_path)
+
+    assert stat.S_IMODE(cache_path.stat().st_mode) == 0o600
+
+
+def test_missing_or_corrupt_cache(tmp_path):
+    cache_path = tmp_path / "auth_token.json"
+    assert load_cached_auth_token(cache_path) is None
+
+    cache_path.write_text("not json")
+    assert load_cached_auth_token(cache_path) is None
+
+
+def test_clear_cached_token(tmp_path):
+    cache_path = tmp_path / "auth_token.json"
+    save_cached_auth_token(AuthToken(api_key="key", token="token"), cache_path)
+
+    clear_cached_auth_token(cache_path)
+    clear_cached_auth_token(cache_path)
+
+    assert not cache_path.exists()
+
+
+def test_default_cache_path_honours_xdg(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+    assert default_token_cache_path() == tmp_path / "ridewithgps-to-cuesheet" / "auth_token.json"
+
+
+def test_cached_token_is_private_despite_a_stale_temporary_file(tmp_path):
+    cache_path = tmp_path / "auth_token.json"
+    stale = tmp_path / "auth_token.json.tmp"
+    stale.write_text("{}")
+    stale.chmod(0o644)
+
+    save_cached_auth_token(AuthToken(api_key="key", token="token"), cache_path)
+
+    assert stat.S_IMODE(cache_path.stat().st_mode) == 0o600
+    assert load_cached_auth_token(cache_path) == AuthToken(api_key="key", token="token")
+
+
+def test_concurrent_saves_do_not_collide(tmp_path):
+    cache_path = tmp_path / "auth_token.json"
+    tokens = [AuthToken(api_key="key", token=str(n)) for n in range(32)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda token: save_cached_auth_token(token, cache_path), tokens))
+
+    assert load_cached_auth_token(cache_path) in tokens
+    assert [path.name for path in tmp_path.iterdir()] == ["auth_token.json"]
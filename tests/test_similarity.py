@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from ridewithgps_to_cuesheet.conversion import Cue, GenerationOptions
+from ridewithgps_to_cuesheet.similarity import (
+    cue_shingles,
+    estimated_similarity,
+    lsh_bands,
+    minhash_signature,
+    near_duplicate_groups,
+    route_signatures,
+)
+
+ROADS = [f"Road {name}" for name in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"]
+
+
+def route(roads, step="1.5"):
+    return [
+        Cue(turn="R", description=road, dist=Decimal("0"), last_dist=Decimal(step) * number)
+        for number, road in enumerate(roads)
+    ]
+
+
+def signature(roads, **kwargs):
+    return minhash_signature(cue_shingles(route(roads, **kwargs)))
+
+
+def test_cue_shingles_are_normalized_and_direction_independent():
+    forward = cue_shingles(route(["Main St.", "Oak  Ave", "Pine Rd"]))
+
+    assert forward == {"main st\x1foak ave\x1fpine rd\x1f3"}
+    assert cue_shingles(route(["pine rd", "oak ave", "main st"])) == forward
+
+
+def test_cue_shingles_skip_controls():
+    cues = route(["Main St", "Oak Ave", "Pine Rd"])
+    control = Cue(turn="", description="Control: Cafe", dist=Decimal("0"), is_control=True, last_dist=Decimal("2"))
+
+    assert cue_shingles([cues[0], control, *cues[1:]]) == cue_shingles(cues)
+
+
+def test_similarity_estimates_shingle_overlap():
+    original = signature(ROADS)
+    detour = signature(ROADS[:12] + ["Detour Rd"] + ROADS[13:])
+
+    assert estimated_similarity(original, original) == 1.0
+    assert 0.5 < estimated_similarity(original, detour) < 1.0
+    assert estimated_similarity(original, signature(ROADS, step="9.5")) < 0.2
+
+
+def test_lsh_bands_match_threshold():
+    bands, rows = lsh_bands(0.5)
+
+    assert bands * rows == 128
+    assert abs((1 / bands) ** (1 / rows) - 0.5) < 0.1
+
+
+def test_near_duplicate_groups():
+    other_roads = [f"Avenue {number}" for number in range(26)]
+    signatures = {
+        "original": signature(ROADS),
+        "detour": signature(ROADS[:12] + ["Detour Rd"] + ROADS[13:]),
+        "reversed": signature(ROADS[::-1]),
+        "other": signature(other_roads),
+        "other-fork": signature(other_roads[:-1]),
+        "unrelated": signature(["Lonely Rd"] * 3),
+    }
+
+    groups = near_duplicate_groups(signatures, threshold=0.5)
+
+    assert [group.route_ids for group in groups] == [["detour", "original", "reversed"], ["other", "other-fork"]]
+    assert all(0.5 <= group.similarity <= 1.0 for group in groups)
+    assert near_duplicate_groups({}) == []
+
+
+def test_routes_without_turn_cues_are_not_duplicates():
+    signatures = {"controls-only": signature([]), "also-controls-only": signature([]), "original": signature(ROADS)}
+
+    assert near_duplicate_groups(signatures) == []
+
+
+def test_route_signatures_reports_routes_without_turn_cues(tmp_path):
+    header = "Type,Notes,Distance (km) From Start,Elevation (m),Description\n"
+    controls_only = tmp_path / "controls_only.csv"
+    controls_only.write_text(
+        header + "Start,Start of route,0,0,\nControl,Control: Cafe,5.0,0,\nEnd,End of route,9.0,0,\n"
+    )
+
+    signatures, failed = route_signatures([controls_only], GenerationOptions())
+
+    assert signatures == {}
+    assert failed == {"controls_only": "Route has no turn cues to compare"}
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+from ridewithgps_to_cuesheet.conversion import (
+    DESCRIPTION_RULE_NAMES,
+    GenerationOptions,
+    _map_cue_description,
+    collect_rule_telemetry,
+    parse_route,
+)
+from ridewithgps_to_cuesheet.telemetry import FALLBACK_RULE, RuleTelemetry, description_shape
+from ridewithgps_to_cuesheet.utils import read_csv_to_array
+
+TEST_ROUTE = Path(__file__).parent / "data" / "test_route.csv"
+
+
+def test_description_shape_leaves_out_names_and_numbers():
+    assert description_shape("Slight right onto Hwy 99") == "Slight right onto …"
+    assert description_shape("Turn left at the 2nd light") == "Turn left at the #nd light"
+    assert description_shape("Food stop at cafe") == "Food stop at cafe"
+
+
+def test_rules_are_counted_in_the_order_they_are_tried():
+    with collect_rule_telemetry() as telemetry:
+        parse_route(read_csv_to_array(str(TEST_ROUTE)), GenerationOptions())
+
+    reports = {report.name: report for report in telemetry.rule_reports(DESCRIPTION_RULE_NAMES)}
+    assert list(reports) == DESCRIPTION_RULE_NAMES
+    assert reports["start"].attempts == 7
+    assert reports["start"].hits == 1
+    assert reports["end"].attempts == 6
+    # every cue but the start reached the end rule; the rest fell through every rule
+    assert reports["turn_to"].attempts == reports[FALLBACK_RULE].hits == 5
+    assert sum(report.hits for report in reports.values()) == 7
+    assert all(report.seconds > 0 for report in reports.values())
+    assert telemetry.unmatched_shapes["Right on …"] == 1
+    assert sum(telemetry.directions.values()) == 7
+
+
+def test_unknown_directions_are_recorded():
+    csv_values = read_csv_to_array(str(TEST_ROUTE))
+    csv_values.insert(2, ["Merge", "Merge onto Hwy 1", "0.7", "0", ""])
+
+    with collect_rule_telemetry() as telemetry:
+        parse_route(csv_values, GenerationOptions())
+
+    assert telemetry.unknown_directions == {"Merge": 1}
+    assert telemetry.directions["Merge"] == 1
+
+
+def test_telemetry_is_only_collected_while_active():
+    opts = GenerationOptions()
+    with collect_rule_telemetry() as telemetry:
+        assert _map_cue_description(opts, "Continue onto Main St") == "Main St"
+    _map_cue_description(opts, "Continue onto Main St")
+
+    assert telemetry.hits["continue_onto"] == sum(telemetry.hits.values()) == 1
+
+
+def test_telemetry_accumulates_across_collections():
+    opts = GenerationOptions()
+    total = RuleTelemetry()
+    with collect_rule_telemetry(total):
+        _map_cue_description(opts, "Turn left onto Oak St")
+    with collect_rule_telemetry(total):
+        _map_cue_description(opts, "Turn left onto Elm St")
+
+    assert total.hits["turn_onto"] == 2
+    assert total.attempts["start"] == 2
+
+
+def test_instrumented_rules_rewrite_like_the_plain_chain():
+    opts = GenerationOptions()
+    descriptions = [
+        "Start of route",
+        "End of route",
+        "Control #2: Hope",
+        "At roundabout, take exit 2 onto Main St",
+        "Continue straight onto Main St",
+        "Keep slight left onto Hwy 99",
+        "Make a U-turn onto Oak St",
+        "Turn right to Sea to Sky Hwy",
+        "Turn right to stay on Hwy 1",
+        "Main St becomes slightly Elm St",
+    ]
+
+    plain = [_map_cue_description(opts, description) for description in descriptions]
+    with collect_rule_telemetry() as telemetry:
+        instrumented = [_map_cue_description(opts, description) for description in descriptions]
+
+    assert instrumented == plain
+    assert sum(telemetry.hits.values()) == len(descriptions)
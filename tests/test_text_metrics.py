@@ -0,0 +1,27 @@
+import pytest
+
+from ridewithgps_to_cuesheet.text_metrics import excel_column_width_to_points, text_width, wrapped_line_count
+
+
+def test_text_width_uses_arial_metrics():
+    assert text_width("i", 12) < text_width("m", 12)
+    assert text_width("Main St", 12, bold=True) > text_width("Main St", 12)
+    assert text_width("DÉPART", 12) == text_width("DEPART", 12)
+
+
+def test_column_width_to_points():
+    assert excel_column_width_to_points(39) == pytest.approx(204.75)
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("", 1),
+        ("Main St", 1),
+        ("Lions Gate Bridge (use sidewalk on east side) b/c Marine Dr", 2),
+        ("Continue on Hwy 99 through the tunnel; watch for traffic merging from the right", 3),
+        ("W" * 40, 3),  # a single word wider than the cell is split
+    ],
+)
+def test_wrapped_line_count(text, expected):
+    assert wrapped_line_count(text, excel_column_width_to_points(39), 12) == expected
@@ -1,8 +1,15 @@
+import io
 from pathlib import Path
 
 import pytest
 
-from ridewithgps_to_cuesheet.utils import read_csv_to_array
+from ridewithgps_to_cuesheet.utils import (
+    ENCODING_DETECTION_PREFIX_BYTES,
+    iter_csv_rows,
+    iter_csv_stream,
+    read_csv_to_array,
+    resolve_encoding,
+)
 
 
 def test_read_valid_csv():
@@ -50,3 +57,70 @@ Right,"Turn right, carefully",1.5"""
     assert len(result) == 2
     assert result[0] == ["Start", "Start of route, here", "0"]
     assert result[1] == ["Right", "Turn right, carefully", "1.5"]
+
+
+def test_csv_with_utf8_bom(tmp_path):
+    test_file = tmp_path / "bom.csv"
+    test_file.write_bytes(b"\xef\xbb\xbfType,Notes,Distance\nStart,Caf\xc3\xa9,0\n")
+
+    result = read_csv_to_array(str(test_file))
+
+    assert result == [["Start", "Café", "0"]]
+
+
+def test_csv_latin1(tmp_path):
+    test_file = tmp_path / "latin1.csv"
+    test_file.write_bytes("Type,Notes,Distance\nStart,Départ à Montréal,0\n".encode("latin-1"))
+
+    result = read_csv_to_array(str(test_file))
+
+    assert result == [["Start", "Départ à Montréal", "0"]]
+
+
+def test_csv_utf16(tmp_path):
+    test_file = tmp_path / "utf16.csv"
+    test_file.write_text("Type,Notes,Distance\nStart,Départ,0\n", encoding="utf-16")
+
+    result = read_csv_to_array(str(test_file))
+
+    assert result == [["Start", "Départ", "0"]]
+
+
+@pytest.mark.parametrize(
+    "prefix,declared,expected",
+    [
+        (b"abc", "UTF-8", "utf-8"),
+        (b"abc", "latin1", "iso8859-1"),
+        (b"abc", "not-a-charset", "utf-8"),
+        (b"\xef\xbb\xbfabc", "utf-8", "utf-8-sig"),
+        ("Départ".encode("utf-8")[:2], None, "utf-8"),  # truncated multi-byte character
+    ],
+)
+def test_resolve_encoding(prefix, declared, expected):
+    assert resolve_encoding(prefix, declared) == expected
+
+
+def test_iter_csv_rows_streams_rows():
+    test_file = Path(__file__).parent / "data" / "test_route.csv"
+
+    rows = iter_csv_rows(str(test_file))
+
+    assert next(rows) == ["Start", "Start of route", "0", "0", ""]
+    assert len(list(rows)) == 6
+
+
+def test_iter_csv_stream_reads_past_the_encoding_prefix():
+    rows = [["Right", f"Right on Street {n}", str(n), "0", ""] for n in range(5000)]
+    content = "Type,Notes,Distance (km) From Start,Elevation (m),Description\r\n"
+    content += "".join(",".join(row) + "\r\n" for row in rows)
+    stream = io.BytesIO(content.encode("utf-16"))
+    assert len(stream.getvalue()) > ENCODING_DETECTION_PREFIX_BYTES
+
+    assert list(iter_csv_stream(stream)) == rows
+
+
+def test_iter_csv_stream_names_the_stream_in_errors():
+    stream = io.BytesIO(b"\xef\xbb\xbfType,Notes\n\xff,x\n")
+
+    with pytest.raises(UnicodeDecodeError, match="<stdin>"):
+        list(iter_csv_stream(stream))
@@ -0,0 +1,63 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from ridewithgps_to_cuesheet.watch import Debouncer, changed_paths, snapshot_csv_files, watch_directory
+
+
+def test_debouncer_waits_for_quiet_period():
+    debouncer = Debouncer(delay=1.0)
+    debouncer.touch(Path("a.csv"), now=0.0)
+    debouncer.touch(Path("a.csv"), now=0.5)
+    debouncer.touch(Path("b.csv"), now=0.2)
+
+    assert debouncer.ready(now=1.3) == [Path("b.csv")]
+    assert debouncer.next_deadline() == 1.5
+    assert debouncer.ready(now=1.5) == [Path("a.csv")]
+    assert debouncer.next_deadline() is None
+
+
+def test_changed_paths(tmp_path):
+    unchanged = tmp_path / "unchanged.csv"
+    unchanged.write_text("a")
+    modified = tmp_path / "modified.csv"
+    modified.write_text("a")
+    (tmp_path / "notes.txt").write_text("ignored")
+    before = snapshot_csv_files(tmp_path)
+
+    modified.write_text("ab")
+    created = tmp_path / "created.csv"
+    created.write_text("a")
+
+    assert sorted(changed_paths(before, snapshot_csv_files(tmp_path))) == [created, modified]
+
+
+@pytest.mark.parametrize("use_watchdog", [True, False])
+def test_watch_directory_reports_settled_csv(tmp_path, monkeypatch, use_watchdog):
+    if use_watchdog:
+        pytest.importorskip("watchdog")
+    else:
+        monkeypatch.setitem(sys.modules, "watchdog.observers", None)
+
+    stop = threading.Event()
+    seen = []
+
+    def on_change(path):
+        seen.append(path)
+        stop.set()
+
+    watcher = threading.Thread(
+        target=watch_directory, args=(tmp_path, on_change, stop), kwargs={"debounce": 0.05, "poll_interval": 0.05}
+    )
+    watcher.start()
+    time.sleep(0.2)
+    for i in range(3):
+        (tmp_path / "route.csv").write_text(f"Type,Notes\nStart,Start of route {i}\n")
+    (tmp_path / "route.txt").write_text("ignored")
+    watcher.join(timeout=5)
+    stop.set()
+
+    assert seen == [tmp_path / "route.csv"]
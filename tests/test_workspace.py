@@ -0,0 +1,93 @@
+import stat
+import threading
+import time
+
+import pytest
+
+from ridewithgps_to_cuesheet.workspace import atomic_write_bytes, job_workspace, publish, route_lock
+
+
+def test_job_workspace_is_private_and_removed(tmp_path):
+    with job_workspace(tmp_path) as first, job_workspace(tmp_path) as second:
+        assert first != second
+        assert first.parent == tmp_path
+        (first / "partial.xlsx").write_bytes(b"half")
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_publish_replaces_destination(tmp_path):
+    destination = tmp_path / "outputs" / "route_cues.xlsx"
+    destination.parent.mkdir()
+    destination.write_bytes(b"old")
+
+    with job_workspace(tmp_path) as workspace:
+        generated = workspace / "route_cues.xlsx"
+        generated.write_bytes(b"new")
+        publish(generated, destination)
+
+    assert destination.read_bytes() == b"new"
+
+
+def test_atomic_write_bytes_leaves_no_temporary_files(tmp_path):
+    destination = tmp_path / "route.csv"
+
+    atomic_write_bytes(destination, b"first")
+    atomic_write_bytes(destination, b"second")
+
+    assert destination.read_bytes() == b"second"
+    assert [path.name for path in tmp_path.iterdir()] == ["route.csv"]
+
+
+def test_atomic_write_bytes_uses_the_permissions_of_a_new_file(tmp_path):
+    reference = tmp_path / "reference.csv"
+    reference.write_bytes(b"")
+
+    atomic_write_bytes(tmp_path / "route.csv", b"shared")
+    atomic_write_bytes(tmp_path / "private.csv", b"private", mode=0o600)
+
+    assert (tmp_path / "route.csv").stat().st_mode == reference.stat().st_mode
+    assert stat.S_IMODE((tmp_path / "private.csv").stat().st_mode) == 0o600
+
+
+def test_failed_atomic_write_keeps_previous_file(tmp_path):
+    destination = tmp_path / "route.csv"
+    destination.write_bytes(b"previous")
+
+    with pytest.raises(TypeError):
+        atomic_write_bytes(destination, "not bytes")  # type: ignore[arg-type]
+
+    assert destination.read_bytes() == b"previous"
+    assert [path.name for path in tmp_path.iterdir()] == ["route.csv"]
+
+
+def test_route_lock_serialises_the_same_route(tmp_path):
+    events = []
+
+    def convert(name):
+        with route_lock(tmp_path, "12345"):
+            events.append(f"{name} start")
+            time.sleep(0.05)
+            events.append(f"{name} end")
+
+    threads = [threading.Thread(target=convert, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert events in (["a start", "a end", "b start", "b end"], ["b start", "b end", "a start", "a end"])
+
+
+def test_route_lock_allows_different_routes(tmp_path):
+    acquired = threading.Event()
+
+    def convert_other_route():
+        with route_lock(tmp_path, "67890"):
+            acquired.set()
+
+    with route_lock(tmp_path, "12345"):
+        other = threading.Thread(target=convert_other_route)
+        other.start()
+        other.join(timeout=1)
+        assert acquired.is_set()